@@ -1,62 +1,227 @@
 from __future__ import annotations
 
+import json
 import logging
-from typing import Dict
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, List, Tuple
 
 from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 
 from app.core.config import get_settings
+from app.core.executors import (
+    ExecutorSaturatedError,
+    executor_stats,
+    get_ingest_executor,
+    get_query_executor,
+    shutdown_executors,
+)
 from app.core.health import health_payload
 from app.core.logging import configure_logging, new_trace_id, trace_id_ctx
-from app.api.schemas import IngestRequest, IngestResponse, QueryRequest, QueryResponse, RetrievedContext
+from app.core.metrics import LATENCY_BUCKETS, collect_stage_timings, get_metrics, set_gauge
+from app.api.schemas import (
+    IngestRequest,
+    IngestResponse,
+    QueryBatchItem,
+    QueryBatchRequest,
+    QueryBatchResponse,
+    QueryRequest,
+    QueryResponse,
+    RetrievedContext,
+)
 from app.pipeline.baseline import (
     ingest_paths,
     ingest_sentence_windows,
     answer_question,
     answer_question_with_collection,
 )
-from app.pipeline.advanced import answer_with_hyde_and_rerank
-from app.ingestion.index import SENTENCE_WINDOW_COLLECTION
+from app.pipeline.advanced import answer_with_hyde_and_rerank, retrieve_with_hyde_and_rerank
+from app.pipeline.batch import answer_questions_batch
+from app.ingestion.index import (
+    DEFAULT_BASELINE_COLLECTION,
+    SENTENCE_WINDOW_COLLECTION,
+    invalidate_collection_cache,
+)
+from app.llm.providers import astream_answer
+from app.retrieval.hybrid import retrieve
+from app.retrieval.hyde_cache import hyde_cache_stats
+from app.retrieval.registry import batcher_stats, warm_up
+from app.retrieval.semantic_cache import semantic_cache_stats
+
+
+logger = logging.getLogger(__name__)
+
+
+def _sse(event: str, data: object) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def _retrieve(req: QueryRequest) -> List[Tuple[str, Dict[str, str], float]]:
+    """Retrieval stage only, matching the mode selection used by /query."""
+
+    if req.use_hyde or req.use_rerank:
+        return retrieve_with_hyde_and_rerank(req.question, k=req.k, window_size=req.window_size)
+    collection = SENTENCE_WINDOW_COLLECTION if req.mode == "sentence_window" else DEFAULT_BASELINE_COLLECTION
+    return retrieve(req.question, req.k, collection, req.retrieval, window_size=req.window_size)
+
+
+def _wants_timings(request: Request) -> bool:
+    value = request.headers.get(get_settings().metrics.debug_header, "")
+    return value.strip().lower() in ("1", "true", "yes", "on")
 
 
 def create_app() -> FastAPI:
     configure_logging()
 
     settings = get_settings()
-    app = FastAPI(title=settings.app.name, version=settings.app.version)
+
+    @asynccontextmanager
+    async def lifespan(_app: FastAPI) -> AsyncIterator[None]:
+        if settings.runtime.warm_up_models:
+            try:
+                warm_up()
+            except Exception:
+                # Models are loaded lazily on first use; health reports the error state
+                logger.exception("Model warm-up failed")
+        yield
+        shutdown_executors(wait=False)
+        # Closing cached store handles flushes the built-in engine's deferred state
+        invalidate_collection_cache()
+
+    app = FastAPI(title=settings.app.name, version=settings.app.version, lifespan=lifespan)
 
     @app.middleware("http")
     async def add_trace_id_header(request: Request, call_next):
         trace_id = request.headers.get("x-trace-id") or new_trace_id()
         # Store in context for log formatter
         trace_id_ctx.set(trace_id)
-        response = await call_next(request)
+        if not settings.metrics.enabled:
+            response = await call_next(request)
+            response.headers["x-trace-id"] = trace_id
+            return response
+        metrics = get_metrics()
+        metrics.add_gauge("rag_http_in_flight", 1.0)
+        started = time.perf_counter()
+        try:
+            response = await call_next(request)
+        finally:
+            metrics.add_gauge("rag_http_in_flight", -1.0)
+        # Label by route template so unknown paths cannot grow the label set
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        labels = (("stage", f"http {request.method} {route}"),)
+        metrics.observe("rag_stage_seconds", time.perf_counter() - started, LATENCY_BUCKETS, labels)
         response.headers["x-trace-id"] = trace_id
         return response
 
+    @app.exception_handler(ExecutorSaturatedError)
+    async def executor_saturated(_request: Request, exc: ExecutorSaturatedError) -> JSONResponse:
+        return JSONResponse(
+            status_code=503,
+            content={"detail": f"Server busy: {exc.name} capacity exhausted, retry later."},
+            headers={"Retry-After": str(settings.concurrency.retry_after_seconds)},
+        )
+
     @app.get("/health", response_class=JSONResponse)
     async def health() -> Dict:
-        return JSONResponse(content=health_payload())
+        payload = health_payload()
+        payload["embedding_batching"] = batcher_stats()
+        payload["caches"] = {"hyde": hyde_cache_stats(), "semantic": semantic_cache_stats()}
+        payload["stages"] = get_metrics().stage_summary()
+        return JSONResponse(content=payload)
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    async def metrics() -> PlainTextResponse:
+        """Prometheus text exposition of stage latencies, caches, batch sizes and fallbacks."""
+
+        for name, stats in executor_stats().items():
+            set_gauge("rag_executor_in_flight", stats["in_flight"], executor=name)
+        return PlainTextResponse(get_metrics().render(), media_type="text/plain; version=0.0.4; charset=utf-8")
 
     @app.post("/ingest", response_model=IngestResponse)
     async def ingest(req: IngestRequest) -> IngestResponse:
+        executor = get_ingest_executor()
         if req.mode == "sentence_window":
-            docs, chunks = ingest_sentence_windows(req.paths, window_size=req.window_size)
+            docs, chunks = await executor.run(ingest_sentence_windows, req.paths, window_size=req.window_size)
         else:
-            docs, chunks = ingest_paths(req.paths, chunk_size=req.chunk_size, chunk_overlap=req.chunk_overlap)
+            docs, chunks = await executor.run(
+                ingest_paths, req.paths, chunk_size=req.chunk_size, chunk_overlap=req.chunk_overlap
+            )
         return IngestResponse(documents_indexed=docs, chunks_indexed=chunks)
 
     @app.post("/query", response_model=QueryResponse)
-    async def query(req: QueryRequest) -> QueryResponse:
-        if req.use_hyde or req.use_rerank:
-            answer, retrieved = answer_with_hyde_and_rerank(req.question, k=req.k)
-        elif req.mode == "sentence_window":
-            answer, retrieved = answer_question_with_collection(req.question, k=req.k, collection_name=SENTENCE_WINDOW_COLLECTION)
-        else:
-            answer, retrieved = answer_question(req.question, k=req.k)
+    async def query(req: QueryRequest, request: Request) -> QueryResponse:
+        executor = get_query_executor()
+        # The executor copies this context, so stages run on the worker land in `timings`
+        with collect_stage_timings() as timings:
+            if req.use_hyde or req.use_rerank:
+                answer, retrieved = await executor.run(
+                    answer_with_hyde_and_rerank, req.question, k=req.k, window_size=req.window_size
+                )
+            elif req.mode == "sentence_window":
+                answer, retrieved = await executor.run(
+                    answer_question_with_collection,
+                    req.question,
+                    k=req.k,
+                    collection_name=SENTENCE_WINDOW_COLLECTION,
+                    retrieval=req.retrieval,
+                    window_size=req.window_size,
+                )
+            else:
+                answer, retrieved = await executor.run(answer_question, req.question, k=req.k, retrieval=req.retrieval)
+        contexts = [RetrievedContext(text=t, source=m.get("source"), score=s) for t, m, s in retrieved]
+        stage_ms = {stage: round(s * 1000.0, 3) for stage, s in timings.items()} if _wants_timings(request) else None
+        return QueryResponse(answer=answer, contexts=contexts, timings=stage_ms)
+
+    @app.post("/query/batch", response_model=QueryBatchResponse)
+    async def query_batch(req: QueryBatchRequest) -> QueryBatchResponse:
+        """Answer many questions in one call; results keep the order of `questions`."""
+
+        answers = await get_query_executor().run(
+            answer_questions_batch,
+            req.questions,
+            k=req.k,
+            mode=req.mode,
+            use_hyde=req.use_hyde,
+            use_rerank=req.use_rerank,
+            retrieval=req.retrieval,
+            window_size=req.window_size,
+        )
+        results = [
+            QueryBatchItem(
+                answer=a.answer,
+                contexts=[RetrievedContext(text=t, source=m.get("source"), score=s) for t, m, s in a.retrieved],
+                error=a.error,
+            )
+            for a in answers
+        ]
+        return QueryBatchResponse(results=results)
+
+    @app.post("/query/stream")
+    async def query_stream(req: QueryRequest) -> StreamingResponse:
+        """Server-Sent Events: one `contexts` event, then `token` events, then `done`."""
+
+        retrieved = await get_query_executor().run(_retrieve, req)
         contexts = [RetrievedContext(text=t, source=m.get("source"), score=s) for t, m, s in retrieved]
-        return QueryResponse(answer=answer, contexts=contexts)
+
+        async def events() -> AsyncIterator[str]:
+            yield _sse("contexts", [c.model_dump() for c in contexts])
+            parts: List[str] = []
+            try:
+                async for delta in astream_answer(req.question, [c.text for c in contexts]):
+                    parts.append(delta)
+                    yield _sse("token", {"text": delta})
+            except Exception:
+                logger.exception("Answer stream failed")
+                yield _sse("error", {"detail": "answer generation failed"})
+                return
+            yield _sse("done", {"answer": "".join(parts)})
+
+        return StreamingResponse(
+            events(),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
 
     return app
 
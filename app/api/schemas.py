@@ -1,6 +1,6 @@
 from __future__ import annotations
 
-from typing import List, Optional
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 
@@ -10,8 +10,10 @@ class IngestRequest(BaseModel):
     paths: Optional[List[str]] = Field(
         default=None, description="List of files or directories to ingest. If omitted, use data/source_docs."
     )
-    chunk_size: int = Field(default=1000, ge=32, le=5000)
-    chunk_overlap: int = Field(default=200, ge=0, le=1000)
+    chunk_size: int = Field(
+        default=256, ge=16, le=5000, description="Chunk length in tokens, capped at the embedding model's limit"
+    )
+    chunk_overlap: int = Field(default=32, ge=0, le=1000, description="Overlap in tokens, at most a quarter chunk")
     mode: str = Field(default="baseline", description="baseline or sentence_window")
     window_size: int = Field(default=2, ge=0, le=10, description="Sentence window size on each side")
 
@@ -27,6 +29,14 @@ class QueryRequest(BaseModel):
     mode: str = Field(default="baseline", description="baseline or sentence_window")
     use_hyde: bool = Field(default=False)
     use_rerank: bool = Field(default=False)
+    retrieval: str = Field(
+        default="dense",
+        pattern="^(dense|bm25|hybrid)$",
+        description="First-stage retrieval without HyDE/rerank: dense, bm25 or hybrid",
+    )
+    window_size: Optional[int] = Field(
+        default=None, ge=0, le=10, description="Sentences on each side of a sentence-window match; defaults to the ingest-time window"
+    )
 
 
 class RetrievedContext(BaseModel):
@@ -38,3 +48,32 @@ class RetrievedContext(BaseModel):
 class QueryResponse(BaseModel):
     answer: str
     contexts: List[RetrievedContext]
+    timings: Optional[Dict[str, float]] = Field(
+        default=None, description="Milliseconds per pipeline stage; only with the metrics debug header"
+    )
+
+
+class QueryBatchRequest(BaseModel):
+    questions: List[str] = Field(min_length=1, max_length=256)
+    k: int = Field(default=5, ge=1, le=25)
+    mode: str = Field(default="baseline", description="baseline or sentence_window")
+    use_hyde: bool = Field(default=False)
+    use_rerank: bool = Field(default=False)
+    retrieval: str = Field(
+        default="dense",
+        pattern="^(dense|bm25|hybrid)$",
+        description="First-stage retrieval without HyDE/rerank: dense, bm25 or hybrid",
+    )
+    window_size: Optional[int] = Field(
+        default=None, ge=0, le=10, description="Sentences on each side of a sentence-window match; defaults to the ingest-time window"
+    )
+
+
+class QueryBatchItem(BaseModel):
+    answer: Optional[str] = None
+    contexts: List[RetrievedContext] = Field(default_factory=list)
+    error: Optional[str] = None
+
+
+class QueryBatchResponse(BaseModel):
+    results: List[QueryBatchItem]
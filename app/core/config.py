@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 from functools import lru_cache
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Dict, List, Optional
 
 import yaml
 from pydantic import BaseModel
@@ -43,16 +43,264 @@ class LoggingConfig(BaseModel):
 
 
 class DBConfig(BaseModel):
-    """Database configuration for local vector store."""
+    """Database configuration for local vector store.
+
+    Attributes:
+        chroma_path: Persist directory of the Chroma backend.
+        backend: Vector store backend: "chroma", or the built-in engine in
+            "exact" (brute-force matmul) or "hnsw" (approximate) mode.
+        store_path: Directory of the built-in engine's collections.
+        hnsw_m: Links per node of the HNSW graph (2x on the base layer).
+        hnsw_ef_construction: Candidate list size while linking new vectors.
+        hnsw_ef_search: Candidate list size at query time; higher trades latency for recall.
+    """
 
     chroma_path: str = "data/chroma"
+    backend: str = "chroma"
+    store_path: str = "data/vector_store"
+    hnsw_m: int = 16
+    hnsw_ef_construction: int = 100
+    hnsw_ef_search: int = 64
 
 
 class RuntimeConfig(BaseModel):
-    """Runtime configuration such as device selection."""
+    """Runtime configuration such as device selection.
+
+    Attributes:
+        device: Inference device for embedding and reranking models.
+        cuda_visible_devices: Value forwarded to CUDA_VISIBLE_DEVICES.
+        warm_up_models: Load the embedding and reranker models at API startup
+            instead of on the first request.
+    """
 
     device: str = "cpu"
     cuda_visible_devices: str = ""
+    warm_up_models: bool = True
+
+
+class InferenceConfig(BaseModel):
+    """CPU inference backend for the embedding and reranker models.
+
+    Attributes:
+        backend: "torch" (default) or "onnx". ONNX models are exported once into
+            `export_dir`; if export or loading fails the PyTorch model is used.
+        quantization: Dynamic int8 quantization profile for the ONNX export:
+            "avx512_vnni", "avx512", "avx2" or "arm64". None runs the fp32 export.
+        export_dir: Directory holding exported models, one folder per model.
+        threads: Intra-op threads for ONNX Runtime and PyTorch (0 = library default).
+    """
+
+    backend: str = "torch"
+    quantization: Optional[str] = "avx2"
+    export_dir: str = "data/models"
+    threads: int = 0
+
+
+class IngestionConfig(BaseModel):
+    """Streaming ingestion pipeline settings.
+
+    Attributes:
+        loader_workers: Processes used for PDF extraction (0 = one per CPU core).
+        prefetch_documents: Documents loaded ahead of chunking (0 = 2x loader_workers).
+        batch_size: Chunks embedded and written to the store per batch; bounds memory.
+        pdf_backend: PDF text extractor, "pymupdf" (default) or "pypdf".
+        pdf_parallel_min_pages: PDFs with at least this many pages are extracted page-parallel.
+        pdf_pages_per_task: Pages per extraction task when splitting a large PDF.
+        segment_workers: Processes used for sentence segmentation (0 = one per CPU core).
+        segment_parallel_min_chars: Characters per segmentation task: shorter documents
+            are grouped into tasks of about this size, longer ones split into blocks of it.
+        chunk_tokenizer: Tokenizer chunk sizes are measured in: "embedding" (the
+            embedding model's own, capping chunks at its max sequence length) or a
+            tiktoken encoding name such as "cl100k_base".
+    """
+
+    loader_workers: int = 0
+    prefetch_documents: int = 0
+    batch_size: int = 256
+    pdf_backend: str = "pymupdf"
+    pdf_parallel_min_pages: int = 64
+    pdf_pages_per_task: int = 32
+    segment_workers: int = 0
+    segment_parallel_min_chars: int = 100_000
+    chunk_tokenizer: str = "embedding"
+
+
+class EmbeddingConfig(BaseModel):
+    """Embedding model serving options.
+
+    Attributes:
+        batch_queries: Coalesce concurrent single-query embeddings into batched calls.
+        batch_max_size: Upper bound on queries embedded in one batch.
+        batch_max_wait_ms: How long the batcher waits for more queries before encoding.
+        batch_timeout_s: How long a batched query waits for its vector before failing.
+        cache_dir: Directory of the persistent embedding cache (one folder per
+            model) that lets ingestion skip re-embedding identical text; unset
+            disables it.
+    """
+
+    batch_queries: bool = True
+    batch_max_size: int = 32
+    batch_max_wait_ms: float = 5.0
+    batch_timeout_s: float = 30.0
+    cache_dir: Optional[str] = "data/cache/embeddings"
+
+
+class LLMConfig(BaseModel):
+    """Chat-completions provider settings.
+
+    Attributes:
+        model: Chat model used for answers and HyDE documents.
+        base_url: Optional API base URL (e.g. a proxy or local server). Defaults to
+            the OpenAI client's own resolution, including OPENAI_BASE_URL.
+        timeout_seconds: Per-call timeout, including connect and read.
+        max_retries: Retries for connection errors, timeouts, 429 and 5xx responses.
+        backoff_base_seconds: Initial backoff; doubles per attempt with full jitter.
+        backoff_max_seconds: Cap on a single backoff sleep.
+        max_concurrency: Concurrent in-flight completions allowed per process.
+        max_connections: HTTP connection pool size.
+        max_keepalive_connections: Idle connections kept open for reuse.
+        batch_concurrency: Concurrent generations issued by one batched query request.
+    """
+
+    model: str = "gpt-4o-mini"
+    base_url: Optional[str] = None
+    timeout_seconds: float = 30.0
+    max_retries: int = 2
+    backoff_base_seconds: float = 0.5
+    backoff_max_seconds: float = 8.0
+    max_concurrency: int = 8
+    max_connections: int = 20
+    max_keepalive_connections: int = 10
+    batch_concurrency: int = 4
+
+
+class HydeCacheConfig(BaseModel):
+    """Cache of HyDE documents and embeddings keyed by normalized question.
+
+    Attributes:
+        enabled: Turn the cache on or off.
+        max_entries: In-process LRU capacity.
+        ttl_seconds: Entry lifetime in both tiers.
+        sqlite_path: Optional SQLite file for the persistent tier; unset keeps the
+            cache in memory only.
+        max_disk_entries: Capacity of the persistent tier.
+    """
+
+    enabled: bool = True
+    max_entries: int = 1024
+    ttl_seconds: float = 86400.0
+    sqlite_path: Optional[str] = None
+    max_disk_entries: int = 100_000
+
+
+class LexicalConfig(BaseModel):
+    """BM25 inverted index and hybrid retrieval settings.
+
+    Attributes:
+        enabled: Maintain a BM25 index next to each collection during ingestion.
+        k1: BM25 term-frequency saturation.
+        b: BM25 document-length normalization.
+        rrf_k: Reciprocal rank fusion constant; larger values flatten rank differences.
+        candidates: Results taken from each retriever before fusion.
+    """
+
+    enabled: bool = True
+    k1: float = 1.2
+    b: float = 0.75
+    rrf_k: int = 60
+    candidates: int = 50
+
+
+class RerankConfig(BaseModel):
+    """Cross-encoder reranking settings.
+
+    Attributes:
+        batch_size: Pairs per cross-encoder forward pass; pairs are sorted by length
+            first so each batch pads to similar lengths.
+        max_length: Tokens per (query, candidate) pair; longer pairs are truncated.
+        cache_size: (query, candidate) scores kept in an in-process LRU (0 disables).
+        early_stop_margin: When set, candidates are scored in slices of `top_k` in
+            first-stage order, stopping once a slice's best score trails the current
+            k-th best by at least this margin. None scores every candidate.
+    """
+
+    batch_size: int = 32
+    max_length: int = 256
+    cache_size: int = 10_000
+    early_stop_margin: Optional[float] = None
+
+
+class SemanticCacheConfig(BaseModel):
+    """Opt-in cache of full answers matched by question embedding similarity.
+
+    Attributes:
+        enabled: Serve paraphrased questions from previously generated answers.
+        similarity_threshold: Minimum cosine similarity for a cache hit.
+        max_entries: Recent answers kept per (mode, collection, params).
+        ttl_seconds: Lifetime of a cached answer.
+    """
+
+    enabled: bool = False
+    similarity_threshold: float = 0.95
+    max_entries: int = 512
+    ttl_seconds: float = 3600.0
+
+
+class MetricsConfig(BaseModel):
+    """Latency and cache instrumentation exposed at /metrics.
+
+    Attributes:
+        enabled: Record stage timings, cache lookups, batch sizes and fallbacks.
+        quantile_window: Recent timings per stage used for the p50/p95/p99 gauges.
+        debug_header: Request header that, when set to a true value, adds per-stage
+            timings to the /query response.
+    """
+
+    enabled: bool = True
+    quantile_window: int = 1024
+    debug_header: str = "x-debug-timings"
+
+
+class ConcurrencyConfig(BaseModel):
+    """Bounded worker pools used by the API to keep blocking work off the event loop.
+
+    Attributes:
+        query_workers: Threads serving retrieval and generation for /query.
+        query_queue_size: Queries allowed to wait for a worker before rejecting with 503.
+        ingest_workers: Threads serving /ingest.
+        ingest_queue_size: Ingest jobs allowed to wait before rejecting with 503.
+        retry_after_seconds: Value of the Retry-After header on rejected requests.
+    """
+
+    query_workers: int = 4
+    query_queue_size: int = 32
+    ingest_workers: int = 1
+    ingest_queue_size: int = 2
+    retry_after_seconds: int = 1
+
+
+class EvaluationConfig(BaseModel):
+    """Offline evaluation runs (`python -m app.evaluation.evaluate`).
+
+    Attributes:
+        workers: Questions evaluated concurrently.
+        results_path: SQLite file checkpointing each question's pipeline output,
+            so interrupted runs resume and scorers reuse the stored outputs.
+        modes: Pipelines evaluated by default (baseline, advanced, sentence_window).
+        matrix: Grid swept by `python -m app.evaluation.matrix`: values per axis
+            (collection, k, use_hyde, use_rerank, rerank_top_k, window_size, retrieval).
+    """
+
+    workers: int = 4
+    results_path: str = "data/eval/runs/results.sqlite3"
+    modes: List[str] = ["baseline", "advanced"]
+    matrix: Dict[str, List[Any]] = {
+        "collection": ["baseline", "sentence_window"],
+        "k": [3, 5],
+        "use_hyde": [False, True],
+        "use_rerank": [False, True],
+        "rerank_top_k": [20],
+    }
 
 
 class Settings(BaseModel):
@@ -62,6 +310,17 @@ class Settings(BaseModel):
     logging: LoggingConfig = LoggingConfig()
     db: DBConfig = DBConfig()
     runtime: RuntimeConfig = RuntimeConfig()
+    inference: InferenceConfig = InferenceConfig()
+    concurrency: ConcurrencyConfig = ConcurrencyConfig()
+    ingestion: IngestionConfig = IngestionConfig()
+    embedding: EmbeddingConfig = EmbeddingConfig()
+    llm: LLMConfig = LLMConfig()
+    hyde_cache: HydeCacheConfig = HydeCacheConfig()
+    semantic_cache: SemanticCacheConfig = SemanticCacheConfig()
+    rerank: RerankConfig = RerankConfig()
+    lexical: LexicalConfig = LexicalConfig()
+    metrics: MetricsConfig = MetricsConfig()
+    evaluation: EvaluationConfig = EvaluationConfig()
 
 
 DEFAULT_CONFIG_PATH = Path(__file__).resolve().parents[2] / "configs" / "config.yaml"
@@ -94,6 +353,8 @@ def _apply_env_overrides(config: dict[str, Any]) -> dict[str, Any]:
         env_overrides.setdefault("logging", {})["level"] = os.getenv("LOG_LEVEL")
     if os.getenv("CUDA_VISIBLE_DEVICES") is not None:
         env_overrides.setdefault("runtime", {})["cuda_visible_devices"] = os.getenv("CUDA_VISIBLE_DEVICES", "")
+    if os.getenv("VECTOR_BACKEND"):
+        env_overrides.setdefault("db", {})["backend"] = os.getenv("VECTOR_BACKEND")
     if os.getenv("DEVICE"):
         env_overrides.setdefault("runtime", {})["device"] = os.getenv("DEVICE")
     if env_overrides:
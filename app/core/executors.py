@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, TypeVar
+
+from .config import get_settings
+
+
+T = TypeVar("T")
+
+
+class ExecutorSaturatedError(RuntimeError):
+    """Raised when a bounded executor has no free worker or queue slot."""
+
+    def __init__(self, name: str) -> None:
+        super().__init__(f"{name} executor is saturated")
+        self.name = name
+
+
+class BoundedExecutor:
+    """Thread pool with a hard cap on running plus queued tasks.
+
+    Submissions beyond `max_workers + queue_size` are rejected immediately with
+    `ExecutorSaturatedError` instead of waiting, so callers can shed load.
+    """
+
+    def __init__(self, name: str, max_workers: int, queue_size: int) -> None:
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self.capacity = self.max_workers + max(0, queue_size)
+        self._slots = threading.BoundedSemaphore(self.capacity)
+        self._in_flight = 0
+        self._count_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"{name}-worker")
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    async def run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """Run `fn` on the pool without blocking the event loop.
+
+        The caller's context variables (e.g. the trace id) are propagated to the worker.
+        """
+
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorSaturatedError(self.name)
+        with self._count_lock:
+            self._in_flight += 1
+        ctx = contextvars.copy_context()
+        try:
+            future = self._pool.submit(ctx.run, functools.partial(fn, *args, **kwargs))
+        except Exception:
+            self._release()
+            raise
+        # Release the slot when the work actually finishes, not when the awaiting
+        # request goes away, so cancelled requests cannot oversubscribe the pool.
+        future.add_done_callback(lambda _f: self._release())
+        return await asyncio.wrap_future(future)
+
+    def _release(self) -> None:
+        with self._count_lock:
+            self._in_flight -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"in_flight": self._in_flight, "max_workers": self.max_workers, "capacity": self.capacity}
+
+    def shutdown(self, wait: bool = True) -> None:
+        self._pool.shutdown(wait=wait)
+
+
+_executors: Dict[str, BoundedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(name: str, max_workers: int, queue_size: int) -> BoundedExecutor:
+    with _executors_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = BoundedExecutor(name, max_workers, queue_size)
+            _executors[name] = executor
+    return executor
+
+
+def get_query_executor() -> BoundedExecutor:
+    cfg = get_settings().concurrency
+    return _get_executor("query", cfg.query_workers, cfg.query_queue_size)
+
+
+def get_ingest_executor() -> BoundedExecutor:
+    cfg = get_settings().concurrency
+    return _get_executor("ingest", cfg.ingest_workers, cfg.ingest_queue_size)
+
+
+def executor_stats() -> Dict[str, Dict[str, int]]:
+    with _executors_lock:
+        return {name: ex.stats() for name, ex in _executors.items()}
+
+
+def shutdown_executors(wait: bool = True) -> None:
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
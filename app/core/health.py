@@ -4,6 +4,7 @@ import time
 from typing import Any, Dict, Optional
 
 from .config import get_settings
+from .executors import executor_stats
 
 
 _last_prediction_ts: Optional[float] = None
@@ -58,4 +59,5 @@ def health_payload() -> Dict[str, Any]:
             "last_successful_prediction_ts": _last_prediction_ts,
         },
         "gpu": get_gpu_status(),
+        "executors": executor_stats(),
     }
@@ -0,0 +1,294 @@
+from __future__ import annotations
+
+import bisect
+import functools
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Deque, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+from .config import get_settings
+
+
+T = TypeVar("T")
+
+Labels = Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS: Tuple[float, ...] = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+SIZE_BUCKETS: Tuple[float, ...] = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512, 1024)
+QUANTILES: Tuple[float, ...] = (0.5, 0.95, 0.99)
+
+# Metric families exposed at /metrics: name -> (type, help)
+METRICS: Dict[str, Tuple[str, str]] = {
+    "rag_stage_seconds": ("histogram", "Wall time of a pipeline stage."),
+    "rag_stage_recent_seconds": ("gauge", "Quantiles of the most recent stage timings."),
+    "rag_stage_in_flight": ("gauge", "Stage executions currently running."),
+    "rag_cache_lookups_total": ("counter", "Cache lookups by cache and result (hit or miss)."),
+    "rag_batch_size": ("histogram", "Items per batched model call."),
+    "rag_fallbacks_total": ("counter", "Times a component fell back to its degraded path."),
+    "rag_llm_calls_total": ("counter", "Completed LLM requests by model."),
+    "rag_llm_tokens_total": ("counter", "LLM tokens by model and type (prompt or completion)."),
+    "rag_http_in_flight": ("gauge", "HTTP requests currently being served."),
+    "rag_executor_in_flight": ("gauge", "Tasks running or queued on a bounded executor."),
+}
+
+# Per-request stage timings (seconds), collected only while `collect_stage_timings` is active.
+# The dict is shared by reference with worker threads that copy the context.
+_stage_timings: ContextVar[Optional[Dict[str, float]]] = ContextVar("stage_timings", default=None)
+# Per-request counts of LLM calls, tokens and fallbacks, collected only inside `collect_usage`.
+_usage: ContextVar[Optional[Dict[str, float]]] = ContextVar("usage", default=None)
+
+
+class Histogram:
+    """Cumulative-bucket histogram plus a window of recent observations for quantiles."""
+
+    def __init__(self, buckets: Sequence[float], window: int) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.recent: Deque[float] = deque(maxlen=max(1, window))
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        self.recent.append(value)
+
+    def quantiles(self, qs: Sequence[float] = QUANTILES) -> Dict[float, float]:
+        ordered = sorted(self.recent)
+        if not ordered:
+            return {}
+        return {q: ordered[min(len(ordered) - 1, int(math.ceil(q * len(ordered))) - 1)] for q in qs}
+
+
+class MetricsRegistry:
+    """Thread-safe store of counters, gauges and histograms keyed by name and labels."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[Tuple[str, Labels], float] = {}
+        self._gauges: Dict[Tuple[str, Labels], float] = {}
+        self._histograms: Dict[Tuple[str, Labels], Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0, labels: Labels = ()) -> None:
+        with self._lock:
+            self._counters[(name, labels)] = self._counters.get((name, labels), 0.0) + value
+
+    def add_gauge(self, name: str, delta: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._gauges[(name, labels)] = self._gauges.get((name, labels), 0.0) + delta
+
+    def set_gauge(self, name: str, value: float, labels: Labels = ()) -> None:
+        with self._lock:
+            self._gauges[(name, labels)] = value
+
+    def observe(self, name: str, value: float, buckets: Sequence[float], labels: Labels = ()) -> None:
+        with self._lock:
+            histogram = self._histograms.get((name, labels))
+            if histogram is None:
+                histogram = Histogram(buckets, get_settings().metrics.quantile_window)
+                self._histograms[(name, labels)] = histogram
+            histogram.observe(value)
+
+    def stage_summary(self) -> Dict[str, Dict[str, float]]:
+        """Count, mean and p50/p95/p99 (over the recent window) per stage, in milliseconds."""
+
+        with self._lock:
+            report: Dict[str, Dict[str, float]] = {}
+            for (name, labels), h in self._histograms.items():
+                if name != "rag_stage_seconds" or not h.count:
+                    continue
+                row = {"count": float(h.count), "mean_ms": h.sum / h.count * 1000.0}
+                row.update({f"p{int(q * 100)}_ms": v * 1000.0 for q, v in h.quantiles().items()})
+                report[dict(labels)["stage"]] = row
+            return report
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+
+        with self._lock:
+            samples: Dict[str, List[str]] = {}
+            for (name, labels), value in sorted(self._counters.items()):
+                samples.setdefault(name, []).append(_sample(name, labels, value))
+            for (name, labels), value in sorted(self._gauges.items()):
+                samples.setdefault(name, []).append(_sample(name, labels, value))
+            for (name, labels), h in sorted(self._histograms.items(), key=lambda item: item[0]):
+                lines = samples.setdefault(name, [])
+                cumulative = 0
+                for bound, count in zip([_format(b) for b in h.buckets] + ["+Inf"], h.counts):
+                    cumulative += count
+                    lines.append(_sample(f"{name}_bucket", labels + (("le", bound),), float(cumulative)))
+                lines.append(_sample(f"{name}_sum", labels, h.sum))
+                lines.append(_sample(f"{name}_count", labels, float(h.count)))
+                if name == "rag_stage_seconds":
+                    for q, v in h.quantiles().items():
+                        recent = samples.setdefault("rag_stage_recent_seconds", [])
+                        recent.append(_sample("rag_stage_recent_seconds", labels + (("quantile", _format(q)),), v))
+
+        out: List[str] = []
+        for name in sorted(samples):
+            kind, help_text = METRICS.get(name, ("untyped", ""))
+            out.append(f"# HELP {name} {help_text}")
+            out.append(f"# TYPE {name} {kind}")
+            out.extend(samples[name])
+        return "\n".join(out) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._gauges.clear()
+            self._histograms.clear()
+
+
+def _format(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _sample(name: str, labels: Labels, value: float) -> str:
+    if labels:
+        rendered = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels)
+        return f"{name}{{{rendered}}} {_format(value)}"
+    return f"{name} {_format(value)}"
+
+
+def _labels(labels: Dict[str, Any]) -> Labels:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+_registry = MetricsRegistry()
+
+
+def get_metrics() -> MetricsRegistry:
+    return _registry
+
+
+def inc(name: str, value: float = 1.0, **labels: Any) -> None:
+    if get_settings().metrics.enabled:
+        _registry.inc(name, value, _labels(labels))
+
+
+def set_gauge(name: str, value: float, **labels: Any) -> None:
+    if get_settings().metrics.enabled:
+        _registry.set_gauge(name, value, _labels(labels))
+
+
+def observe_batch(kind: str, size: int) -> None:
+    """Record the number of items in one batched model call."""
+
+    if get_settings().metrics.enabled:
+        _registry.observe("rag_batch_size", float(size), SIZE_BUCKETS, _labels({"kind": kind}))
+
+
+def count_cache(cache: str, hits: int, misses: int) -> None:
+    """Record cache lookups for `cache`."""
+
+    if get_settings().metrics.enabled:
+        if hits:
+            _registry.inc("rag_cache_lookups_total", float(hits), _labels({"cache": cache, "result": "hit"}))
+        if misses:
+            _registry.inc("rag_cache_lookups_total", float(misses), _labels({"cache": cache, "result": "miss"}))
+
+
+def _add_usage(key: str, value: float) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        usage[key] = usage.get(key, 0.0) + value
+
+
+def count_fallback(component: str) -> None:
+    inc("rag_fallbacks_total", component=component)
+    _add_usage(f"fallback.{component}", 1.0)
+
+
+def count_llm_call(model: str, prompt_tokens: int = 0, completion_tokens: int = 0) -> None:
+    """Record one completed LLM request and the tokens it reported."""
+
+    inc("rag_llm_calls_total", model=model)
+    if prompt_tokens:
+        inc("rag_llm_tokens_total", float(prompt_tokens), model=model, type="prompt")
+    if completion_tokens:
+        inc("rag_llm_tokens_total", float(completion_tokens), model=model, type="completion")
+    _add_usage("llm_calls", 1.0)
+    _add_usage("llm_prompt_tokens", float(prompt_tokens))
+    _add_usage("llm_completion_tokens", float(completion_tokens))
+
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a pipeline stage.
+
+    Records the duration in the `rag_stage_seconds` histogram, tracks the stage in
+    the in-flight gauge and, inside `collect_stage_timings`, adds it to the
+    request's timings. Nested stages are recorded separately, so a parent's time
+    includes its children.
+    """
+
+    if not get_settings().metrics.enabled:
+        yield
+        return
+    labels = _labels({"stage": stage})
+    _registry.add_gauge("rag_stage_in_flight", 1.0, labels)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _registry.add_gauge("rag_stage_in_flight", -1.0, labels)
+        _registry.observe("rag_stage_seconds", elapsed, LATENCY_BUCKETS, labels)
+        timings = _stage_timings.get()
+        if timings is not None:
+            timings[stage] = timings.get(stage, 0.0) + elapsed
+
+
+def timed(stage: str) -> Callable[[Callable[..., T]], Callable[..., T]]:
+    """Decorator form of `span`."""
+
+    def decorate(fn: Callable[..., T]) -> Callable[..., T]:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> T:
+            with span(stage):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+@contextmanager
+def collect_stage_timings() -> Iterator[Dict[str, float]]:
+    """Collect the stages run in this context (and in executor tasks it submits)
+    into the yielded dict of seconds per stage."""
+
+    timings: Dict[str, float] = {}
+    token = _stage_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _stage_timings.reset(token)
+
+
+@contextmanager
+def collect_usage() -> Iterator[Dict[str, float]]:
+    """Collect LLM calls and tokens (`llm_calls`, `llm_prompt_tokens`,
+    `llm_completion_tokens`) and `fallback.<component>` counts made in this context
+    into the yielded dict. Unlike the exported metrics this does not depend on
+    `metrics.enabled`."""
+
+    usage: Dict[str, float] = {}
+    token = _usage.set(usage)
+    try:
+        yield usage
+    finally:
+        _usage.reset(token)
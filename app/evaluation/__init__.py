@@ -1,4 +1,7 @@
 __all__ = [
     "dataset",
     "evaluate",
+    "matrix",
+    "runner",
+    "store",
 ]
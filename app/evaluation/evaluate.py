@@ -2,13 +2,14 @@ from __future__ import annotations
 
 import os
 from dataclasses import dataclass
-from typing import Dict, List, Tuple
-
-from datasets import Dataset
+from typing import Dict, List, Optional, Sequence, Tuple
 
+from app.core.config import get_settings
+from app.evaluation.runner import Pipeline, latency_report, run_fingerprint, run_pipelines
+from app.evaluation.store import PipelineOutput, ResultStore, question_id
 from app.pipeline.baseline import answer_question, answer_question_with_collection
 from app.pipeline.advanced import answer_with_hyde_and_rerank
-from app.ingestion.index import SENTENCE_WINDOW_COLLECTION
+from app.ingestion.index import DEFAULT_BASELINE_COLLECTION, SENTENCE_WINDOW_COLLECTION
 
 
 @dataclass
@@ -46,13 +47,61 @@ def _score_pair(reference: str, candidate: str) -> float:
     return len(ref & cand) / len(ref)
 
 
-def evaluate_pairs_proxy(qa_pairs: List[Tuple[str, str]]) -> List[EvalResult]:
-    results: List[EvalResult] = []
-    for q, ref in qa_pairs:
-        baseline_ans, _ = _run_baseline(q)
-        advanced_ans, _ = _run_advanced(q)
-        results.append(EvalResult(question=q, reference=ref, baseline_answer=baseline_ans, advanced_answer=advanced_ans))
-    return results
+PIPELINES: Dict[str, Pipeline] = {
+    "baseline": _run_baseline,
+    "advanced": _run_advanced,
+    "sentence_window": _run_sentence_window_baseline,
+}
+
+
+def collect_outputs(
+    qa_pairs: List[Tuple[str, str]],
+    modes: Optional[Sequence[str]] = None,
+    store: Optional[ResultStore] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, List[PipelineOutput]]:
+    """Pipeline outputs for every QA pair and mode, running only what `store` lacks.
+
+    Stored outputs are reused only if they were produced under the current
+    `run_fingerprint`. Without a store the outputs are kept in memory for this
+    call only.
+    """
+
+    modes = list(modes or get_settings().evaluation.modes)
+    unknown = [m for m in modes if m not in PIPELINES]
+    if unknown:
+        raise ValueError(f"Unknown evaluation modes {unknown}; expected some of {sorted(PIPELINES)}")
+    store = store or ResultStore()
+    fingerprint = run_fingerprint([DEFAULT_BASELINE_COLLECTION, SENTENCE_WINDOW_COLLECTION])
+    run_pipelines(qa_pairs, {m: PIPELINES[m] for m in modes}, store, workers=workers, fingerprint=fingerprint)
+    ids = list(dict.fromkeys(question_id(q, ref) for q, ref in qa_pairs))
+    return {m: store.outputs(m, ids) for m in modes}
+
+
+def proxy_scores(outputs: Dict[str, List[PipelineOutput]]) -> Dict[str, float]:
+    """Mean lexical overlap per mode over the questions that did not fail."""
+
+    scores: Dict[str, float] = {}
+    for mode, rows in outputs.items():
+        values = [_score_pair(o.reference, o.answer) for o in rows if o.error is None]
+        scores[mode] = sum(values) / max(1, len(values))
+    return scores
+
+
+def evaluate_pairs_proxy(
+    qa_pairs: List[Tuple[str, str]], store: Optional[ResultStore] = None, workers: Optional[int] = None
+) -> List[EvalResult]:
+    outputs = collect_outputs(qa_pairs, ["baseline", "advanced"], store=store, workers=workers)
+    advanced = {o.question_id: o.answer for o in outputs["advanced"]}
+    return [
+        EvalResult(
+            question=o.question,
+            reference=o.reference,
+            baseline_answer=o.answer,
+            advanced_answer=advanced.get(o.question_id, ""),
+        )
+        for o in outputs["baseline"]
+    ]
 
 
 def print_summary_proxy(results: List[EvalResult]) -> None:
@@ -72,30 +121,27 @@ def print_summary_proxy(results: List[EvalResult]) -> None:
     print(f"Advanced avg: {a_avg:.3f}")
 
 
-def evaluate_with_ragas(qa_pairs: List[Tuple[str, str]]) -> None:
-    """Run RAGAS metrics when OPENAI_API_KEY is set.
+def print_report(outputs: Dict[str, List[PipelineOutput]], scores: Dict[str, float], metric: str = "proxy") -> None:
+    """Quality score next to latency for each mode."""
 
-    Builds two datasets (baseline vs advanced) with question, answer, contexts, ground_truth.
-    Prints aggregated metric means.
-    """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise RuntimeError("OPENAI_API_KEY not set; cannot run RAGAS")
+    print(f"\nEvaluation Summary ({metric} score and latency per mode)")
+    print("-----------------------------------------------------")
+    for mode, rows in outputs.items():
+        lat = latency_report(rows)
+        print(
+            f"{mode}: score={scores.get(mode, float('nan')):.3f}  questions={lat['questions']}  errors={lat['errors']}"
+            f"  p50={lat.get('p50_ms', float('nan')):.1f}ms  p95={lat.get('p95_ms', float('nan')):.1f}ms"
+        )
 
-    # Prepare datasets
-    baseline_rows: List[Dict] = []
-    advanced_rows: List[Dict] = []
 
-    for q, ref in qa_pairs:
-        b_ans, b_ctx = _run_baseline(q)
-        a_ans, a_ctx = _run_advanced(q)
-        baseline_rows.append({"question": q, "answer": b_ans, "contexts": b_ctx, "ground_truth": ref})
-        advanced_rows.append({"question": q, "answer": a_ans, "contexts": a_ctx, "ground_truth": ref})
+def ragas_scores(outputs: Dict[str, List[PipelineOutput]]) -> Dict[str, Dict[str, float]]:
+    """RAGAS metric means per mode over stored outputs; needs OPENAI_API_KEY."""
 
-    baseline_ds = Dataset.from_list(baseline_rows)
-    advanced_ds = Dataset.from_list(advanced_rows)
+    if not os.getenv("OPENAI_API_KEY"):
+        raise RuntimeError("OPENAI_API_KEY not set; cannot run RAGAS")
 
     # Configure LLM and embeddings for RAGAS
+    from datasets import Dataset
     from langchain_openai import ChatOpenAI, OpenAIEmbeddings
     from ragas.metrics import faithfulness, answer_relevancy, context_precision, context_relevancy
     from ragas import evaluate as ragas_evaluate
@@ -105,38 +151,84 @@ def evaluate_with_ragas(qa_pairs: List[Tuple[str, str]]) -> None:
 
     metrics = [faithfulness, answer_relevancy, context_precision, context_relevancy]
 
-    print("\nRunning RAGAS on baseline dataset...")
-    b_result = ragas_evaluate(baseline_ds, metrics=metrics, llm=llm, embeddings=embeddings)
-    print("Running RAGAS on advanced dataset...")
-    a_result = ragas_evaluate(advanced_ds, metrics=metrics, llm=llm, embeddings=embeddings)
+    means: Dict[str, Dict[str, float]] = {}
+    for mode, rows in outputs.items():
+        dataset = Dataset.from_list(
+            [
+                {"question": o.question, "answer": o.answer, "contexts": o.contexts, "ground_truth": o.reference}
+                for o in rows
+                if o.error is None
+            ]
+        )
+        print(f"\nRunning RAGAS on {mode} dataset...")
+        result = ragas_evaluate(dataset, metrics=metrics, llm=llm, embeddings=embeddings)
+        means[mode] = {
+            getattr(m, "name", str(m)): float(result[m].mean()) if hasattr(result[m], "mean") else float(result[m])
+            for m in metrics
+        }
+    return means
+
+
+def evaluate_with_ragas(
+    qa_pairs: List[Tuple[str, str]],
+    modes: Optional[Sequence[str]] = None,
+    store: Optional[ResultStore] = None,
+    workers: Optional[int] = None,
+) -> Dict[str, Dict[str, float]]:
+    """Run RAGAS metrics when OPENAI_API_KEY is set.
+
+    Scores the stored pipeline outputs (running only the missing ones) with
+    question, answer, contexts and ground_truth. Prints and returns metric means
+    per mode.
+    """
+    if not os.getenv("OPENAI_API_KEY"):
+        raise RuntimeError("OPENAI_API_KEY not set; cannot run RAGAS")
+
+    outputs = collect_outputs(qa_pairs, modes, store=store, workers=workers)
+    means = ragas_scores(outputs)
 
     # Print means
     print("\nRAGAS Summary (means)")
     print("---------------------")
-    for m in metrics:
-        name = getattr(m, "name", str(m))
-        b_mean = float(b_result[m].mean()) if hasattr(b_result[m], "mean") else float(b_result[m])
-        a_mean = float(a_result[m].mean()) if hasattr(a_result[m], "mean") else float(a_result[m])
-        print(f"{name}: baseline={b_mean:.3f}  advanced={a_mean:.3f}")
+    names = next(iter(means.values()), {}).keys()
+    for name in names:
+        print(f"{name}: " + "  ".join(f"{mode}={values[name]:.3f}" for mode, values in means.items()))
+    for mode, rows in outputs.items():
+        lat = latency_report(rows)
+        print(f"{mode} latency: p50={lat.get('p50_ms', float('nan')):.1f}ms  p95={lat.get('p95_ms', float('nan')):.1f}ms")
+    return means
 
 
 if __name__ == "__main__":
     import argparse
     from app.evaluation.dataset import load_qa_pairs
 
+    settings = get_settings().evaluation
     parser = argparse.ArgumentParser()
     parser.add_argument("--dataset", type=str, default="data/eval/qa.jsonl")
+    parser.add_argument("--modes", type=str, default=",".join(settings.modes), help=f"comma-separated, from {sorted(PIPELINES)}")
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--results", type=str, default=settings.results_path, help="SQLite results store")
+    parser.add_argument("--fresh", action="store_true", help="discard stored outputs for these modes first")
     args = parser.parse_args()
 
     pairs = load_qa_pairs(args.dataset)
-
-    if os.getenv("OPENAI_API_KEY"):
-        try:
-            evaluate_with_ragas(pairs)
-        except Exception as e:
-            print(f"RAGAS evaluation failed: {e}. Falling back to proxy metrics.")
-            results = evaluate_pairs_proxy(pairs)
-            print_summary_proxy(results)
-    else:
-        results = evaluate_pairs_proxy(pairs)
-        print_summary_proxy(results)
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    results_store = ResultStore(args.results)
+    if args.fresh:
+        for mode in modes:
+            results_store.clear(mode)
+
+    try:
+        if os.getenv("OPENAI_API_KEY"):
+            try:
+                evaluate_with_ragas(pairs, modes, store=results_store, workers=args.workers)
+            except Exception as e:
+                print(f"RAGAS evaluation failed: {e}. Falling back to proxy metrics.")
+                outputs = collect_outputs(pairs, modes, store=results_store, workers=args.workers)
+                print_report(outputs, proxy_scores(outputs))
+        else:
+            outputs = collect_outputs(pairs, modes, store=results_store, workers=args.workers)
+            print_report(outputs, proxy_scores(outputs))
+    finally:
+        results_store.close()
@@ -0,0 +1,336 @@
+"""Sweep a matrix of pipeline configurations and report the latency/quality trade-off.
+
+Every point of the grid (collection, k, HyDE, rerank, rerank depth, window size,
+first-stage retrieval) is run over the dataset through the resumable runner.
+Each point gets quality scores plus p50/p95 latency and LLM calls and tokens per
+question. The report marks the Pareto front and recommends the cheapest point
+that meets a quality bar.
+
+Usage:
+    python -m app.evaluation.matrix --dataset data/eval/qa.jsonl --min-quality 0.5
+"""
+
+from __future__ import annotations
+
+import itertools
+import json
+from contextlib import contextmanager, nullcontext
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import span
+from app.evaluation.evaluate import _score_pair, ragas_scores
+from app.evaluation.runner import latency_report, run_fingerprint, run_pipelines
+from app.evaluation.store import PipelineOutput, ResultStore, question_id
+from app.ingestion.index import DEFAULT_BASELINE_COLLECTION, SENTENCE_WINDOW_COLLECTION
+from app.llm.providers import current_llm_model_id, generate_answer
+from app.pipeline.advanced import retrieve_with_hyde
+from app.retrieval.hybrid import RETRIEVAL_MODES, retrieve
+from app.retrieval.registry import get_reranker
+
+
+COLLECTIONS = {"baseline": DEFAULT_BASELINE_COLLECTION, "sentence_window": SENTENCE_WINDOW_COLLECTION}
+PROXY_METRICS = ("answer_overlap", "context_recall")
+COSTS = ("p50_ms", "p95_ms", "llm_calls", "llm_tokens")
+
+
+@dataclass(frozen=True)
+class PipelineConfig:
+    """One point of the evaluation matrix.
+
+    `rerank_top_k` is the number of first-stage candidates handed to the reranker
+    (at least `k`); `window_size` overrides the sentence-window width and only
+    applies to the sentence-window collection.
+    """
+
+    collection: str = "baseline"
+    k: int = 5
+    use_hyde: bool = False
+    use_rerank: bool = False
+    rerank_top_k: Optional[int] = None
+    window_size: Optional[int] = None
+    retrieval: str = "dense"
+
+    @property
+    def name(self) -> str:
+        parts = [self.collection, f"k{self.k}"]
+        if self.use_hyde:
+            parts.append("hyde")
+        elif self.retrieval != "dense":
+            parts.append(self.retrieval)
+        if self.use_rerank:
+            parts.append(f"rerank{self.rerank_top_k}")
+        if self.window_size is not None:
+            parts.append(f"w{self.window_size}")
+        return "/".join(parts)
+
+    def normalized(self) -> "PipelineConfig":
+        """Drop settings that have no effect, so equivalent points share a name."""
+
+        if self.collection not in COLLECTIONS:
+            raise ValueError(f"Unknown collection {self.collection!r}; expected one of {sorted(COLLECTIONS)}")
+        if self.retrieval not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {self.retrieval!r}; expected one of {sorted(RETRIEVAL_MODES)}")
+        return PipelineConfig(
+            collection=self.collection,
+            k=self.k,
+            use_hyde=self.use_hyde,
+            use_rerank=self.use_rerank,
+            rerank_top_k=max(self.k, self.rerank_top_k or self.k) if self.use_rerank else None,
+            window_size=self.window_size if self.collection == "sentence_window" else None,
+            # HyDE retrieval is dense over the hypothetical document
+            retrieval="dense" if self.use_hyde else self.retrieval,
+        )
+
+
+def expand_matrix(axes: Mapping[str, Sequence[Any]]) -> List[PipelineConfig]:
+    """All distinct normalized configurations of the grid `axes` (field -> values)."""
+
+    unknown = set(axes) - set(PipelineConfig.__dataclass_fields__)
+    if unknown:
+        raise ValueError(f"Unknown matrix axes {sorted(unknown)}")
+    names = list(axes)
+    points: Dict[str, PipelineConfig] = {}
+    for values in itertools.product(*(axes[n] for n in names)):
+        point = PipelineConfig(**dict(zip(names, values))).normalized()
+        points.setdefault(point.name, point)
+    return list(points.values())
+
+
+def answer_with_config(config: PipelineConfig, question: str) -> Tuple[str, List[str]]:
+    """Answer `question` with the pipeline described by `config`, bypassing the
+    semantic answer cache so every point pays for its own retrieval and generation."""
+
+    collection = COLLECTIONS[config.collection]
+    depth = config.rerank_top_k or config.k
+    with span("retrieve"):
+        if config.use_hyde:
+            hits = retrieve_with_hyde(question, k=depth, collection_name=collection, window_size=config.window_size)
+        else:
+            hits = retrieve(question, depth, collection, config.retrieval, window_size=config.window_size)
+        if config.use_rerank:
+            hits = get_reranker().rerank(question, hits, top_k=config.k)
+    contexts = [t for t, _m, _s in hits]
+    with span("generate"):
+        answer = generate_answer(question, contexts)
+    return answer, contexts
+
+
+@contextmanager
+def cold_caches() -> Iterator[None]:
+    """Disable the HyDE, semantic-answer and rerank-score caches, so points that run
+    later are not credited with work cached by earlier ones."""
+
+    settings = get_settings()
+    saved = (settings.hyde_cache.enabled, settings.semantic_cache.enabled, settings.rerank.cache_size)
+    settings.hyde_cache.enabled = False
+    settings.semantic_cache.enabled = False
+    settings.rerank.cache_size = 0
+    try:
+        yield
+    finally:
+        settings.hyde_cache.enabled, settings.semantic_cache.enabled, settings.rerank.cache_size = saved
+
+
+def proxy_quality(outputs: Sequence[PipelineOutput]) -> Dict[str, float]:
+    """Offline quality: reference-token overlap of the answer and of the contexts."""
+
+    ok = [o for o in outputs if o.error is None]
+    n = max(1, len(ok))
+    return {
+        "answer_overlap": sum(_score_pair(o.reference, o.answer) for o in ok) / n,
+        "context_recall": sum(_score_pair(o.reference, " ".join(o.contexts)) for o in ok) / n,
+    }
+
+
+def _cost(point: Dict[str, Any], cost: str) -> float:
+    if cost in ("p50_ms", "p95_ms"):
+        return point["latency"].get(cost, float("inf"))
+    return point[f"{cost}_per_question"]
+
+
+def pareto_front(points: Sequence[Dict[str, Any]], metric: str) -> List[str]:
+    """Names of the points no other point beats on quality, p95 latency and LLM tokens at once."""
+
+    def objectives(p: Dict[str, Any]) -> Tuple[float, float, float]:
+        return (-p["quality"].get(metric, float("-inf")), _cost(p, "p95_ms"), _cost(p, "llm_tokens"))
+
+    front = []
+    for p in points:
+        mine = objectives(p)
+        dominated = any(
+            all(a <= b for a, b in zip(objectives(q), mine)) and objectives(q) != mine for q in points if q is not p
+        )
+        if not dominated:
+            front.append(p["name"])
+    return front
+
+
+def recommend(points: Sequence[Dict[str, Any]], metric: str, min_quality: float, cost: str) -> Optional[str]:
+    """The cheapest point by `cost` whose `metric` is at least `min_quality`."""
+
+    eligible = [p for p in points if p["quality"].get(metric, float("-inf")) >= min_quality]
+    if not eligible:
+        return None
+    best = min(eligible, key=lambda p: (_cost(p, cost), _cost(p, "p95_ms"), -p["quality"][metric]))
+    return best["name"]
+
+
+def run_matrix(
+    qa_pairs: List[Tuple[str, str]],
+    configs: Sequence[PipelineConfig],
+    store: ResultStore,
+    workers: Optional[int] = None,
+    ragas: bool = False,
+    cold: bool = True,
+) -> List[Dict[str, Any]]:
+    """Run (or resume) every configuration and summarize each one.
+
+    Points run one after another so their latencies are measured under the same
+    load; questions within a point run `workers` at a time. Stored outputs are
+    reused only when their run fingerprint (LLM, settings, indexed content of the
+    point's collection, `cold`) matches.
+    """
+
+    ids = list(dict.fromkeys(question_id(q, ref) for q, ref in qa_pairs))
+    outputs: Dict[str, List[PipelineOutput]] = {}
+    with cold_caches() if cold else nullcontext():
+        for config in configs:
+            fingerprint = run_fingerprint([COLLECTIONS[config.collection]], cold_caches=cold)
+            pipeline = {config.name: lambda q, c=config: answer_with_config(c, q)}
+            run_pipelines(qa_pairs, pipeline, store, workers, fingerprint=fingerprint)
+            outputs[config.name] = store.outputs(config.name, ids)
+
+    scores = ragas_scores(outputs) if ragas else {}
+    points: List[Dict[str, Any]] = []
+    for config in configs:
+        rows = outputs[config.name]
+        latency = latency_report(rows)
+        usage = latency.pop("usage_per_question", {})
+        latency.pop("stages_mean_ms", None)
+        points.append(
+            {
+                "name": config.name,
+                "config": asdict(config),
+                "quality": {**proxy_quality(rows), **scores.get(config.name, {})},
+                "latency": latency,
+                "llm_calls_per_question": usage.get("llm_calls", 0.0),
+                "llm_tokens_per_question": usage.get("llm_prompt_tokens", 0.0) + usage.get("llm_completion_tokens", 0.0),
+                "llm_fallbacks_per_question": sum(v for k, v in usage.items() if k.startswith("fallback.llm")),
+            }
+        )
+    return points
+
+
+def build_report(
+    points: List[Dict[str, Any]], metric: str, min_quality: float, cost: str, meta: Dict[str, Any]
+) -> Dict[str, Any]:
+    front = pareto_front(points, metric)
+    for p in points:
+        p["pareto"] = p["name"] in front
+    return {
+        "meta": {**meta, "metric": metric, "min_quality": min_quality, "cost": cost},
+        "points": sorted(points, key=lambda p: -p["quality"].get(metric, float("-inf"))),
+        "pareto_front": front,
+        "recommended": recommend(points, metric, min_quality, cost),
+    }
+
+
+def render_markdown(report: Dict[str, Any]) -> str:
+    meta = report["meta"]
+    metric = meta["metric"]
+    lines = [
+        "# Pipeline comparison matrix",
+        "",
+        f"{meta.get('questions', '?')} questions, quality metric `{metric}`, cost `{meta['cost']}`,"
+        f" LLM `{meta.get('llm_model', '?')}`. Pareto-optimal points (quality vs p95 latency vs LLM tokens) are marked *.",
+        "",
+        f"| | configuration | {metric} | p50 ms | p95 ms | LLM calls/q | LLM tokens/q | errors |",
+        "|---|---|---:|---:|---:|---:|---:|---:|",
+    ]
+    for p in report["points"]:
+        lat = p["latency"]
+        lines.append(
+            f"| {'*' if p['pareto'] else ''} | `{p['name']}` | {p['quality'].get(metric, float('nan')):.3f}"
+            f" | {lat.get('p50_ms', float('nan')):.1f} | {lat.get('p95_ms', float('nan')):.1f}"
+            f" | {p['llm_calls_per_question']:.2f} | {p['llm_tokens_per_question']:.0f} | {lat['errors']} |"
+        )
+    lines.append("")
+    if report["recommended"]:
+        lines.append(
+            f"Cheapest configuration with {metric} >= {meta['min_quality']}: `{report['recommended']}`."
+        )
+    else:
+        lines.append(f"No configuration reaches {metric} >= {meta['min_quality']}.")
+    return "\n".join(lines) + "\n"
+
+
+def write_report(report: Dict[str, Any], prefix: str | Path) -> Tuple[Path, Path]:
+    """Write `<prefix>.json` and `<prefix>.md`."""
+
+    prefix = Path(prefix)
+    prefix.parent.mkdir(parents=True, exist_ok=True)
+    json_path, md_path = prefix.with_suffix(".json"), prefix.with_suffix(".md")
+    json_path.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    md_path.write_text(render_markdown(report), encoding="utf-8")
+    return json_path, md_path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import yaml
+
+    from app.evaluation.dataset import load_qa_pairs
+
+    settings = get_settings().evaluation
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--dataset", type=str, default="data/eval/qa.jsonl")
+    parser.add_argument("--matrix", type=str, default=None, help="YAML mapping of axes to values (default: evaluation.matrix)")
+    parser.add_argument("--metric", type=str, default="answer_overlap", help=f"{', '.join(PROXY_METRICS)} or a RAGAS metric")
+    parser.add_argument("--min-quality", type=float, default=0.0)
+    parser.add_argument("--cost", choices=COSTS, default="p95_ms")
+    parser.add_argument("--ragas", action="store_true", help="also score with RAGAS (needs OPENAI_API_KEY)")
+    parser.add_argument("--warm-caches", action="store_true", help="keep HyDE, semantic and rerank caches on")
+    parser.add_argument("--workers", type=int, default=settings.workers)
+    parser.add_argument("--results", type=str, default=settings.results_path, help="SQLite results store")
+    parser.add_argument("--fresh", action="store_true", help="discard stored outputs of the swept points first")
+    parser.add_argument("--report", type=str, default="data/eval/runs/matrix", help="report path prefix (.json and .md)")
+    args = parser.parse_args()
+
+    axes = yaml.safe_load(Path(args.matrix).read_text()) if args.matrix else settings.matrix
+    configs = expand_matrix(axes)
+    pairs = load_qa_pairs(args.dataset)
+    results_store = ResultStore(args.results)
+    try:
+        if args.fresh:
+            for point in configs:
+                results_store.clear(point.name)
+        swept = run_matrix(
+            pairs,
+            configs,
+            results_store,
+            workers=args.workers,
+            ragas=args.ragas,
+            cold=not args.warm_caches,
+        )
+    finally:
+        results_store.close()
+    matrix_report = build_report(
+        swept,
+        args.metric,
+        args.min_quality,
+        args.cost,
+        {
+            "dataset": args.dataset,
+            "questions": len(dict.fromkeys(pairs)),
+            "workers": args.workers,
+            "llm_model": current_llm_model_id(),
+            "cold_caches": not args.warm_caches,
+        },
+    )
+    paths = write_report(matrix_report, args.report)
+    print(render_markdown(matrix_report))
+    print(f"report written to {paths[0]} and {paths[1]}")
@@ -0,0 +1,137 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import collect_stage_timings, collect_usage
+from app.evaluation.store import PipelineOutput, ResultStore, question_id
+from app.ingestion.manifest import IngestManifest
+from app.llm.providers import current_llm_model_id
+
+
+logger = logging.getLogger(__name__)
+
+# question -> (answer, context texts)
+Pipeline = Callable[[str], Tuple[str, List[str]]]
+
+# Settings sections whose values change what (or how fast) a pipeline answers
+_FINGERPRINT_SECTIONS = ("db", "inference", "lexical", "rerank", "hyde_cache", "semantic_cache")
+
+
+def run_fingerprint(collections: Iterable[str], **options: Any) -> str:
+    """Short hash of the conditions a stored output depends on besides its mode and question.
+
+    Covers the LLM that would answer now, the retrieval, rerank and cache settings,
+    the indexed content of `collections` (their ingest manifests) and run `options`
+    such as cold caches. Outputs stored under another fingerprint are rerun.
+    """
+
+    settings = get_settings()
+    state = {
+        "llm_model": current_llm_model_id(),
+        "settings": {section: getattr(settings, section).model_dump() for section in _FINGERPRINT_SECTIONS},
+        "collections": {name: IngestManifest.for_collection(name).digest() for name in sorted(set(collections))},
+        "options": options,
+    }
+    return hashlib.sha256(json.dumps(state, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+
+
+def _run_one(mode: str, pipeline: Pipeline, question: str, reference: str, fingerprint: str = "") -> PipelineOutput:
+    output = PipelineOutput(mode=mode, question=question, reference=reference, fingerprint=fingerprint)
+    started = time.perf_counter()
+    with collect_stage_timings() as timings, collect_usage() as usage:
+        try:
+            output.answer, output.contexts = pipeline(question)
+        except Exception as exc:
+            logger.warning("Evaluation pipeline failed", extra={"mode": mode, "question": question}, exc_info=True)
+            output.error = f"{type(exc).__name__}: {exc}"
+    output.latency_ms = (time.perf_counter() - started) * 1000.0
+    output.timings = {stage: round(s * 1000.0, 3) for stage, s in timings.items()}
+    output.usage = dict(usage)
+    return output
+
+
+def run_pipelines(
+    qa_pairs: Sequence[Tuple[str, str]],
+    pipelines: Mapping[str, Pipeline],
+    store: ResultStore,
+    workers: Optional[int] = None,
+    fingerprint: str = "",
+) -> Dict[str, Dict[str, int]]:
+    """Run every pipeline on every QA pair not yet stored, `workers` at a time.
+
+    Outputs are checkpointed to `store` as they complete; pairs already stored
+    without error under the same `fingerprint` are skipped, so rerunning after a
+    crash resumes where it stopped (failed questions, and outputs from other run
+    conditions, are rerun). Returns per-mode counts of skipped, run and failed
+    questions.
+    """
+
+    workers = max(1, workers or get_settings().evaluation.workers)
+    counts: Dict[str, Dict[str, int]] = {mode: {"skipped": 0, "run": 0, "failed": 0} for mode in pipelines}
+    done = {mode: store.completed(mode, fingerprint) for mode in pipelines}
+    todo: List[Tuple[str, str, str]] = []
+    seen = set()
+    # Question-major order, so a partial run covers every mode equally
+    for question, reference in qa_pairs:
+        qid = question_id(question, reference)
+        if qid in seen:
+            continue
+        seen.add(qid)
+        for mode in pipelines:
+            if qid in done[mode]:
+                counts[mode]["skipped"] += 1
+            else:
+                todo.append((mode, question, reference))
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="eval")
+    try:
+        futures = [pool.submit(_run_one, mode, pipelines[mode], q, ref, fingerprint) for mode, q, ref in todo]
+        for future in as_completed(futures):
+            output = future.result()
+            store.put(output)
+            counts[output.mode]["failed" if output.error else "run"] += 1
+    finally:
+        # On interrupt drop the queued questions; everything finished is already stored
+        pool.shutdown(wait=True, cancel_futures=True)
+    return counts
+
+
+def _percentile(ordered: Sequence[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, max(0, int(math.ceil(q * len(ordered))) - 1))]
+
+
+def latency_report(outputs: Sequence[PipelineOutput]) -> Dict[str, Any]:
+    """Count, errors, mean and p50/p95/p99 latency (ms), mean ms per stage and mean
+    LLM calls, tokens and fallbacks per question."""
+
+    ok = [o for o in outputs if o.error is None]
+    report: Dict[str, Any] = {"questions": len(outputs), "errors": len(outputs) - len(ok)}
+    if not ok:
+        return report
+    ordered = sorted(o.latency_ms for o in ok)
+    report.update(
+        {
+            "mean_ms": round(sum(ordered) / len(ordered), 3),
+            "p50_ms": round(_percentile(ordered, 0.50), 3),
+            "p95_ms": round(_percentile(ordered, 0.95), 3),
+            "p99_ms": round(_percentile(ordered, 0.99), 3),
+        }
+    )
+    stages: Dict[str, float] = {}
+    for o in ok:
+        for stage, ms in o.timings.items():
+            stages[stage] = stages.get(stage, 0.0) + ms
+    report["stages_mean_ms"] = {stage: round(total / len(ok), 3) for stage, total in sorted(stages.items())}
+    usage: Dict[str, float] = {}
+    for o in ok:
+        for key, value in o.usage.items():
+            usage[key] = usage.get(key, 0.0) + value
+    report["usage_per_question"] = {key: round(total / len(ok), 3) for key, total in sorted(usage.items())}
+    return report
@@ -0,0 +1,139 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+
+def question_id(question: str, reference: str) -> str:
+    """Stable id of a QA pair, used to match stored outputs to a dataset."""
+
+    return hashlib.sha256(f"{question}\x1f{reference}".encode("utf-8")).hexdigest()
+
+
+@dataclass
+class PipelineOutput:
+    """One pipeline's output for one question.
+
+    `timings` holds milliseconds per pipeline stage and `usage` the LLM calls,
+    tokens and fallbacks counted by `collect_usage`; `error` is set (and `answer`
+    empty) when the pipeline raised. `fingerprint` identifies the run conditions
+    (see `run_fingerprint`) the output was produced under.
+    """
+
+    mode: str
+    question: str
+    reference: str
+    answer: str = ""
+    contexts: List[str] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    latency_ms: float = 0.0
+    error: Optional[str] = None
+    usage: Dict[str, float] = field(default_factory=dict)
+    fingerprint: str = ""
+
+    @property
+    def question_id(self) -> str:
+        return question_id(self.question, self.reference)
+
+
+class ResultStore:
+    """SQLite checkpoint of pipeline outputs keyed by `(mode, question_id)`.
+
+    Each output is committed as soon as it is stored, so an interrupted run loses
+    at most the questions in flight. `path=None` keeps the store in memory.
+    """
+
+    def __init__(self, path: Optional[str | Path] = None) -> None:
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        if self.path is not None:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path) if self.path else ":memory:", check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS outputs ("
+            " mode TEXT NOT NULL, question_id TEXT NOT NULL, question TEXT NOT NULL, reference TEXT NOT NULL,"
+            " answer TEXT NOT NULL, contexts TEXT NOT NULL, timings TEXT NOT NULL, latency_ms REAL NOT NULL,"
+            " error TEXT, created_at REAL NOT NULL, usage TEXT NOT NULL DEFAULT '{}',"
+            " fingerprint TEXT NOT NULL DEFAULT '',"
+            " PRIMARY KEY (mode, question_id))"
+        )
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(outputs)")}
+        # Stores written before usage and run fingerprints were recorded
+        if "usage" not in columns:
+            self._db.execute("ALTER TABLE outputs ADD COLUMN usage TEXT NOT NULL DEFAULT '{}'")
+        if "fingerprint" not in columns:
+            self._db.execute("ALTER TABLE outputs ADD COLUMN fingerprint TEXT NOT NULL DEFAULT ''")
+        self._db.commit()
+
+    def put(self, output: PipelineOutput) -> None:
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO outputs"
+                " (mode, question_id, question, reference, answer, contexts, timings, latency_ms, error, created_at, usage,"
+                " fingerprint) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    output.mode,
+                    output.question_id,
+                    output.question,
+                    output.reference,
+                    output.answer,
+                    json.dumps(output.contexts),
+                    json.dumps(output.timings),
+                    output.latency_ms,
+                    output.error,
+                    time.time(),
+                    json.dumps(output.usage),
+                    output.fingerprint,
+                ),
+            )
+            self._db.commit()
+
+    def completed(self, mode: str, fingerprint: str = "") -> Set[str]:
+        """Question ids with a successful stored output for `mode` produced under `fingerprint`."""
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT question_id FROM outputs WHERE mode = ? AND error IS NULL AND fingerprint = ?", (mode, fingerprint)
+            ).fetchall()
+        return {qid for (qid,) in rows}
+
+    def outputs(self, mode: str, question_ids: Optional[Iterable[str]] = None) -> List[PipelineOutput]:
+        """Stored outputs for `mode`, restricted to `question_ids` (in that order) when given."""
+
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT question_id, question, reference, answer, contexts, timings, latency_ms, error, usage, fingerprint"
+                " FROM outputs WHERE mode = ? ORDER BY created_at",
+                (mode,),
+            ).fetchall()
+        by_id = {
+            qid: PipelineOutput(
+                mode, q, ref, answer, json.loads(ctx), json.loads(timings), latency, error, json.loads(usage), fingerprint
+            )
+            for qid, q, ref, answer, ctx, timings, latency, error, usage, fingerprint in rows
+        }
+        if question_ids is None:
+            return list(by_id.values())
+        return [by_id[qid] for qid in question_ids if qid in by_id]
+
+    def modes(self) -> List[str]:
+        with self._lock:
+            return [m for (m,) in self._db.execute("SELECT DISTINCT mode FROM outputs ORDER BY mode").fetchall()]
+
+    def clear(self, mode: Optional[str] = None) -> None:
+        with self._lock:
+            if mode is None:
+                self._db.execute("DELETE FROM outputs")
+            else:
+                self._db.execute("DELETE FROM outputs WHERE mode = ?", (mode,))
+            self._db.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
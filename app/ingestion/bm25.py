@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import json
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from app.core.config import get_settings
+from app.ingestion.manifest import store_root
+
+
+_TOKEN = re.compile(r"[^\W_]+(?:[-_./][^\W_]+)*")
+_SEPARATORS = re.compile(r"[-_./]")
+
+# (id, document, metadata, score)
+LexicalHit = Tuple[str, str, Dict[str, Any], float]
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms for indexing and querying.
+
+    Compound codes such as `ERR-1042` or `sku_12.b` are kept whole, so exact
+    identifiers match precisely, and their parts are emitted as well.
+    """
+
+    terms: List[str] = []
+    for match in _TOKEN.finditer(text.lower()):
+        token = match.group(0)
+        terms.append(token)
+        if not token.isalnum():
+            terms.extend(part for part in _SEPARATORS.split(token) if part)
+    return terms
+
+
+class BM25Index:
+    """Okapi BM25 over an on-disk inverted index (SQLite postings table).
+
+    Built incrementally alongside the vector store: `add` indexes new items and
+    `delete_sources` drops every item of the given sources. Corpus statistics
+    (document count, total length) are maintained on write, so a query only reads
+    the postings of its own terms.
+    """
+
+    def __init__(self, path: Path, k1: float = 1.2, b: float = 0.75) -> None:
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS docs ("
+            " id TEXT PRIMARY KEY, source TEXT, length INTEGER NOT NULL, document TEXT NOT NULL, metadata TEXT NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS docs_source ON docs (source);"
+            "CREATE TABLE IF NOT EXISTS postings ("
+            " term TEXT NOT NULL, doc_id TEXT NOT NULL, tf INTEGER NOT NULL, PRIMARY KEY (term, doc_id)) WITHOUT ROWID;"
+            "CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_id);"
+            "CREATE TABLE IF NOT EXISTS stats (key TEXT PRIMARY KEY, value INTEGER NOT NULL);"
+        )
+        self._db.commit()
+
+    def _stat(self, key: str) -> int:
+        row = self._db.execute("SELECT value FROM stats WHERE key = ?", (key,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _bump(self, docs: int, length: int) -> None:
+        for key, delta in (("docs", docs), ("length", length)):
+            self._db.execute(
+                "INSERT INTO stats (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = value + excluded.value",
+                (key, delta),
+            )
+
+    def _remove(self, where_sql: str, params: Sequence[Any]) -> None:
+        row = self._db.execute(f"SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs WHERE {where_sql}", params).fetchone()
+        if not row[0]:
+            return
+        self._db.execute(f"DELETE FROM postings WHERE doc_id IN (SELECT id FROM docs WHERE {where_sql})", params)
+        self._db.execute(f"DELETE FROM docs WHERE {where_sql}", params)
+        self._bump(-int(row[0]), -int(row[1]))
+
+    def add(self, ids: List[str], texts: List[str], documents: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Index `texts` under `ids`; `documents`/`metadatas` are what a hit returns.
+
+        Existing ids are replaced.
+        """
+
+        with self._lock:
+            placeholders = ",".join("?" * len(ids))
+            if ids:
+                self._remove(f"id IN ({placeholders})", ids)
+            postings: List[Tuple[str, str, int]] = []
+            rows: List[Tuple[str, Optional[str], int, str, str]] = []
+            total = 0
+            for item_id, text, document, meta in zip(ids, texts, documents, metadatas):
+                terms = tokenize(text)
+                total += len(terms)
+                rows.append((item_id, meta.get("source"), len(terms), document, json.dumps(meta)))
+                postings.extend((term, item_id, tf) for term, tf in Counter(terms).items())
+            self._db.executemany("INSERT OR REPLACE INTO docs VALUES (?, ?, ?, ?, ?)", rows)
+            self._db.executemany("INSERT OR REPLACE INTO postings VALUES (?, ?, ?)", postings)
+            self._bump(len(rows), total)
+            self._db.commit()
+
+    def delete_sources(self, sources: Sequence[str]) -> None:
+        if not sources:
+            return
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(sources), 500):
+                group = list(sources[start : start + 500])
+                self._remove(f"source IN ({','.join('?' * len(group))})", group)
+            self._db.commit()
+
+    def search(self, query: str, k: int = 10) -> List[LexicalHit]:
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms or k <= 0:
+            return []
+        with self._lock:
+            num_docs = self._stat("docs")
+            if num_docs == 0:
+                return []
+            avgdl = max(1.0, self._stat("length") / num_docs)
+            placeholders = ",".join("?" * len(terms))
+            postings = self._db.execute(
+                f"SELECT p.term, p.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.id = p.doc_id"
+                f" WHERE p.term IN ({placeholders})",
+                terms,
+            ).fetchall()
+            df = Counter(term for term, _doc, _tf, _len in postings)
+            scores: Dict[str, float] = {}
+            for term, doc_id, tf, length in postings:
+                idf = math.log(1.0 + (num_docs - df[term] + 0.5) / (df[term] + 0.5))
+                norm = tf + self.k1 * (1.0 - self.b + self.b * length / avgdl)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1.0) / norm
+            top = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+            if not top:
+                return []
+            found = {
+                row[0]: row
+                for row in self._db.execute(
+                    f"SELECT id, document, metadata FROM docs WHERE id IN ({','.join('?' * len(top))})",
+                    [doc_id for doc_id, _s in top],
+                )
+            }
+        return [(doc_id, found[doc_id][1], json.loads(found[doc_id][2]), score) for doc_id, score in top]
+
+    def count(self) -> int:
+        with self._lock:
+            return self._stat("docs")
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_indexes: Dict[str, BM25Index] = {}
+_indexes_lock = threading.Lock()
+
+
+def bm25_path(collection_name: str) -> Path:
+    return store_root() / "bm25" / f"{collection_name}.sqlite3"
+
+
+def get_bm25_index(collection_name: str) -> Optional[BM25Index]:
+    """Return the lexical index of `collection_name`, or None when disabled."""
+
+    cfg = get_settings().lexical
+    if not cfg.enabled:
+        return None
+    path = bm25_path(collection_name)
+    key = str(path)
+    index = _indexes.get(key)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.get(key)
+            if index is None:
+                index = BM25Index(path, k1=cfg.k1, b=cfg.b)
+                _indexes[key] = index
+    return index
+
+
+def drop_bm25_index(collection_name: str) -> None:
+    path = bm25_path(collection_name)
+    with _indexes_lock:
+        index = _indexes.pop(str(path), None)
+        if index is not None:
+            index.close()
+        path.unlink(missing_ok=True)
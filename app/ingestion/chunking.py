@@ -0,0 +1,168 @@
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from typing import Callable, Iterator, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import count_fallback
+
+
+logger = logging.getLogger(__name__)
+
+# Maps text to the `(n, 2)` int64 character spans of its tokens
+TokenSpans = Callable[[str], np.ndarray]
+
+_WORD_TOKEN = re.compile(r"\w+|[^\w\s]")
+_PARAGRAPH_BREAK = re.compile(r"\n[ \t]*\n")
+_SENTENCE_BREAK = re.compile(r"[\.!?][\"')\]]*(\s)")
+_WHITESPACE = re.compile(r"\s+")
+
+_tokenizer: Optional[Tuple[str, TokenSpans, Optional[int]]] = None
+_tokenizer_lock = threading.Lock()
+
+
+def word_token_spans(text: str) -> np.ndarray:
+    """Words and punctuation marks as tokens; used when no model tokenizer loads."""
+
+    return np.fromiter(
+        (offset for m in _WORD_TOKEN.finditer(text) for offset in m.span()), dtype=np.int64
+    ).reshape(-1, 2)
+
+
+def _tiktoken_spans(encoding_name: str) -> TokenSpans:
+    import tiktoken
+
+    encoding = tiktoken.get_encoding(encoding_name)
+
+    def spans(text: str) -> np.ndarray:
+        tokens = encoding.encode(text, disallowed_special=())
+        # Offsets are in characters; a multi-byte character split across tokens
+        # maps every part to the character's start, which keeps spans ordered
+        _decoded, starts = encoding.decode_with_offsets(tokens)
+        starts_arr = np.asarray(starts, dtype=np.int64)
+        ends = np.append(starts_arr[1:], len(text)) if len(starts_arr) else starts_arr
+        return np.stack([starts_arr, ends], axis=1) if len(starts_arr) else np.zeros((0, 2), dtype=np.int64)
+
+    return spans
+
+
+def _load_tokenizer(name: str) -> Tuple[TokenSpans, Optional[int]]:
+    if name == "embedding":
+        from app.retrieval.registry import get_embedding_model
+
+        model = get_embedding_model()
+        if hasattr(model, "token_spans"):
+            return model.token_spans, model.max_tokens
+        raise TypeError(f"{type(model).__name__} does not expose a tokenizer")
+    return _tiktoken_spans(name), None
+
+
+def get_chunk_tokenizer() -> Tuple[TokenSpans, Optional[int]]:
+    """`(token_spans, max_tokens)` for `ingestion.chunk_tokenizer`.
+
+    "embedding" uses the embedding model's own tokenizer and caps chunks at its
+    maximum sequence length; any other value names a tiktoken encoding. If the
+    tokenizer cannot be loaded, chunks are measured in words and punctuation.
+    """
+
+    global _tokenizer
+    name = get_settings().ingestion.chunk_tokenizer
+    loaded = _tokenizer
+    if loaded is not None and loaded[0] == name:
+        return loaded[1], loaded[2]
+    with _tokenizer_lock:
+        if _tokenizer is None or _tokenizer[0] != name:
+            try:
+                spans, max_tokens = _load_tokenizer(name)
+            except Exception:
+                logger.warning("Chunk tokenizer unavailable, counting words instead", extra={"tokenizer": name}, exc_info=True)
+                count_fallback("chunk_tokenizer")
+                spans, max_tokens = word_token_spans, None
+            _tokenizer = (name, spans, max_tokens)
+        return _tokenizer[1], _tokenizer[2]
+
+
+def _breaks(pattern: re.Pattern, text: str, token_starts: np.ndarray) -> np.ndarray:
+    """Token indices at which a chunk may start: the first token at or after the
+    whitespace of each match. Tokenizers that fold leading whitespace into the
+    next token (tiktoken) and ones that drop it (WordPiece) both land on the token
+    that begins the next word."""
+
+    positions = np.fromiter((m.start(m.lastindex or 0) for m in pattern.finditer(text)), dtype=np.int64)
+    found = np.unique(np.searchsorted(token_starts, positions))
+    return found[(found > 0) & (found < len(token_starts))]
+
+
+def iter_chunk_spans(
+    text: str,
+    chunk_tokens: int = 256,
+    chunk_overlap: int = 32,
+    token_spans: Optional[TokenSpans] = None,
+    max_tokens: Optional[int] = None,
+) -> Iterator[Tuple[int, int]]:
+    """Yield character `(start, end)` spans of chunks of at most `chunk_tokens` tokens.
+
+    A chunk ends at the last paragraph break that keeps it at least half full,
+    else at the last sentence break, else at the last word boundary, else at the
+    token limit. Consecutive chunks overlap by up to `chunk_overlap` tokens
+    (at most a quarter chunk), starting on a sentence or word boundary where one
+    exists. Every step advances by at least a quarter chunk, so the text is
+    tokenized once and chunked in linear time. `max_tokens` (the model's sequence
+    limit) caps `chunk_tokens`. Spans exclude surrounding whitespace.
+    """
+
+    spans = (token_spans or get_chunk_tokenizer()[0])(text)
+    n = len(spans)
+    if n == 0:
+        return
+    size = max(1, chunk_tokens if max_tokens is None else min(chunk_tokens, max_tokens))
+    overlap = min(max(0, chunk_overlap), size // 4)
+    min_fill = max(1, size // 2)
+
+    starts = spans[:, 0]
+    paragraph = _breaks(_PARAGRAPH_BREAK, text, starts)
+    sentence = _breaks(_SENTENCE_BREAK, text, starts)
+    words = _breaks(_WHITESPACE, text, starts)
+
+    def last_break(candidates: np.ndarray, lo: int, hi: int) -> int:
+        # Largest candidate in [lo, hi], or -1
+        j = int(np.searchsorted(candidates, hi, side="right")) - 1
+        return int(candidates[j]) if j >= 0 and candidates[j] >= lo else -1
+
+    def first_break(candidates: np.ndarray, lo: int, hi: int) -> int:
+        # Smallest candidate in [lo, hi), or -1
+        j = int(np.searchsorted(candidates, lo, side="left"))
+        return int(candidates[j]) if j < len(candidates) and candidates[j] < hi else -1
+
+    begin = 0
+    while begin < n:
+        limit = begin + size
+        if limit >= n:
+            end = n
+        else:
+            end = -1
+            for candidates in (paragraph, sentence, words):
+                end = last_break(candidates, begin + min_fill, limit)
+                if end > 0:
+                    break
+            if end <= begin:
+                end = limit
+        char_start, char_end = int(spans[begin, 0]), int(spans[end - 1, 1])
+        piece = text[char_start:char_end]
+        stripped = piece.strip()
+        if stripped:
+            lead = len(piece) - len(piece.lstrip())
+            yield char_start + lead, char_start + lead + len(stripped)
+        if end >= n:
+            return
+        lo = max(begin + 1, end - overlap)
+        nxt = -1
+        for candidates in (sentence, words):
+            nxt = first_break(candidates, lo, end)
+            if nxt > 0:
+                break
+        begin = nxt if nxt > 0 and overlap else (lo if overlap else end)
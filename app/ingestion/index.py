@@ -1,87 +1,317 @@
 from __future__ import annotations
 
+import shutil
+import threading
 import uuid
 from pathlib import Path
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, List, Optional, Tuple
 
 import chromadb
-from chromadb.api.types import Documents, Embeddings, IDs, Metadatas
+import numpy as np
+from chromadb.api.types import Documents, Embeddings, Metadatas
 
 from app.core.config import get_settings
-from app.retrieval.embeddings import EmbeddingModel
+from app.core.metrics import span, timed
+from app.ingestion.bm25 import drop_bm25_index, get_bm25_index
+from app.ingestion.manifest import IngestManifest
+from app.ingestion.sentence_store import drop_sentence_store, expand_windows, get_sentence_store
+from app.ingestion.vector_store import Hit, LocalVectorStore, VectorStore, Where
+from app.retrieval.registry import get_embedding_model, get_query_embedder
+from app.retrieval.semantic_cache import invalidate_semantic_cache
 
 
 DEFAULT_BASELINE_COLLECTION = "baseline"
 SENTENCE_WINDOW_COLLECTION = "sentence_window"
 
 
+# Long-lived client per persist directory and collection handles per (path, name).
+# Opening the SQLite-backed store is comparatively expensive, so handles are reused
+# across requests and only dropped when a collection is deleted or recreated.
+_clients: Dict[str, chromadb.ClientAPI] = {}
+_collections: Dict[Tuple[str, str], chromadb.Collection] = {}
+_stores: Dict[Tuple[str, str, str], VectorStore] = {}
+_handles_lock = threading.Lock()
+
+
+def _persist_dir() -> str:
+    return str(Path(get_settings().db.chroma_path))
+
+
+def get_chroma_client():
+    """Return the process-wide Chroma client for the configured persist directory."""
+
+    path = _persist_dir()
+    client = _clients.get(path)
+    if client is not None:
+        return client
+    with _handles_lock:
+        client = _clients.get(path)
+        if client is None:
+            Path(path).mkdir(parents=True, exist_ok=True)
+            client = chromadb.PersistentClient(path=path)
+            _clients[path] = client
+    return client
+
+
 def get_chroma_collection(name: str = DEFAULT_BASELINE_COLLECTION):
-    settings = get_settings()
-    persist_dir = Path(settings.db.chroma_path)
-    persist_dir.mkdir(parents=True, exist_ok=True)
-    client = chromadb.PersistentClient(path=str(persist_dir))
-    collection = client.get_or_create_collection(name=name)
+    """Return a cached handle for collection `name`, creating it if needed."""
+
+    key = (_persist_dir(), name)
+    collection = _collections.get(key)
+    if collection is not None:
+        return collection
+    client = get_chroma_client()
+    with _handles_lock:
+        collection = _collections.get(key)
+        if collection is None:
+            collection = client.get_or_create_collection(name=name)
+            _collections[key] = collection
     return collection
 
 
+class ChromaVectorStore(VectorStore):
+    """`VectorStore` adapter over a Chroma collection."""
+
+    def __init__(self, collection) -> None:
+        self.collection = collection
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        self.collection.upsert(ids=ids, documents=documents, metadatas=metadatas, embeddings=embeddings)
+
+    def delete(self, where: Where) -> None:
+        self.collection.delete(where=where)
+
+    def query(self, embeddings: np.ndarray, k: int, where: Optional[Where] = None) -> List[List[Hit]]:
+        results = self.collection.query(
+            query_embeddings=embeddings, n_results=k, where=where, include=["documents", "metadatas", "distances"]
+        )
+        empty = [[] for _ in range(len(embeddings))]
+        all_docs = results.get("documents") or empty
+        all_metas = results.get("metadatas") or empty
+        all_dists = results.get("distances") or empty
+        return [list(zip(docs, metas, dists)) for docs, metas, dists in zip(all_docs, all_metas, all_dists)]
+
+    def count(self) -> int:
+        return self.collection.count()
+
+
+def _store_key(name: str) -> Tuple[str, str, str]:
+    db = get_settings().db
+    if db.backend == "chroma":
+        return db.backend, _persist_dir(), name
+    return db.backend, str(Path(db.store_path)), name
+
+
+def get_vector_store(name: str = DEFAULT_BASELINE_COLLECTION) -> VectorStore:
+    """Return the cached store for collection `name` on the configured backend."""
+
+    key = _store_key(name)
+    store = _stores.get(key)
+    if store is not None:
+        return store
+    if key[0] == "chroma":
+        collection = get_chroma_collection(name)
+        with _handles_lock:
+            store = _stores.setdefault(key, ChromaVectorStore(collection))
+        return store
+    if key[0] not in ("exact", "hnsw"):
+        raise ValueError(f"Unknown vector store backend: {key[0]}")
+    db = get_settings().db
+    with _handles_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = LocalVectorStore(
+                Path(key[1]) / name,
+                mode=key[0],
+                hnsw_m=db.hnsw_m,
+                hnsw_ef_construction=db.hnsw_ef_construction,
+                hnsw_ef_search=db.hnsw_ef_search,
+            )
+            _stores[key] = store
+    return store
+
+
+def flush_collection(name: str) -> None:
+    """Persist deferred state of collection `name` (e.g. the HNSW graph)."""
+
+    get_vector_store(name).flush()
+
+
+def invalidate_collection_cache(name: Optional[str] = None) -> None:
+    """Forget cached collection handles, either for `name` or for all collections."""
+
+    with _handles_lock:
+        stores = [k for k in _stores if name is None or k[2] == name]
+        for key in stores:
+            _stores.pop(key).close()
+        if name is None:
+            _collections.clear()
+            return
+        for key in [k for k in _collections if k[1] == name]:
+            del _collections[key]
+
+
+def drop_collection(name: str) -> None:
+    """Delete collection `name` from the configured store and invalidate its cached handle."""
+
+    key = _store_key(name)
+    if key[0] == "chroma":
+        client = get_chroma_client()
+        path = _persist_dir()
+        with _handles_lock:
+            _collections.pop((path, name), None)
+            _stores.pop(key, None)
+            try:
+                client.delete_collection(name=name)
+            except Exception:
+                # Deleting a collection that does not exist is not an error for callers
+                pass
+    else:
+        with _handles_lock:
+            store = _stores.pop(key, None)
+        if store is not None:
+            store.destroy()
+        else:
+            shutil.rmtree(Path(key[1]) / name, ignore_errors=True)
+    drop_bm25_index(name)
+    drop_sentence_store(name)
+    IngestManifest.for_collection(name).clear()
+    invalidate_semantic_cache(name)
+
+
+def reset_collection(name: str):
+    """Drop and recreate collection `name`, returning the fresh handle."""
+
+    drop_collection(name)
+    if get_settings().db.backend == "chroma":
+        return get_chroma_collection(name)
+    return get_vector_store(name)
+
+
+def _as_matrix(vectors) -> np.ndarray:
+    """View `vectors` (an array, or lists from older callers) as a float32 `(n, dim)` matrix."""
+
+    matrix = np.asarray(vectors, dtype=np.float32)
+    return matrix.reshape(1, -1) if matrix.ndim == 1 else matrix
+
+
 def index_items(
     documents: List[str],
     metadatas: List[Dict[str, str]],
-    embeddings: Optional[List[List[float]]] = None,
+    embeddings: Optional[np.ndarray] = None,
     *,
     collection_name: str = DEFAULT_BASELINE_COLLECTION,
+    ids: Optional[List[str]] = None,
+    lexical_texts: Optional[List[str]] = None,
 ) -> Tuple[int, int]:
-    collection = get_chroma_collection(collection_name)
+    """Embed (if needed) and store items.
+
+    With explicit deterministic `ids` items are upserted, so re-indexing the same
+    content is idempotent; otherwise random ids are generated. Embeddings are
+    handed to the store as one float32 matrix. The BM25 index (when enabled) is
+    updated with `lexical_texts`, defaulting to the documents themselves.
+    """
+
+    store = get_vector_store(collection_name)
     if not documents:
         return 0, 0
 
-    ids: IDs = [uuid.uuid4().hex for _ in documents]
     if embeddings is None:
-        embedder = EmbeddingModel()
-        embeddings = embedder.embed(list(documents))
+        with span("index.embed"):
+            embeddings = get_embedding_model().embed(list(documents), cache=True)
+    embeddings = _as_matrix(embeddings)
 
-    collection.add(documents=documents, metadatas=metadatas, ids=ids, embeddings=embeddings)
+    if ids is None:
+        ids = [uuid.uuid4().hex for _ in documents]
+    with span("index.write"):
+        store.upsert(list(ids), list(documents), list(metadatas), embeddings)
+        lexical = get_bm25_index(collection_name)
+        if lexical is not None:
+            lexical.add(list(ids), list(lexical_texts or documents), list(documents), list(metadatas))
+    invalidate_semantic_cache(collection_name)
     num_docs = len({m.get("source", str(i)) for i, m in enumerate(metadatas)})
     return num_docs, len(documents)
 
 
-def index_chunks(chunks: List[Tuple[str, Dict[str, str]]], *, collection_name: str = DEFAULT_BASELINE_COLLECTION) -> Tuple[int, int]:
+def index_chunks(
+    chunks: List[Tuple[str, Dict[str, str]]],
+    *,
+    collection_name: str = DEFAULT_BASELINE_COLLECTION,
+    ids: Optional[List[str]] = None,
+) -> Tuple[int, int]:
     documents: Documents = []
     metadatas: Metadatas = []
     for text, meta in chunks:
         documents.append(text)
         metadatas.append(meta)
 
-    return index_items(documents, metadatas, embeddings=None, collection_name=collection_name)
+    return index_items(documents, metadatas, embeddings=None, collection_name=collection_name, ids=ids)
+
+
+def delete_sources(sources: List[str], *, collection_name: str = DEFAULT_BASELINE_COLLECTION) -> None:
+    """Remove every stored item whose `source` metadata is one of `sources`."""
+
+    if not sources:
+        return
+    where = {"source": sources[0]} if len(sources) == 1 else {"source": {"$in": list(sources)}}
+    get_vector_store(collection_name).delete(where)
+    lexical = get_bm25_index(collection_name)
+    if lexical is not None:
+        lexical.delete_sources(sources)
+    sentences = get_sentence_store(collection_name, create=False)
+    if sentences is not None:
+        sentences.delete_sources(sources)
+    invalidate_semantic_cache(collection_name)
 
 
-def query_top_k(question: str, k: int = 5, *, collection_name: str = DEFAULT_BASELINE_COLLECTION) -> List[Tuple[str, Dict[str, str], float]]:
-    collection = get_chroma_collection(collection_name)
-    embedder = EmbeddingModel()
-    qvec = embedder.embed_one(question)
-    results = collection.query(query_embeddings=[qvec], n_results=k, include=["documents", "metadatas", "distances"])
+Retrieved = List[Tuple[str, Dict[str, str], float]]
 
-    docs = results.get("documents", [[]])[0]
-    metas = results.get("metadatas", [[]])[0]
-    dists = results.get("distances", [[]])[0]
 
-    scored = []
-    for text, meta, dist in zip(docs, metas, dists):
-        score = float(1.0 / (1.0 + dist)) if dist is not None else None
-        scored.append((text, meta, score if score is not None else 0.0))
-    return scored
+def query_top_k(
+    question: str, k: int = 5, *, collection_name: str = DEFAULT_BASELINE_COLLECTION, window_size: Optional[int] = None
+) -> Retrieved:
+    qvec = get_query_embedder().embed_one(question)
+    return query_top_k_many(qvec, k=k, collection_name=collection_name, window_size=window_size)[0]
 
 
-def query_top_k_with_embedding(query_embedding: List[float], k: int = 5, *, collection_name: str = DEFAULT_BASELINE_COLLECTION) -> List[Tuple[str, Dict[str, str], float]]:
-    collection = get_chroma_collection(collection_name)
-    results = collection.query(query_embeddings=[query_embedding], n_results=k, include=["documents", "metadatas", "distances"])
+def query_top_k_with_embedding(
+    query_embedding: np.ndarray,
+    k: int = 5,
+    *,
+    collection_name: str = DEFAULT_BASELINE_COLLECTION,
+    window_size: Optional[int] = None,
+) -> Retrieved:
+    return query_top_k_many(query_embedding, k=k, collection_name=collection_name, window_size=window_size)[0]
+
+
+@timed("vector.query")
+def query_top_k_many(
+    query_embeddings: np.ndarray,
+    k: int = 5,
+    *,
+    collection_name: str = DEFAULT_BASELINE_COLLECTION,
+    window_size: Optional[int] = None,
+) -> List[Retrieved]:
+    """Top-k results for each row of `query_embeddings`, in one store round trip.
 
-    docs = results.get("documents", [[]])[0]
-    metas = results.get("metadatas", [[]])[0]
-    dists = results.get("distances", [[]])[0]
+    Compact sentence-window hits come back as their window text; `window_size`
+    overrides the ingest-time window.
+    """
 
-    scored = []
-    for text, meta, dist in zip(docs, metas, dists):
-        score = float(1.0 / (1.0 + dist)) if dist is not None else None
-        scored.append((text, meta, score if score is not None else 0.0))
-    return scored
+    matrix = _as_matrix(query_embeddings)
+    batches: List[Retrieved] = []
+    for hits in get_vector_store(collection_name).query(matrix, k):
+        scored = []
+        for text, meta, dist in hits:
+            score = float(1.0 / (1.0 + dist)) if dist is not None else None
+            scored.append((text, meta, score if score is not None else 0.0))
+        batches.append(scored)
+    # Gather the windows of every query's hits together
+    with span("window.expand"):
+        flat = expand_windows([hit for hits in batches for hit in hits], collection_name, window_size)
+    out: List[Retrieved] = []
+    offset = 0
+    for hits in batches:
+        out.append(flat[offset : offset + len(hits)])
+        offset += len(hits)
+    return out
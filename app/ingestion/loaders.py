@@ -1,24 +1,89 @@
 from __future__ import annotations
 
+import bisect
+import logging
+import multiprocessing
 import os
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, Iterable, List, Tuple
+from typing import Callable, Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 
 from pypdf import PdfReader
 
+from app.core.config import get_settings
+
+try:
+    import pymupdf
+except Exception:  # pragma: no cover
+    pymupdf = None  # type: ignore
+
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
 
 def _read_text_file(path: Path) -> str:
     with path.open("r", encoding="utf-8", errors="ignore") as f:
         return f.read()
 
 
-def _read_pdf_file(path: Path) -> str:
+def _pdf_pages_pymupdf(path: Path, start: int, stop: Optional[int]) -> List[str]:
+    with pymupdf.open(str(path)) as doc:
+        stop = doc.page_count if stop is None else min(stop, doc.page_count)
+        return [doc.load_page(i).get_text() for i in range(start, stop)]
+
+
+def _pdf_pages_pypdf(path: Path, start: int, stop: Optional[int]) -> List[str]:
     reader = PdfReader(str(path))
-    texts: List[str] = []
-    for page in reader.pages:
-        content = page.extract_text() or ""
-        texts.append(content)
-    return "\n".join(texts)
+    pages = reader.pages[start:stop]
+    return [page.extract_text() or "" for page in pages]
+
+
+PDF_BACKENDS: Dict[str, Callable[[Path, int, Optional[int]], List[str]]] = {
+    "pymupdf": _pdf_pages_pymupdf,
+    "pypdf": _pdf_pages_pypdf,
+}
+
+
+def _resolve_pdf_backend(backend: Optional[str]) -> str:
+    name = backend or get_settings().ingestion.pdf_backend
+    if name == "pymupdf" and pymupdf is None:
+        return "pypdf"
+    if name not in PDF_BACKENDS:
+        raise ValueError(f"Unknown PDF backend: {name}")
+    return name
+
+
+def extract_pdf_pages(path: Path, start: int = 0, stop: Optional[int] = None, backend: Optional[str] = None) -> List[str]:
+    """Return the text of pages `[start, stop)` of a PDF, one string per page.
+
+    PyMuPDF is used by default; pypdf is used when PyMuPDF is unavailable or
+    fails on the file.
+    """
+
+    name = _resolve_pdf_backend(backend)
+    if name != "pypdf":
+        try:
+            return PDF_BACKENDS[name](path, start, stop)
+        except Exception:
+            logger.warning("PDF extraction failed; falling back to pypdf", extra={"path": str(path), "backend": name})
+    return _pdf_pages_pypdf(path, start, stop)
+
+
+def pdf_page_count(path: Path, backend: Optional[str] = None) -> int:
+    if _resolve_pdf_backend(backend) == "pymupdf":
+        try:
+            with pymupdf.open(str(path)) as doc:
+                return doc.page_count
+        except Exception:
+            pass
+    return len(PdfReader(str(path)).pages)
+
+
+def _read_pdf_file(path: Path) -> str:
+    return "\n".join(extract_pdf_pages(path))
 
 
 def discover_documents(paths: List[str] | None) -> List[Path]:
@@ -34,30 +99,139 @@ def discover_documents(paths: List[str] | None) -> List[Path]:
     return collected
 
 
+def load_document_pages(path: Path) -> List[str]:
+    """Extract the text of a supported file as a list of pages.
+
+    PDFs yield one entry per page; text files are a single page. Unsupported types
+    yield [].
+    """
+
+    if path.suffix.lower() in (".txt", ".md"):
+        return [_read_text_file(path)]
+    if path.suffix.lower() == ".pdf":
+        return extract_pdf_pages(path)
+    return []
+
+
+def load_document(path: Path) -> str:
+    """Extract the text of a single supported file; unsupported types yield ''."""
+
+    return "\n".join(load_document_pages(path))
+
+
+def join_pages(pages: List[str]) -> Tuple[str, List[int]]:
+    """Join page texts with newlines, returning the text and each page's start offset."""
+
+    offsets: List[int] = []
+    position = 0
+    for page in pages:
+        offsets.append(position)
+        position += len(page) + 1
+    return "\n".join(pages), offsets
+
+
+def page_at(offsets: List[int], char_offset: int) -> int:
+    """1-based page number containing `char_offset`, given `join_pages` offsets."""
+
+    return max(1, bisect.bisect_right(offsets, char_offset))
+
+
+_Pending = Union[List[str], "Future[List[str]]"]
+
+
+def iter_load_documents(
+    paths: Iterable[Path], max_workers: int = 0, prefetch: int = 0
+) -> Iterator[Tuple[Path, List[str]]]:
+    """Yield `(path, pages)` in input order while extracting PDFs in a process pool.
+
+    At most `prefetch` documents (default: twice the worker count) are loaded ahead of
+    the consumer, so memory is bounded by the window rather than by corpus size.
+    PDFs with at least `ingestion.pdf_parallel_min_pages` pages are split into page
+    ranges extracted in parallel. Text files are read inline; they are cheap compared
+    to PDF extraction.
+    """
+
+    cfg = get_settings().ingestion
+    workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+    window = prefetch if prefetch > 0 else workers * 2
+    pool: Optional[ProcessPoolExecutor] = None
+    pending: Deque[Tuple[Path, List[_Pending]]] = deque()
+
+    def submit_pdf(path: Path) -> List[_Pending]:
+        nonlocal pool
+        if pool is None:
+            # spawn: forking a process that already runs torch/uvicorn threads can deadlock
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        backend = _resolve_pdf_backend(None)
+        try:
+            count = pdf_page_count(path, backend)
+        except Exception:
+            count = 0
+        if count < max(1, cfg.pdf_parallel_min_pages):
+            return [pool.submit(load_document_pages, path)]
+        step = max(1, cfg.pdf_pages_per_task)
+        return [pool.submit(extract_pdf_pages, path, i, i + step, backend) for i in range(0, count, step)]
+
+    def resolve(item: Tuple[Path, List[_Pending]]) -> Tuple[Path, List[str]]:
+        path, parts = item
+        pages: List[str] = []
+        for part in parts:
+            pages.extend(part if isinstance(part, list) else part.result())
+        return path, pages
+
+    try:
+        for path in paths:
+            if path.suffix.lower() == ".pdf" and workers > 1:
+                pending.append((path, submit_pdf(path)))
+            else:
+                pending.append((path, [load_document_pages(path)]))
+            while len(pending) >= window:
+                yield resolve(pending.popleft())
+        while pending:
+            yield resolve(pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_batches(items: Iterable[T], batch_size: int) -> Iterator[List[T]]:
+    """Group a stream into lists of at most `batch_size` items."""
+
+    batch: List[T] = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
 def load_documents(paths: List[str] | None) -> List[Tuple[str, Dict[str, str]]]:
     docs: List[Tuple[str, Dict[str, str]]] = []
     for path in discover_documents(paths):
-        text = ""
-        if path.suffix.lower() in (".txt", ".md"):
-            text = _read_text_file(path)
-        elif path.suffix.lower() == ".pdf":
-            text = _read_pdf_file(path)
+        text = load_document(path)
         if text.strip():
             docs.append((text, {"source": str(path)}))
     return docs
 
 
-def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+def chunk_spans(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Tuple[int, int]]:
+    """Character `(start, end)` spans of the non-blank chunks `chunk_text` returns."""
+
     if chunk_overlap >= chunk_size:
         chunk_overlap = max(0, chunk_size // 4)
-    chunks: List[str] = []
+    spans: List[Tuple[int, int]] = []
     start = 0
     while start < len(text):
         end = min(len(text), start + chunk_size)
-        chunk = text[start:end]
-        if chunk.strip():
-            chunks.append(chunk)
+        if text[start:end].strip():
+            spans.append((start, end))
         if end == len(text):
             break
         start = max(end - chunk_overlap, start + 1)
-    return chunks
+    return spans
+
+
+def chunk_text(text: str, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[str]:
+    return [text[start:end] for start, end in chunk_spans(text, chunk_size, chunk_overlap)]
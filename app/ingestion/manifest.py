@@ -0,0 +1,166 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from app.core.config import get_settings
+from app.ingestion.loaders import discover_documents
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOURCE_DIR = "data/source_docs"
+
+_manifest_locks: Dict[str, threading.Lock] = {}
+_manifest_locks_guard = threading.Lock()
+
+
+def store_root() -> Path:
+    """Directory of the active vector store backend; derived indexes live beside it."""
+
+    db = get_settings().db
+    return Path(db.chroma_path if db.backend == "chroma" else db.store_path)
+
+
+def file_sha256(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def chunk_id(source: str, params: str, content_sha256: str, index: int) -> str:
+    """Deterministic id for the `index`-th chunk of a source file version."""
+
+    raw = f"{source}\x1f{params}\x1f{content_sha256}\x1f{index}"
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:32]
+
+
+@dataclass
+class SourceFile:
+    """A discovered file whose chunks must be (re)indexed."""
+
+    path: Path
+    source: str
+    sha256: str
+    mtime: float
+    size: int
+
+
+@dataclass
+class IngestPlan:
+    changed: List[SourceFile] = field(default_factory=list)
+    unchanged: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+
+
+class IngestManifest:
+    """Per-collection record of ingested sources (mtime, size, content hash, params).
+
+    Lets ingestion skip unchanged files, replace the chunks of changed ones and purge
+    files that disappeared, instead of re-embedding the whole corpus on every run.
+    Stored as JSON next to the vector store.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.entries: Dict[str, Dict[str, object]] = {}
+        if path.exists():
+            try:
+                self.entries = json.loads(path.read_text(encoding="utf-8")).get("sources", {})
+            except (OSError, ValueError):
+                logger.warning("Unreadable ingest manifest; starting fresh", extra={"path": str(path)})
+                self.entries = {}
+
+    @staticmethod
+    def path_for(collection_name: str) -> Path:
+        # Lives with the store it describes, so switching backends re-ingests
+        return store_root() / "manifests" / f"{collection_name}.json"
+
+    @classmethod
+    def for_collection(cls, collection_name: str) -> "IngestManifest":
+        return cls(cls.path_for(collection_name))
+
+    @staticmethod
+    def lock_for(collection_name: str) -> threading.Lock:
+        """Serializes plan/apply/save for one collection within the process."""
+
+        with _manifest_locks_guard:
+            return _manifest_locks.setdefault(collection_name, threading.Lock())
+
+    def plan(self, paths: Optional[List[str]], params: str) -> IngestPlan:
+        """Classify sources under `paths` as changed, unchanged or removed.
+
+        Files whose mtime and size match the manifest are skipped without being read;
+        otherwise the content hash decides. Removal only considers manifest entries
+        under the requested roots, so ingesting one directory never purges another.
+        """
+
+        roots = [Path(p).resolve() for p in (paths or [DEFAULT_SOURCE_DIR])]
+        plan = IngestPlan()
+        seen = set()
+        for path in discover_documents(paths):
+            resolved = path.resolve()
+            source = str(resolved)
+            if source in seen:
+                continue
+            seen.add(source)
+            stat = resolved.stat()
+            entry = self.entries.get(source)
+            if entry is not None and entry.get("params") == params:
+                if entry.get("mtime") == stat.st_mtime and entry.get("size") == stat.st_size:
+                    plan.unchanged.append(source)
+                    continue
+                sha = file_sha256(resolved)
+                if entry.get("sha256") == sha:
+                    # Touched but identical: refresh stat info, keep the indexed chunks
+                    entry["mtime"], entry["size"] = stat.st_mtime, stat.st_size
+                    plan.unchanged.append(source)
+                    continue
+            else:
+                sha = file_sha256(resolved)
+            plan.changed.append(SourceFile(resolved, source, sha, stat.st_mtime, stat.st_size))
+
+        for source in self.entries:
+            if source in seen:
+                continue
+            candidate = Path(source)
+            if any(candidate == root or root in candidate.parents for root in roots):
+                plan.removed.append(source)
+        return plan
+
+    def record(self, sf: SourceFile, params: str, num_chunks: int) -> None:
+        self.entries[sf.source] = {
+            "sha256": sf.sha256,
+            "mtime": sf.mtime,
+            "size": sf.size,
+            "params": params,
+            "chunks": num_chunks,
+        }
+
+    def digest(self) -> str:
+        """Hash of what is indexed (sources, content hashes and params), ignoring mtimes."""
+
+        content = sorted((source, e.get("sha256"), e.get("params")) for source, e in self.entries.items())
+        return hashlib.sha256(json.dumps(content).encode("utf-8")).hexdigest()
+
+    def forget(self, source: str) -> None:
+        self.entries.pop(source, None)
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.path.with_suffix(".json.tmp")
+        tmp.write_text(json.dumps({"sources": self.entries}, indent=1, sort_keys=True), encoding="utf-8")
+        os.replace(tmp, self.path)
+
+    def clear(self) -> None:
+        self.entries = {}
+        if self.path.exists():
+            self.path.unlink()
@@ -0,0 +1,215 @@
+from __future__ import annotations
+
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.ingestion.manifest import store_root
+
+
+Retrieved = List[Tuple[str, Dict[str, str], float]]
+
+
+def document_id(source: str, content_sha256: str) -> str:
+    """Id of one version of a source document in the sentence table."""
+
+    return hashlib.sha256(f"{source}\x1f{content_sha256}".encode("utf-8")).hexdigest()[:24]
+
+
+class SentenceStore:
+    """Source text and sentence spans of each document, stored once per `doc_id`.
+
+    Sentence-window index entries only carry `doc_id` and sentence indices; the
+    window text is sliced from the document text at query time, so the window size
+    can change without re-ingesting. Recently used documents stay decoded in a
+    small LRU bounded by `cache_chars`.
+    """
+
+    def __init__(self, path: Path, cache_chars: int = 32_000_000) -> None:
+        self.path = path
+        self.cache_chars = cache_chars
+        self._lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[str, np.ndarray]]" = OrderedDict()
+        self._cached_chars = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(path), check_same_thread=False)
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            " doc_id TEXT PRIMARY KEY, source TEXT NOT NULL, text TEXT NOT NULL, spans BLOB NOT NULL);"
+            "CREATE INDEX IF NOT EXISTS documents_source ON documents (source);"
+        )
+        self._db.commit()
+
+    def put(self, doc_id: str, source: str, text: str, spans: np.ndarray) -> None:
+        """Store `text` and its `(n, 2)` sentence `spans`, replacing a previous copy."""
+
+        blob = np.ascontiguousarray(spans, dtype=np.int64).tobytes()
+        with self._lock:
+            self._db.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)", (doc_id, source, text, blob))
+            self._db.commit()
+            self._evict(doc_id)
+
+    def delete_sources(self, sources: Sequence[str]) -> None:
+        if not sources:
+            return
+        with self._lock:
+            # Stay well below SQLite's bound-parameter limit
+            for start in range(0, len(sources), 500):
+                group = list(sources[start : start + 500])
+                where = f"source IN ({','.join('?' * len(group))})"
+                for (doc_id,) in self._db.execute(f"SELECT doc_id FROM documents WHERE {where}", group).fetchall():
+                    self._evict(doc_id)
+                self._db.execute(f"DELETE FROM documents WHERE {where}", group)
+            self._db.commit()
+
+    def _evict(self, doc_id: str) -> None:
+        entry = self._cache.pop(doc_id, None)
+        if entry is not None:
+            self._cached_chars -= len(entry[0])
+
+    def _documents(self, doc_ids: List[str]) -> Dict[str, Tuple[str, np.ndarray]]:
+        with self._lock:
+            found: Dict[str, Tuple[str, np.ndarray]] = {}
+            missing: List[str] = []
+            for doc_id in doc_ids:
+                entry = self._cache.get(doc_id)
+                if entry is None:
+                    missing.append(doc_id)
+                else:
+                    self._cache.move_to_end(doc_id)
+                    found[doc_id] = entry
+            if missing:
+                rows = self._db.execute(
+                    f"SELECT doc_id, text, spans FROM documents WHERE doc_id IN ({','.join('?' * len(missing))})", missing
+                ).fetchall()
+                for doc_id, text, blob in rows:
+                    entry = (text, np.frombuffer(blob, dtype=np.int64).reshape(-1, 2))
+                    found[doc_id] = entry
+                    self._cache[doc_id] = entry
+                    self._cached_chars += len(text)
+                while self._cached_chars > self.cache_chars and len(self._cache) > 1:
+                    _doc, (text, _spans) = self._cache.popitem(last=False)
+                    self._cached_chars -= len(text)
+        return found
+
+    def slices(self, doc_ids: Sequence[str], char_starts: Sequence[int], char_ends: Sequence[int]) -> List[Optional[str]]:
+        """`text[char_starts[i]:char_ends[i]]` of each `doc_ids[i]`; None for unknown documents."""
+
+        docs = self._documents(list(dict.fromkeys(doc_ids)))
+        return [docs[d][0][a:b] if d in docs else None for d, a, b in zip(doc_ids, char_starts, char_ends)]
+
+    def windows(self, doc_ids: Sequence[str], starts: np.ndarray, ends: np.ndarray) -> List[Optional[Tuple[str, int, int]]]:
+        """`(text, s_idx, e_idx)` of sentences `starts[i]..ends[i]` (inclusive) of each `doc_ids[i]`.
+
+        Sentence bounds are clipped and mapped to character offsets in one
+        vectorized gather over the spans of all requested documents; each window
+        is then a single slice of its document text. Unknown documents yield None;
+        returned bounds are the clipped ones.
+        """
+
+        if not len(doc_ids):
+            return []
+        unique = list(dict.fromkeys(doc_ids))
+        docs = self._documents(unique)
+        spans = [docs[d][1] if d in docs else np.zeros((0, 2), dtype=np.int64) for d in unique]
+        counts = np.fromiter((len(sp) for sp in spans), dtype=np.int64, count=len(unique))
+        base = np.concatenate(([0], np.cumsum(counts)[:-1]))
+        all_spans = np.concatenate(spans) if counts.sum() else np.zeros((1, 2), dtype=np.int64)
+
+        doc_index = {d: i for i, d in enumerate(unique)}
+        slot = np.fromiter((doc_index[d] for d in doc_ids), dtype=np.int64, count=len(doc_ids))
+        sizes = counts[slot]
+        starts = np.maximum(np.asarray(starts, dtype=np.int64), 0)
+        ends = np.minimum(np.asarray(ends, dtype=np.int64), sizes - 1)
+        known = (sizes > 0) & (starts <= ends)
+        first = np.where(known, base[slot] + starts, 0)
+        last = np.where(known, base[slot] + ends, 0)
+        char_start = all_spans[first, 0].tolist()
+        char_end = all_spans[last, 1].tolist()
+
+        out: List[Optional[Tuple[str, int, int]]] = []
+        for d, ok, a, b, s, e in zip(doc_ids, known.tolist(), char_start, char_end, starts.tolist(), ends.tolist()):
+            out.append((docs[d][0][a:b], s, e) if ok else None)
+        return out
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+
+_stores: Dict[str, SentenceStore] = {}
+_stores_lock = threading.Lock()
+
+
+def sentence_store_path(collection_name: str) -> Path:
+    return store_root() / "sentences" / f"{collection_name}.sqlite3"
+
+
+def get_sentence_store(collection_name: str, create: bool = True) -> Optional[SentenceStore]:
+    """Return the sentence table of `collection_name`; None if absent and not `create`."""
+
+    path = sentence_store_path(collection_name)
+    key = str(path)
+    store = _stores.get(key)
+    if store is None:
+        if not create and not path.exists():
+            return None
+        with _stores_lock:
+            store = _stores.get(key)
+            if store is None:
+                store = SentenceStore(path)
+                _stores[key] = store
+    return store
+
+
+def drop_sentence_store(collection_name: str) -> None:
+    path = sentence_store_path(collection_name)
+    with _stores_lock:
+        store = _stores.pop(str(path), None)
+        if store is not None:
+            store.close()
+        path.unlink(missing_ok=True)
+
+
+def expand_windows(retrieved: Retrieved, collection_name: str, window_size: Optional[int] = None) -> Retrieved:
+    """Replace compact sentence-window hits by their window text.
+
+    Hits carry `doc_id`, the center `sent_idx` and the ingest-time window as
+    sentence bounds `s_idx`/`e_idx` and character offsets `char_start`/`char_end`;
+    `window_size` overrides the window around the center. Hits
+    without `doc_id` (chunks, or windows indexed in the older full-text format)
+    are returned unchanged.
+    """
+
+    compact = [i for i, (_t, meta, _s) in enumerate(retrieved) if meta.get("doc_id")]
+    if not compact:
+        return retrieved
+    store = get_sentence_store(collection_name, create=False)
+    if store is None:
+        return retrieved
+    metas = [retrieved[i][1] for i in compact]
+    doc_ids = [m["doc_id"] for m in metas]
+    if window_size is None:
+        # The ingest-time window is recorded as character offsets: one slice each
+        texts = store.slices(doc_ids, [int(m["char_start"]) for m in metas], [int(m["char_end"]) for m in metas])
+        windows = [
+            (text, int(m["s_idx"]), int(m["e_idx"])) if text is not None else None for text, m in zip(texts, metas)
+        ]
+    else:
+        centers = np.fromiter((int(m["sent_idx"]) for m in metas), dtype=np.int64, count=len(metas))
+        w = max(0, window_size)
+        windows = store.windows(doc_ids, centers - w, centers + w)
+
+    out = list(retrieved)
+    for i, window in zip(compact, windows):
+        if window is None:
+            continue
+        text, meta, score = retrieved[i]
+        window_text, s_idx, e_idx = window
+        out[i] = (window_text, {**meta, "sentence_text": text, "s_idx": str(s_idx), "e_idx": str(e_idx)}, score)
+    return out
@@ -1,26 +1,188 @@
 from __future__ import annotations
 
+import multiprocessing
+import os
 import re
-from typing import Dict, List, Tuple
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
 
-from syntok.segmenter import process
+import numpy as np
+from syntok.segmenter import preprocess_with_offsets, segment
+from syntok.tokenizer import Tokenizer
 
 
-def _extract_sentences_with_syntok(text: str) -> List[str]:
-    sentences: List[str] = []
-    for paragraph in process(text):
-        for sentence in paragraph:
-            # Join token values and fix spacing before punctuation
-            s = " ".join(token.value for token in sentence).strip()
-            s = re.sub(r"\s+([\.,;:!\?])", r"\1", s)
-            if s:
-                sentences.append(s)
-    return sentences
+T = TypeVar("T")
 
+_BOUNDARY = re.compile(r"(?<=[\.!?])\s+")
 
-def _fallback_regex_split(text: str) -> List[str]:
-    parts = re.split(r"(?<=[\.!?])\s+", text)
-    return [p.strip() for p in parts if p.strip()]
+
+def _extract_spans_with_syntok(text: str) -> List[Tuple[int, int]]:
+    # Token offsets point into the original text, so a sentence is the range from
+    # its first token to the end of its last one; nothing is re-joined. Paragraphs
+    # are tokenized from offset 0 and shifted here: syntok's own `analyze` pads each
+    # paragraph with `offset` spaces, which is quadratic in the number of paragraphs.
+    tokenizer = Tokenizer(replace_not_contraction=False)
+    spans: List[Tuple[int, int]] = []
+    for base, paragraph in preprocess_with_offsets(text):
+        for sentence in segment(tokenizer.tokenize(paragraph)):
+            if sentence:
+                last = sentence[-1]
+                spans.append((base + sentence[0].offset, base + last.offset + len(last.value)))
+    return spans
+
+
+def _fallback_regex_spans(text: str) -> List[Tuple[int, int]]:
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    bounds = [(m.start(), m.end()) for m in _BOUNDARY.finditer(text)] + [(len(text), len(text))]
+    for end, next_start in bounds:
+        part = text[start:end]
+        stripped = part.strip()
+        if stripped:
+            lead = len(part) - len(part.lstrip())
+            spans.append((start + lead, start + lead + len(stripped)))
+        start = next_start
+    return spans
+
+
+def _as_span_array(text: str, spans: List[Tuple[int, int]]) -> np.ndarray:
+    if len(spans) <= 1:
+        spans = _fallback_regex_spans(text)
+    return np.asarray(spans, dtype=np.int64).reshape(-1, 2)
+
+
+def sentence_spans(text: str) -> np.ndarray:
+    """Sentence boundaries of `text` as an `(n, 2)` int64 array of character offsets.
+
+    `text[start:end]` is each sentence with its original spacing. Segmentation is
+    done by syntok, with a punctuation-regex fallback when it finds one sentence.
+    """
+
+    return _as_span_array(text, _extract_spans_with_syntok(text))
+
+
+def _paragraph_blocks(text: str, block_chars: int) -> List[Tuple[int, int]]:
+    # syntok never lets a sentence cross a paragraph break, so blocks of whole
+    # paragraphs segment exactly as the full text does
+    blocks: List[Tuple[int, int]] = []
+    begin = 0
+    for offset, _paragraph in preprocess_with_offsets(text):
+        if offset - begin >= block_chars:
+            blocks.append((begin, offset))
+            begin = offset
+    blocks.append((begin, len(text)))
+    return blocks
+
+
+def split_into_sentences(text: str) -> List[str]:
+    """Sentences of `text`, by syntok with a punctuation-regex fallback."""
+
+    return [text[start:end] for start, end in sentence_spans(text).tolist()]
+
+
+def _extract_many(texts: List[str]) -> List[List[Tuple[int, int]]]:
+    return [_extract_spans_with_syntok(text) for text in texts]
+
+
+class _Group:
+    """Short texts segmented together in one pool task (or inline before the pool starts)."""
+
+    def __init__(self) -> None:
+        self.texts: List[str] = []
+        self.chars = 0
+        self.future: Optional[Future] = None
+        self.spans: Optional[List[List[Tuple[int, int]]]] = None
+
+
+_Parts = Union[np.ndarray, List[Tuple[int, Future]], Tuple[_Group, int]]
+
+
+def iter_sentence_spans(
+    items: Iterable[Tuple[T, str]], max_workers: int = 0, min_parallel_chars: int = 100_000, prefetch: int = 0
+) -> Iterator[Tuple[T, str, np.ndarray]]:
+    """Yield `(key, text, spans)` in input order, segmenting texts in a process pool.
+
+    Shorter texts are grouped into tasks of about `min_parallel_chars`, so pickling
+    is amortized over many documents; texts of at least that size are split into
+    blocks of whole paragraphs of about that size, segmented in parallel and
+    stitched back by offset. The pool is only started once a task reaches that
+    size, so a small corpus is segmented inline. At most `prefetch` tasks (default:
+    twice the worker count) are in flight.
+    """
+
+    workers = max_workers if max_workers > 0 else (os.cpu_count() or 1)
+    window = prefetch if prefetch > 0 else workers * 2
+    task_chars = max(1, min_parallel_chars)
+    pool: Optional[ProcessPoolExecutor] = None
+    pending: Deque[Tuple[T, str, _Parts]] = deque()
+    group = _Group()
+    in_flight = 0
+
+    def get_pool() -> ProcessPoolExecutor:
+        nonlocal pool
+        if pool is None:
+            # spawn: forking a process that already runs torch/uvicorn threads can deadlock
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"))
+        return pool
+
+    def submit_blocks(text: str) -> List[Tuple[int, Future]]:
+        nonlocal in_flight
+        blocks = _paragraph_blocks(text, task_chars)
+        in_flight += len(blocks)
+        return [(start, get_pool().submit(_extract_spans_with_syntok, text[start:end])) for start, end in blocks]
+
+    def flush(start_pool: bool) -> None:
+        nonlocal group, in_flight
+        if group.texts:
+            if start_pool or pool is not None:
+                group.future = get_pool().submit(_extract_many, group.texts)
+                in_flight += 1
+            else:
+                group.spans = _extract_many(group.texts)
+        group = _Group()
+
+    def ready(parts: _Parts) -> bool:
+        return isinstance(parts, np.ndarray) or (isinstance(parts, tuple) and parts[0].spans is not None)
+
+    def resolve(item: Tuple[T, str, _Parts]) -> Tuple[T, str, np.ndarray]:
+        nonlocal in_flight
+        key, text, parts = item
+        if isinstance(parts, np.ndarray):
+            return key, text, parts
+        if isinstance(parts, tuple):
+            owner, index = parts
+            if owner is group:
+                flush(start_pool=False)
+            if owner.spans is None:
+                assert owner.future is not None
+                owner.spans = owner.future.result()
+                in_flight -= 1
+            return key, text, _as_span_array(text, owner.spans[index])
+        in_flight -= len(parts)
+        spans = [(base + a, base + b) for base, future in parts for a, b in future.result()]
+        return key, text, _as_span_array(text, spans)
+
+    try:
+        for key, text in items:
+            if workers <= 1:
+                pending.append((key, text, sentence_spans(text)))
+            elif len(text) >= task_chars:
+                pending.append((key, text, submit_blocks(text)))
+            else:
+                pending.append((key, text, (group, len(group.texts))))
+                group.texts.append(text)
+                group.chars += len(text)
+                if group.chars >= task_chars:
+                    flush(start_pool=True)
+            while pending and (in_flight >= window or ready(pending[0][2])):
+                yield resolve(pending.popleft())
+        flush(start_pool=False)
+        while pending:
+            yield resolve(pending.popleft())
+    finally:
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
 
 
 def split_into_sentence_windows(text: str, window_size: int = 2) -> List[Tuple[str, Dict[str, str]]]:
@@ -30,25 +192,26 @@ def split_into_sentence_windows(text: str, window_size: int = 2) -> List[Tuple[s
     - sentence_text: the center sentence
     - s_idx: start sentence index in the original text
     - e_idx: end sentence index in the original text
+    - char_start, char_end: character offsets of the window in `text`
     """
 
     if window_size < 0:
         window_size = 0
 
-    sentences = _extract_sentences_with_syntok(text)
-    if len(sentences) <= 1:
-        sentences = _fallback_regex_split(text)
+    spans = sentence_spans(text).tolist()
 
     windows: List[Tuple[str, Dict[str, str]]] = []
-    for i, center in enumerate(sentences):
+    for i, (center_start, center_end) in enumerate(spans):
         start = max(0, i - window_size)
-        end = min(len(sentences) - 1, i + window_size)
-        window_text = " ".join(sentences[start : end + 1])
+        end = min(len(spans) - 1, i + window_size)
+        char_start, char_end = spans[start][0], spans[end][1]
         meta: Dict[str, str] = {
-            "sentence_text": center,
+            "sentence_text": text[center_start:center_end],
             "s_idx": str(start),
             "e_idx": str(end),
+            "char_start": str(char_start),
+            "char_end": str(char_end),
         }
-        windows.append((window_text, meta))
+        windows.append((text[char_start:char_end], meta))
 
     return windows
@@ -0,0 +1,391 @@
+from __future__ import annotations
+
+import json
+import logging
+import shutil
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.retrieval.hnsw import HNSWGraph
+
+
+logger = logging.getLogger(__name__)
+
+Where = Dict[str, Any]
+# (document, metadata, squared L2 distance)
+Hit = Tuple[str, Dict[str, Any], float]
+
+
+class VectorStore(ABC):
+    """Storage and nearest-neighbour search for one collection.
+
+    Distances are squared L2, matching Chroma's default space, so scores are
+    comparable across backends. `where` filters use the Chroma subset documented
+    on `matches_where`.
+    """
+
+    @abstractmethod
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        ...
+
+    @abstractmethod
+    def delete(self, where: Where) -> None:
+        ...
+
+    @abstractmethod
+    def query(self, embeddings: np.ndarray, k: int, where: Optional[Where] = None) -> List[List[Hit]]:
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    def flush(self) -> None:
+        """Persist derived state that is not written on every call."""
+
+    def close(self) -> None:
+        self.flush()
+
+
+def matches_where(metadata: Dict[str, Any], where: Where) -> bool:
+    """Evaluate a Chroma-style metadata filter.
+
+    Supports `{"field": value}`, the operators `$eq`, `$ne`, `$in`, `$nin`, `$gt`,
+    `$gte`, `$lt`, `$lte`, and `$and`/`$or` over lists of filters.
+    """
+
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, sub) for sub in cond):
+                return False
+            continue
+        if key == "$or":
+            if not any(matches_where(metadata, sub) for sub in cond):
+                return False
+            continue
+        value = metadata.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, operand in cond.items():
+            if op == "$eq":
+                ok = value == operand
+            elif op == "$ne":
+                ok = value != operand
+            elif op == "$in":
+                ok = value in operand
+            elif op == "$nin":
+                ok = value not in operand
+            elif op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                ok = {
+                    "$gt": value > operand,
+                    "$gte": value >= operand,
+                    "$lt": value < operand,
+                    "$lte": value <= operand,
+                }[op]
+            else:
+                raise ValueError(f"Unsupported where operator: {op}")
+            if not ok:
+                return False
+    return True
+
+
+class LocalVectorStore(VectorStore):
+    """Built-in engine: float32 vectors in a memory-mapped file, items in SQLite.
+
+    Rows are append-only slots of `vectors.f32`; documents and metadata live in
+    memory and are written through to `items.sqlite3`. Upserting an existing id
+    retires its old slot, and deletes leave tombstones until `compact`.
+
+    `mode="exact"` scores every live row with one matrix product. `mode="hnsw"`
+    searches an HNSW graph over the slots. The graph is saved by `flush`, and any
+    slots added after the last save are linked when the store is reopened.
+    Filtered queries always use the exact path over the matching rows.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        mode: str = "exact",
+        hnsw_m: int = 16,
+        hnsw_ef_construction: int = 100,
+        hnsw_ef_search: int = 64,
+    ) -> None:
+        if mode not in ("exact", "hnsw"):
+            raise ValueError(f"Unknown vector store mode: {mode}")
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.mode = mode
+        self.hnsw_m = hnsw_m
+        self.hnsw_ef_construction = hnsw_ef_construction
+        self.ef_search = hnsw_ef_search
+        self._lock = threading.RLock()
+        self._db = sqlite3.connect(str(self.directory / "items.sqlite3"), check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " slot INTEGER PRIMARY KEY, id TEXT UNIQUE NOT NULL, document TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        self.dim: Optional[int] = int(meta["dim"]) if "dim" in meta else None
+        self._size = int(meta.get("size", 0))
+        self._ids: List[Optional[str]] = [None] * self._size
+        self._documents: List[Optional[str]] = [None] * self._size
+        self._metadatas: List[Optional[Dict[str, Any]]] = [None] * self._size
+        self._slot_of: Dict[str, int] = {}
+        for slot, item_id, document, metadata in self._db.execute("SELECT slot, id, document, metadata FROM items"):
+            self._ids[slot], self._documents[slot] = item_id, document
+            self._metadatas[slot] = json.loads(metadata)
+            self._slot_of[item_id] = slot
+
+        self._vectors: Optional[np.ndarray] = None
+        self._norms = np.zeros(0, dtype=np.float32)
+        self._alive = np.zeros(0, dtype=bool)
+        if self.dim is not None:
+            self._map(max(self._capacity_on_disk(), self._size))
+            capacity = self._vectors.shape[0]  # type: ignore[union-attr]
+            stored = self._vectors[: self._size]  # type: ignore[index]
+            self._norms = np.zeros(capacity, dtype=np.float32)
+            self._norms[: self._size] = np.einsum("ij,ij->i", stored, stored)
+            self._alive = np.zeros(capacity, dtype=bool)
+            self._alive[: self._size] = [i is not None for i in self._ids]
+
+        self._graph: Optional[HNSWGraph] = None
+        self._graph_dirty = False
+        if mode == "hnsw":
+            self._load_graph()
+
+    # -- storage -----------------------------------------------------------
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    @property
+    def _graph_path(self) -> Path:
+        return self.directory / "hnsw.npz"
+
+    def _capacity_on_disk(self) -> int:
+        assert self.dim is not None
+        return self._vectors_path.stat().st_size // (4 * self.dim) if self._vectors_path.exists() else 0
+
+    def _map(self, capacity: int) -> None:
+        assert self.dim is not None
+        capacity = max(capacity, 1)
+        with self._vectors_path.open("ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _reserve(self, rows: int) -> None:
+        assert self._vectors is not None
+        needed = self._size + rows
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        self._vectors.flush()
+        self._map(capacity)
+        norms = np.zeros(capacity, dtype=np.float32)
+        norms[: self._size] = self._norms[: self._size]
+        self._norms = norms
+        alive = np.zeros(capacity, dtype=bool)
+        alive[: self._size] = self._alive[: self._size]
+        self._alive = alive
+
+    def _set_meta(self, key: str, value: Any) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _load_graph(self) -> None:
+        graph: Optional[HNSWGraph] = None
+        if self._graph_path.exists():
+            try:
+                graph = HNSWGraph.load(self._graph_path)
+            except Exception:
+                logger.warning("Unreadable HNSW graph; rebuilding", extra={"path": str(self._graph_path)})
+        if graph is None or len(graph) > self._size:
+            graph = HNSWGraph(m=self.hnsw_m, ef_construction=self.hnsw_ef_construction)
+        self._graph = graph
+        if len(graph) < self._size:
+            assert self._vectors is not None
+            for slot in range(len(graph), self._size):
+                graph.insert(slot, self._vectors, self._norms)
+            self._graph_dirty = True
+
+    # -- VectorStore -------------------------------------------------------
+
+    def upsert(self, ids: List[str], documents: List[str], metadatas: List[Dict[str, Any]], embeddings: np.ndarray) -> None:
+        matrix = np.asarray(embeddings, dtype=np.float32)
+        if not len(ids):
+            return
+        with self._lock:
+            if self.dim is None:
+                self.dim = int(matrix.shape[1])
+                self._set_meta("dim", self.dim)
+                self._map(max(1024, len(ids)))
+                self._norms = np.zeros(self._vectors.shape[0], dtype=np.float32)  # type: ignore[union-attr]
+                self._alive = np.zeros(self._vectors.shape[0], dtype=bool)  # type: ignore[union-attr]
+            elif matrix.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match collection dimension {self.dim}")
+            # Retire slots of ids being replaced (also duplicates within the batch)
+            replaced = [self._slot_of[i] for i in ids if i in self._slot_of]
+            self._retire(replaced)
+            last: Dict[str, int] = {item_id: j for j, item_id in enumerate(ids)}
+            rows = sorted(last.values())
+            self._reserve(len(rows))
+            assert self._vectors is not None
+            start = self._size
+            slots = range(start, start + len(rows))
+            self._vectors[start : start + len(rows)] = matrix[rows]
+            self._norms[start : start + len(rows)] = np.einsum("ij,ij->i", matrix[rows], matrix[rows])
+            self._alive[start : start + len(rows)] = True
+            for slot, j in zip(slots, rows):
+                self._ids.append(ids[j])
+                self._documents.append(documents[j])
+                self._metadatas.append(dict(metadatas[j]))
+                self._slot_of[ids[j]] = slot
+            self._size += len(rows)
+            self._db.executemany(
+                "INSERT INTO items (slot, id, document, metadata) VALUES (?, ?, ?, ?)",
+                [(slot, ids[j], documents[j], json.dumps(metadatas[j])) for slot, j in zip(slots, rows)],
+            )
+            self._set_meta("size", self._size)
+            self._db.commit()
+            self._vectors.flush()
+            if self._graph is not None:
+                for slot in slots:
+                    self._graph.insert(slot, self._vectors, self._norms)
+                self._graph_dirty = True
+
+    def _retire(self, slots: Sequence[int]) -> None:
+        if not slots:
+            return
+        for slot in slots:
+            item_id = self._ids[slot]
+            if item_id is not None:
+                self._slot_of.pop(item_id, None)
+            self._ids[slot] = self._documents[slot] = self._metadatas[slot] = None
+            self._alive[slot] = False
+        self._db.executemany("DELETE FROM items WHERE slot = ?", [(s,) for s in slots])
+
+    def delete(self, where: Where) -> None:
+        with self._lock:
+            slots = [s for s in range(self._size) if self._alive[s] and matches_where(self._metadatas[s] or {}, where)]
+            self._retire(slots)
+            self._db.commit()
+            dead = self._size - int(self._alive[: self._size].sum())
+            if dead > 1024 and dead * 2 > self._size:
+                self.compact()
+
+    def count(self) -> int:
+        with self._lock:
+            return int(self._alive[: self._size].sum())
+
+    def query(self, embeddings: np.ndarray, k: int, where: Optional[Where] = None) -> List[List[Hit]]:
+        queries = np.asarray(embeddings, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        with self._lock:
+            size = self._size
+            if size == 0 or self._vectors is None or k <= 0:
+                return [[] for _ in range(len(queries))]
+            vectors, norms = self._vectors[:size], self._norms[:size]
+            # Compaction replaces these lists (and renumbers slots); hold on to the ones
+            # the snapshot's slots refer to
+            ids, documents, metadatas = self._ids, self._documents, self._metadatas
+            mask = self._alive[:size].copy()
+            if where:
+                mask &= np.array([m is not None and matches_where(m, where) for m in self._metadatas[:size]], dtype=bool)
+            if self._graph is not None and not where:
+                hits = [self._graph_search(q, k, vectors, norms, mask) for q in queries]
+            else:
+                hits = None
+        if hits is None:
+            hits = self._exact(queries, k, vectors, norms, mask)
+        with self._lock:
+            # Items deleted during the scan have been retired in place
+            return [[(documents[s] or "", metadatas[s] or {}, d) for s, d in row if ids[s] is not None] for row in hits]
+
+    @staticmethod
+    def _exact(queries: np.ndarray, k: int, vectors: np.ndarray, norms: np.ndarray, mask: np.ndarray) -> List[List[Tuple[int, float]]]:
+        live = np.flatnonzero(mask)
+        if live.size == 0:
+            return [[] for _ in range(len(queries))]
+        if live.size < mask.size:
+            vectors, norms = vectors[live], norms[live]
+        # One BLAS call scores every (row, query) pair
+        dists = norms[:, None] + np.einsum("ij,ij->i", queries, queries)[None, :] - 2.0 * (vectors @ queries.T)
+        top = min(k, dists.shape[0])
+        results: List[List[Tuple[int, float]]] = []
+        for col in range(dists.shape[1]):
+            column = dists[:, col]
+            part = np.argpartition(column, top - 1)[:top] if top < column.size else np.arange(column.size)
+            order = part[np.argsort(column[part])]
+            results.append([(int(live[i]), max(0.0, float(column[i]))) for i in order])
+        return results
+
+    def _graph_search(self, query: np.ndarray, k: int, vectors: np.ndarray, norms: np.ndarray, mask: np.ndarray) -> List[Tuple[int, float]]:
+        assert self._graph is not None
+        found = self._graph.search(query, k, self.ef_search, vectors, norms)
+        live = [(node, max(0.0, d)) for d, node in found if node < mask.size and mask[node]]
+        if len(live) < min(k, int(mask.sum())):
+            # Too many tombstones near the query; fall back to an exact scan
+            return self._exact(query.reshape(1, -1), k, vectors, norms, mask)[0]
+        return live[:k]
+
+    # -- maintenance -------------------------------------------------------
+
+    def compact(self) -> None:
+        """Rewrite the store without tombstones (and rebuild the HNSW graph)."""
+
+        with self._lock:
+            if self._vectors is None:
+                return
+            live = np.flatnonzero(self._alive[: self._size])
+            vectors = np.array(self._vectors[live])
+            ids = [self._ids[s] for s in live]
+            documents = [self._documents[s] for s in live]
+            metadatas = [self._metadatas[s] for s in live]
+            self._db.execute("DELETE FROM items")
+            self._set_meta("size", 0)
+            self._db.commit()
+            self._vectors = None
+            self._vectors_path.unlink()
+            self._graph_path.unlink(missing_ok=True)
+            self._size = 0
+            self._ids, self._documents, self._metadatas, self._slot_of = [], [], [], {}
+            self._map(max(1024, len(live)))
+            self._norms = np.zeros(self._vectors.shape[0], dtype=np.float32)  # type: ignore[union-attr]
+            self._alive = np.zeros(self._vectors.shape[0], dtype=bool)  # type: ignore[union-attr]
+            if self._graph is not None:
+                self._graph = HNSWGraph(m=self.hnsw_m, ef_construction=self.hnsw_ef_construction)
+            self.upsert(ids, documents, metadatas, vectors)  # type: ignore[arg-type]
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            if self._graph is not None and self._graph_dirty:
+                self._graph.save(self._graph_path)
+                self._graph_dirty = False
+
+    def close(self) -> None:
+        with self._lock:
+            self.flush()
+            self._db.close()
+            self._vectors = None
+
+    def destroy(self) -> None:
+        """Close the store and delete its directory."""
+
+        self.close()
+        shutil.rmtree(self.directory, ignore_errors=True)
@@ -1,39 +1,261 @@
 from __future__ import annotations
 
+import asyncio
+import logging
 import os
-from typing import List
+import random
+import re
+import threading
+import time
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+import httpx
+
+from app.core.config import LLMConfig, get_settings
+from app.core.metrics import count_fallback, count_llm_call, span
 
 try:
-    from openai import OpenAI
+    import openai
+    from openai import AsyncOpenAI, OpenAI
 except Exception:  # pragma: no cover
+    openai = None  # type: ignore
     OpenAI = None  # type: ignore
+    AsyncOpenAI = None  # type: ignore
 
 
-def generate_answer(question: str, contexts: List[str]) -> str:
-    """Generate an answer using OpenAI if available, else return a fallback summary.
+logger = logging.getLogger(__name__)
 
-    This keeps tests deterministic without requiring network access.
+Messages = List[Dict[str, str]]
+
+
+def _is_retryable(exc: Exception) -> bool:
+    if openai is None:
+        return False
+    if isinstance(exc, (openai.APIConnectionError, openai.RateLimitError, openai.InternalServerError)):
+        return True
+    return isinstance(exc, openai.APIStatusError) and exc.status_code >= 500
+
+
+class ChatProvider:
+    """Long-lived chat-completions client with pooling, timeouts, limits and retries.
+
+    One sync and one async OpenAI client are created lazily and reused, so requests
+    share keep-alive connections instead of paying TCP/TLS setup per call. Calls are
+    bounded by a concurrency semaphore and retried with jittered exponential backoff.
+    Works against any server that speaks the chat-completions API via `base_url`.
     """
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    joined = "\n\n".join(contexts)[:8000]
+    def __init__(self, api_key: str, config: Optional[LLMConfig] = None) -> None:
+        if OpenAI is None:
+            raise RuntimeError("openai package is not installed")
+        self.api_key = api_key
+        self.config = config or get_settings().llm
+        self._sync_client: Any = None
+        self._sync_sem = threading.BoundedSemaphore(max(1, self.config.max_concurrency))
+        self._async_client: Any = None
+        self._async_sem: Optional[asyncio.Semaphore] = None
+        self._async_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
 
-    if api_key and OpenAI is not None:
-        client = OpenAI(api_key=api_key)
-        prompt = (
-            "You are a helpful assistant. Answer based ONLY on the provided context.\n\n"
-            f"Question: {question}\n\nContext:\n{joined}\n\nAnswer:"
+    def _limits(self) -> httpx.Limits:
+        return httpx.Limits(
+            max_connections=self.config.max_connections,
+            max_keepalive_connections=self.config.max_keepalive_connections,
         )
-        try:
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.2,
+
+    def _client_kwargs(self) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "api_key": self.api_key,
+            "timeout": self.config.timeout_seconds,
+            # Retries are handled here so they share the backoff policy and semaphore
+            "max_retries": 0,
+        }
+        if self.config.base_url:
+            kwargs["base_url"] = self.config.base_url
+        return kwargs
+
+    @property
+    def client(self):
+        if self._sync_client is None:
+            with self._lock:
+                if self._sync_client is None:
+                    self._sync_client = OpenAI(
+                        http_client=openai.DefaultHttpxClient(limits=self._limits()), **self._client_kwargs()
+                    )
+        return self._sync_client
+
+    def _async_state(self) -> Tuple[Any, asyncio.Semaphore]:
+        # Async HTTP pools and semaphores are bound to the event loop that first uses them
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_loop is not loop:
+            self._async_client = AsyncOpenAI(
+                http_client=openai.DefaultAsyncHttpxClient(limits=self._limits()), **self._client_kwargs()
             )
-            return resp.choices[0].message.content or ""
-        except Exception:
-            pass
+            self._async_sem = asyncio.Semaphore(max(1, self.config.max_concurrency))
+            self._async_loop = loop
+        return self._async_client, self._async_sem  # type: ignore[return-value]
+
+    def _backoff(self, attempt: int) -> float:
+        ceiling = min(self.config.backoff_max_seconds, self.config.backoff_base_seconds * (2**attempt))
+        return random.uniform(0.0, ceiling)
+
+    def _record(self, usage: Any) -> None:
+        count_llm_call(
+            self.config.model,
+            int(getattr(usage, "prompt_tokens", 0) or 0),
+            int(getattr(usage, "completion_tokens", 0) or 0),
+        )
+
+    def _request(self, messages: Messages, temperature: float, max_tokens: Optional[int], timeout: Optional[float]) -> Dict[str, Any]:
+        request: Dict[str, Any] = {
+            "model": self.config.model,
+            "messages": messages,
+            "temperature": temperature,
+            "timeout": timeout if timeout is not None else self.config.timeout_seconds,
+        }
+        if max_tokens is not None:
+            request["max_tokens"] = max_tokens
+        return request
+
+    def complete(
+        self,
+        messages: Messages,
+        *,
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        request = self._request(messages, temperature, max_tokens, timeout)
+        attempt = 0
+        while True:
+            try:
+                with self._sync_sem:
+                    resp = self.client.chat.completions.create(**request)
+                self._record(getattr(resp, "usage", None))
+                return resp.choices[0].message.content or ""
+            except Exception as exc:
+                if attempt >= self.config.max_retries or not _is_retryable(exc):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("LLM call failed, retrying", extra={"attempt": attempt + 1, "delay_s": round(delay, 3)})
+                time.sleep(delay)
+                attempt += 1
 
+    async def acomplete(
+        self,
+        messages: Messages,
+        *,
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> str:
+        request = self._request(messages, temperature, max_tokens, timeout)
+        client, sem = self._async_state()
+        attempt = 0
+        while True:
+            try:
+                async with sem:
+                    resp = await client.chat.completions.create(**request)
+                self._record(getattr(resp, "usage", None))
+                return resp.choices[0].message.content or ""
+            except Exception as exc:
+                if attempt >= self.config.max_retries or not _is_retryable(exc):
+                    raise
+                delay = self._backoff(attempt)
+                logger.warning("LLM call failed, retrying", extra={"attempt": attempt + 1, "delay_s": round(delay, 3)})
+                await asyncio.sleep(delay)
+                attempt += 1
+
+    async def astream(
+        self,
+        messages: Messages,
+        *,
+        temperature: float = 0.2,
+        max_tokens: Optional[int] = None,
+        timeout: Optional[float] = None,
+    ) -> AsyncIterator[str]:
+        """Yield completion text deltas as they arrive.
+
+        Only opening the stream is retried; once tokens have been yielded a failure
+        is raised to the caller rather than replaying a partial answer. Token usage
+        is requested on the final chunk (`stream_options.include_usage`); servers
+        that ignore it are counted as a call with zero tokens.
+        """
+
+        request = self._request(messages, temperature, max_tokens, timeout)
+        client, sem = self._async_state()
+        async with sem:
+            attempt = 0
+            while True:
+                try:
+                    stream = await client.chat.completions.create(
+                        stream=True, stream_options={"include_usage": True}, **request
+                    )
+                    break
+                except Exception as exc:
+                    if attempt >= self.config.max_retries or not _is_retryable(exc):
+                        raise
+                    delay = self._backoff(attempt)
+                    logger.warning("LLM stream failed to open, retrying", extra={"attempt": attempt + 1, "delay_s": round(delay, 3)})
+                    await asyncio.sleep(delay)
+                    attempt += 1
+            usage = None
+            async for chunk in stream:
+                # Usage arrives on a final chunk without choices
+                usage = getattr(chunk, "usage", None) or usage
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    yield delta
+            self._record(usage)
+
+    def close(self) -> None:
+        if self._sync_client is not None:
+            self._sync_client.close()
+            self._sync_client = None
+
+
+_providers: Dict[Tuple[str, Optional[str]], ChatProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_llm_provider() -> Optional[ChatProvider]:
+    """Return the shared provider, or None when no API key is configured (offline mode)."""
+
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key or OpenAI is None:
+        return None
+    config = get_settings().llm
+    key = (api_key, config.base_url)
+    provider = _providers.get(key)
+    if provider is None:
+        with _providers_lock:
+            provider = _providers.get(key)
+            if provider is None:
+                provider = ChatProvider(api_key, config)
+                _providers[key] = provider
+    return provider
+
+
+def _answer_messages(question: str, joined: str) -> Messages:
+    prompt = (
+        "You are a helpful assistant. Answer based ONLY on the provided context.\n\n"
+        f"Question: {question}\n\nContext:\n{joined}\n\nAnswer:"
+    )
+    return [{"role": "user", "content": prompt}]
+
+
+def _hyde_messages(question: str) -> Messages:
+    prompt = (
+        "Write a concise, factual paragraph that would directly answer the question."
+        " Avoid speculation and focus on keywords that are likely present in relevant documents.\n\n"
+        f"Question: {question}\n\nHypothetical answer:"
+    )
+    return [{"role": "user", "content": prompt}]
+
+
+def _fallback_answer(joined: str) -> str:
     # Fallback: return the first lines as a pseudo-summary
     if not joined.strip():
         return "No relevant context found."
@@ -41,30 +263,112 @@ def generate_answer(question: str, contexts: List[str]) -> str:
     return " ".join(preview)[:1000]
 
 
+def _fallback_hypothetical_document(question: str) -> str:
+    # Fallback: simple keyword-focused template
+    return f"This text describes: {question}. Definitions, key properties, examples, usage, related terms, and context."
+
+
+def generate_answer(question: str, contexts: List[str]) -> str:
+    """Generate an answer using OpenAI if available, else return a fallback summary.
+
+    This keeps tests deterministic without requiring network access.
+    """
+
+    joined = "\n\n".join(contexts)[:8000]
+    provider = get_llm_provider()
+    if provider is not None:
+        try:
+            with span("llm.answer"):
+                return provider.complete(_answer_messages(question, joined), temperature=0.2)
+        except Exception:
+            logger.warning("Answer generation failed; using fallback", exc_info=True)
+    count_fallback("llm_answer")
+    return _fallback_answer(joined)
+
+
+async def agenerate_answer(question: str, contexts: List[str]) -> str:
+    """Async variant of `generate_answer` sharing the pooled async client."""
+
+    joined = "\n\n".join(contexts)[:8000]
+    provider = get_llm_provider()
+    if provider is not None:
+        try:
+            with span("llm.answer"):
+                return await provider.acomplete(_answer_messages(question, joined), temperature=0.2)
+        except Exception:
+            logger.warning("Answer generation failed; using fallback", exc_info=True)
+    count_fallback("llm_answer")
+    return _fallback_answer(joined)
+
+
+async def astream_answer(question: str, contexts: List[str]) -> AsyncIterator[str]:
+    """Stream an answer token by token.
+
+    Without a provider (or if the stream cannot be opened) the fallback summary is
+    streamed word by word, so streaming behaves the same offline.
+    """
+
+    joined = "\n\n".join(contexts)[:8000]
+    provider = get_llm_provider()
+    if provider is not None:
+        started = False
+        try:
+            async for delta in provider.astream(_answer_messages(question, joined), temperature=0.2):
+                started = True
+                yield delta
+            return
+        except Exception:
+            if started:
+                raise
+            logger.warning("Answer streaming failed; using fallback", exc_info=True)
+    count_fallback("llm_answer")
+    for piece in re.findall(r"\S+\s*", _fallback_answer(joined)):
+        yield piece
+
+
+FALLBACK_MODEL_ID = "fallback"
+
+
+def current_llm_model_id() -> str:
+    """Id of the model that would serve a request now, or FALLBACK_MODEL_ID offline."""
+
+    return get_settings().llm.model if get_llm_provider() is not None else FALLBACK_MODEL_ID
+
+
+def generate_hypothetical_document_with_source(question: str) -> Tuple[str, str]:
+    """Like `generate_hypothetical_document`, also returning the id of the model that
+    produced the text (FALLBACK_MODEL_ID when the heuristic expansion was used)."""
+
+    provider = get_llm_provider()
+    if provider is not None:
+        try:
+            with span("llm.hyde"):
+                text = provider.complete(_hyde_messages(question), temperature=0.1, max_tokens=160)
+            return text or question, provider.config.model
+        except Exception:
+            logger.warning("HyDE generation failed; using fallback", exc_info=True)
+    count_fallback("llm_hyde")
+    return _fallback_hypothetical_document(question), FALLBACK_MODEL_ID
+
+
 def generate_hypothetical_document(question: str) -> str:
     """Generate a HyDE-style hypothetical document for a query.
 
     Uses OpenAI if configured; otherwise, returns a deterministic heuristic expansion.
     """
 
-    api_key = os.getenv("OPENAI_API_KEY")
-    if api_key and OpenAI is not None:
-        client = OpenAI(api_key=api_key)
-        prompt = (
-            "Write a concise, factual paragraph that would directly answer the question."
-            " Avoid speculation and focus on keywords that are likely present in relevant documents.\n\n"
-            f"Question: {question}\n\nHypothetical answer:"
-        )
+    return generate_hypothetical_document_with_source(question)[0]
+
+
+async def agenerate_hypothetical_document(question: str) -> str:
+    """Async variant of `generate_hypothetical_document`."""
+
+    provider = get_llm_provider()
+    if provider is not None:
         try:
-            resp = client.chat.completions.create(
-                model="gpt-4o-mini",
-                messages=[{"role": "user", "content": prompt}],
-                temperature=0.1,
-                max_tokens=160,
-            )
-            return resp.choices[0].message.content or question
+            with span("llm.hyde"):
+                return await provider.acomplete(_hyde_messages(question), temperature=0.1, max_tokens=160) or question
         except Exception:
-            pass
-
-    # Fallback: simple keyword-focused template
-    return f"This text describes: {question}. Definitions, key properties, examples, usage, related terms, and context."
+            logger.warning("HyDE generation failed; using fallback", exc_info=True)
+    count_fallback("llm_hyde")
+    return _fallback_hypothetical_document(question)
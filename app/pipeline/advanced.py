@@ -1,28 +1,63 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Tuple
 
-from app.llm.providers import generate_answer, generate_hypothetical_document
-from app.retrieval.embeddings import EmbeddingModel
+from app.core.metrics import span, timed
+from app.llm.providers import (
+    current_llm_model_id,
+    generate_answer,
+    generate_hypothetical_document_with_source,
+)
 from app.ingestion.index import (
     SENTENCE_WINDOW_COLLECTION,
     query_top_k,
     query_top_k_with_embedding,
 )
-from app.retrieval.rerank import Reranker
+from app.retrieval.hyde_cache import HydeCache, get_hyde_cache
+from app.retrieval.registry import get_query_embedder, get_reranker
+from app.retrieval.semantic_cache import answer_through_cache, get_semantic_cache
+
+
+@timed("hyde")
+def retrieve_with_hyde(
+    question: str, k: int = 8, *, collection_name: str = SENTENCE_WINDOW_COLLECTION, window_size: Optional[int] = None
+) -> List[Tuple[str, Dict[str, str], float]]:
+    embedder = get_query_embedder()
+    cache = get_hyde_cache()
+    llm_model = current_llm_model_id()
+    key = HydeCache.make_key(question, llm_model, embedder.model_name or "") if cache is not None else None
+    cached = cache.get(key) if cache is not None and key is not None else None
+    if cached is not None:
+        _hyde_text, hyde_vec = cached
+    else:
+        hyde_text, produced_by = generate_hypothetical_document_with_source(question)
+        hyde_vec = embedder.embed_one(hyde_text)
+        # Do not let a transient LLM failure pin the fallback text under the LLM's key
+        if cache is not None and key is not None and produced_by == llm_model:
+            cache.put(key, hyde_text, hyde_vec)
+    return query_top_k_with_embedding(hyde_vec, k=k, collection_name=collection_name, window_size=window_size)
+
 
+def retrieve_with_hyde_and_rerank(
+    question: str, k: int = 8, rerank_top_k: int = 5, window_size: Optional[int] = None
+) -> List[Tuple[str, Dict[str, str], float]]:
+    initial = retrieve_with_hyde(question, k=max(k, rerank_top_k), window_size=window_size)
+    reranker = get_reranker()
+    return reranker.rerank(question, initial, top_k=k)
 
-def retrieve_with_hyde(question: str, k: int = 8, *, collection_name: str = SENTENCE_WINDOW_COLLECTION) -> List[Tuple[str, Dict[str, str], float]]:
-    hyde_text = generate_hypothetical_document(question)
-    embedder = EmbeddingModel()
-    hyde_vec = embedder.embed_one(hyde_text)
-    return query_top_k_with_embedding(hyde_vec, k=k, collection_name=collection_name)
 
+def answer_with_hyde_and_rerank(
+    question: str, k: int = 8, rerank_top_k: int = 5, window_size: Optional[int] = None
+) -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
+    def compute() -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
+        with span("retrieve"):
+            reranked = retrieve_with_hyde_and_rerank(question, k=k, rerank_top_k=rerank_top_k, window_size=window_size)
+        contexts = [t for t, _m, _s in reranked]
+        with span("generate"):
+            answer = generate_answer(question, contexts)
+        return answer, reranked
 
-def answer_with_hyde_and_rerank(question: str, k: int = 8, rerank_top_k: int = 5) -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
-    initial = retrieve_with_hyde(question, k=max(k, rerank_top_k))
-    reranker = Reranker()
-    reranked = reranker.rerank(question, initial)[:k]
-    contexts = [t for t, _m, _s in reranked]
-    answer = generate_answer(question, contexts)
-    return answer, reranked
+    # HyDE retrieval never embeds the raw question, so only pay for it when caching
+    qvec = get_query_embedder().embed_one(question) if get_semantic_cache() is not None else None
+    params = (k, rerank_top_k) if window_size is None else (k, rerank_top_k, f"window:{window_size}")
+    return answer_through_cache("hyde_rerank", SENTENCE_WINDOW_COLLECTION, params, qvec, compute)
@@ -1,66 +1,218 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
-
-from app.ingestion.loaders import chunk_text, load_documents
-from app.ingestion.index import index_chunks, query_top_k, index_items, SENTENCE_WINDOW_COLLECTION
-from app.ingestion.sentence_window import split_into_sentence_windows
-from app.retrieval.embeddings import EmbeddingModel
+import logging
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.core.config import get_settings
+from app.core.metrics import span, timed
+from app.ingestion.chunking import get_chunk_tokenizer, iter_chunk_spans
+from app.ingestion.loaders import iter_batches, iter_load_documents, join_pages, page_at
+from app.ingestion.index import (
+    DEFAULT_BASELINE_COLLECTION,
+    SENTENCE_WINDOW_COLLECTION,
+    delete_sources,
+    flush_collection,
+    index_items,
+)
+from app.ingestion.manifest import IngestManifest, IngestPlan, SourceFile, chunk_id
+from app.ingestion.sentence_store import document_id, get_sentence_store
+from app.ingestion.sentence_window import iter_sentence_spans
+from app.retrieval.embeddings import collect_embedding_counts
+from app.retrieval.registry import get_embedding_model, get_query_embedder
+from app.retrieval.hybrid import cache_params, retrieve
+from app.retrieval.semantic_cache import answer_through_cache, get_semantic_cache
 from app.llm.providers import generate_answer
 
 
-def ingest_paths(paths: List[str] | None, chunk_size: int = 1000, chunk_overlap: int = 200) -> Tuple[int, int]:
-    """Load documents from paths and index their chunks.
+logger = logging.getLogger(__name__)
 
-    Returns:
-        Tuple[num_documents, num_chunks]
-    """
 
-    docs = load_documents(paths)
-    all_chunks: List[Tuple[str, Dict[str, str]]] = []
-    for text, meta in docs:
-        parts = chunk_text(text, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-        for p in parts:
-            all_chunks.append((p, meta))
-    return index_chunks(all_chunks)
+def _apply_plan_removals(manifest: IngestManifest, plan: IngestPlan, collection_name: str) -> None:
+    # Old chunks of changed files go too; their ids depend on the previous content hash
+    stale = plan.removed + [sf.source for sf in plan.changed]
+    delete_sources(stale, collection_name=collection_name)
+    for source in plan.removed:
+        manifest.forget(source)
 
 
-def ingest_sentence_windows(paths: List[str] | None, window_size: int = 2) -> Tuple[int, int]:
-    """Index sentence-window documents.
+def _embedding_cache_hit_rate(counts: Dict[str, int]) -> Optional[float]:
+    # Share of the texts this ingest embedded that were served from the cache or
+    # duplicated within a batch instead of being encoded
+    texts = counts["texts"]
+    return round(1.0 - counts["encoded"] / texts, 4) if texts > 0 else None
 
-    Embeddings are computed from the center sentence, but stored document text is the full window.
-    """
 
-    docs = load_documents(paths)
-    documents: List[str] = []
-    metadatas: List[Dict[str, str]] = []
-    sentences: List[str] = []
+def _load_changed(changed: List[SourceFile]) -> Iterator[Tuple[SourceFile, List[str]]]:
+    # Documents stream through in plan order; only a bounded window is held in memory
+    cfg = get_settings().ingestion
+    by_path = {sf.path: sf for sf in changed}
+    for path, pages in iter_load_documents(list(by_path), cfg.loader_workers, cfg.prefetch_documents):
+        yield by_path[path], pages
 
-    for text, meta in docs:
-        windows = split_into_sentence_windows(text, window_size=window_size)
-        for window_text, window_meta in windows:
-            combined_meta: Dict[str, str] = {**meta, **window_meta}
-            documents.append(window_text)
-            metadatas.append(combined_meta)
-            sentences.append(window_meta["sentence_text"])
 
-    if not documents:
-        return 0, 0
+@timed("ingest.baseline")
+def ingest_paths(paths: List[str] | None, chunk_size: int = 256, chunk_overlap: int = 32) -> Tuple[int, int]:
+    """Incrementally index chunks of the documents under `paths`.
 
-    embedder = EmbeddingModel()
-    sentence_embeddings = embedder.embed(sentences)
-    return index_items(documents, metadatas, embeddings=sentence_embeddings, collection_name=SENTENCE_WINDOW_COLLECTION)
+    `chunk_size` and `chunk_overlap` are in tokens of `ingestion.chunk_tokenizer`;
+    chunks follow paragraph and sentence boundaries (see `iter_chunk_spans`).
 
+    Unchanged files (per the collection manifest) are skipped, changed files have
+    their chunks replaced and files that disappeared are purged. Documents are loaded,
+    chunked, embedded and written as a stream of `ingestion.batch_size` batches.
 
-def answer_question(question: str, k: int = 5) -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
-    retrieved = query_top_k(question, k=k)
-    contexts = [t for t, _m, _s in retrieved]
-    answer = generate_answer(question, contexts)
-    return answer, retrieved
+    Returns:
+        Tuple[num_documents, num_chunks] indexed by this call
+    """
 
+    tokenizer_name = get_settings().ingestion.chunk_tokenizer
+    params = f"tokens:{tokenizer_name}:{chunk_size}:{chunk_overlap}"
+    with IngestManifest.lock_for(DEFAULT_BASELINE_COLLECTION):
+        manifest = IngestManifest.for_collection(DEFAULT_BASELINE_COLLECTION)
+        plan = manifest.plan(paths, params)
+        _apply_plan_removals(manifest, plan, DEFAULT_BASELINE_COLLECTION)
+
+        counts: List[Tuple[SourceFile, int]] = []
+
+        def chunks() -> Iterator[Tuple[str, Dict[str, str], str]]:
+            token_spans, max_tokens = get_chunk_tokenizer()
+            for sf, pages in _load_changed(plan.changed):
+                text, offsets = join_pages(pages)
+                spans = list(iter_chunk_spans(text, chunk_size, chunk_overlap, token_spans, max_tokens))
+                paged = sf.path.suffix.lower() == ".pdf"
+                for i, (start, end) in enumerate(spans):
+                    meta = {"source": sf.source}
+                    if paged:
+                        meta["page"] = str(page_at(offsets, start))
+                        meta["page_end"] = str(page_at(offsets, end - 1))
+                    yield text[start:end], meta, chunk_id(sf.source, params, sf.sha256, i)
+                counts.append((sf, len(spans)))
+
+        # Embed and write in fixed-size batches so memory does not grow with corpus size
+        num_chunks = 0
+        with collect_embedding_counts() as embedded:
+            for batch in iter_batches(chunks(), get_settings().ingestion.batch_size):
+                documents = [text for text, _m, _id in batch]
+                metadatas = [meta for _t, meta, _id in batch]
+                ids = [cid for _t, _m, cid in batch]
+                index_items(documents, metadatas, collection_name=DEFAULT_BASELINE_COLLECTION, ids=ids)
+                num_chunks += len(batch)
+
+        flush_collection(DEFAULT_BASELINE_COLLECTION)
+        for sf, n in counts:
+            manifest.record(sf, params, n)
+        manifest.save()
+    result = (sum(1 for _sf, n in counts if n), num_chunks)
+    logger.info(
+        "Ingest complete",
+        extra={
+            "changed": len(plan.changed),
+            "unchanged": len(plan.unchanged),
+            "removed": len(plan.removed),
+            "chunks": result[1],
+            "embedding_cache_hit_rate": _embedding_cache_hit_rate(embedded),
+        },
+    )
+    return result
+
+
+@timed("ingest.sentence_window")
+def ingest_sentence_windows(paths: List[str] | None, window_size: int = 2) -> Tuple[int, int]:
+    """Index sentence-window documents incrementally.
+
+    Each document's text and sentence spans are stored once in the collection's
+    sentence table. An index entry holds the center sentence, its embedding,
+    `(doc_id, s_idx, e_idx)` and the window's character offsets; windows are
+    sliced from the text at query time, where `window_size` is only the default.
+    """
 
-def answer_question_with_collection(question: str, k: int = 5, collection_name: str = "baseline") -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
-    retrieved = query_top_k(question, k=k, collection_name=collection_name)
-    contexts = [t for t, _m, _s in retrieved]
-    answer = generate_answer(question, contexts)
-    return answer, retrieved
+    params = f"spans:window:{window_size}"
+    with IngestManifest.lock_for(SENTENCE_WINDOW_COLLECTION):
+        manifest = IngestManifest.for_collection(SENTENCE_WINDOW_COLLECTION)
+        plan = manifest.plan(paths, params)
+        _apply_plan_removals(manifest, plan, SENTENCE_WINDOW_COLLECTION)
+        store = get_sentence_store(SENTENCE_WINDOW_COLLECTION)
+
+        counts: List[Tuple[SourceFile, int]] = []
+
+        def sentences() -> Iterator[Tuple[str, Dict[str, str], str]]:
+            cfg = get_settings().ingestion
+            texts = ((sf, "\n".join(pages)) for sf, pages in _load_changed(plan.changed))
+            for sf, text, spans in iter_sentence_spans(texts, cfg.segment_workers, cfg.segment_parallel_min_chars):
+                doc_id = document_id(sf.source, sf.sha256)
+                store.put(doc_id, sf.source, text, spans)
+                bounds = spans.tolist()
+                last = len(bounds) - 1
+                for i, (start, end) in enumerate(bounds):
+                    s_idx, e_idx = max(0, i - window_size), min(last, i + window_size)
+                    meta = {
+                        "source": sf.source,
+                        "doc_id": doc_id,
+                        "sent_idx": str(i),
+                        "s_idx": str(s_idx),
+                        "e_idx": str(e_idx),
+                        "char_start": str(bounds[s_idx][0]),
+                        "char_end": str(bounds[e_idx][1]),
+                    }
+                    yield text[start:end], meta, chunk_id(sf.source, params, sf.sha256, i)
+                counts.append((sf, len(bounds)))
+
+        num_windows = 0
+        with collect_embedding_counts() as embedded:
+            for batch in iter_batches(sentences(), get_settings().ingestion.batch_size):
+                documents = [text for text, _m, _id in batch]
+                metadatas = [meta for _t, meta, _id in batch]
+                ids = [cid for _t, _m, cid in batch]
+                # Both retrievers match on the center sentence; hits are expanded to windows
+                index_items(
+                    documents,
+                    metadatas,
+                    embeddings=get_embedding_model().embed(documents, cache=True),
+                    collection_name=SENTENCE_WINDOW_COLLECTION,
+                    ids=ids,
+                )
+                num_windows += len(batch)
+
+        flush_collection(SENTENCE_WINDOW_COLLECTION)
+        for sf, n in counts:
+            manifest.record(sf, params, n)
+        manifest.save()
+    result = (sum(1 for _sf, n in counts if n), num_windows)
+    logger.info(
+        "Sentence-window ingest complete",
+        extra={
+            "changed": len(plan.changed),
+            "unchanged": len(plan.unchanged),
+            "removed": len(plan.removed),
+            "chunks": result[1],
+            "embedding_cache_hit_rate": _embedding_cache_hit_rate(embedded),
+        },
+    )
+    return result
+
+
+def answer_question(question: str, k: int = 5, retrieval: str = "dense") -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
+    return answer_question_with_collection(question, k=k, collection_name=DEFAULT_BASELINE_COLLECTION, retrieval=retrieval)
+
+
+def answer_question_with_collection(
+    question: str,
+    k: int = 5,
+    collection_name: str = "baseline",
+    retrieval: str = "dense",
+    window_size: Optional[int] = None,
+) -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
+    # BM25-only retrieval never embeds the question, so only pay for it when caching
+    needs_vector = retrieval != "bm25" or get_semantic_cache() is not None
+    qvec = get_query_embedder().embed_one(question) if needs_vector else None
+
+    def compute() -> Tuple[str, List[Tuple[str, Dict[str, str], float]]]:
+        retrieved = retrieve(question, k, collection_name, retrieval, question_vector=qvec, window_size=window_size)
+        contexts = [t for t, _m, _s in retrieved]
+        with span("generate"):
+            answer = generate_answer(question, contexts)
+        return answer, retrieved
+
+    # The question embedding doubles as the semantic cache key, so lookups cost nothing extra
+    params = cache_params(k, retrieval, window_size)
+    return answer_through_cache(collection_name, collection_name, params, qvec, compute)
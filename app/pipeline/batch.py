@@ -0,0 +1,196 @@
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import count_cache, span, timed
+from app.ingestion.index import DEFAULT_BASELINE_COLLECTION, SENTENCE_WINDOW_COLLECTION, query_top_k_many
+from app.llm.providers import current_llm_model_id, generate_answer, generate_hypothetical_document_with_source
+from app.retrieval.hybrid import RETRIEVAL_MODES, cache_params, candidate_depth, fuse_with_lexical, lexical_top_k
+from app.retrieval.hyde_cache import HydeCache, get_hyde_cache
+from app.retrieval.registry import get_embedding_model, get_reranker
+from app.retrieval.semantic_cache import get_semantic_cache
+
+
+logger = logging.getLogger(__name__)
+
+Retrieved = List[Tuple[str, Dict[str, str], float]]
+
+# Matches the defaults of `answer_with_hyde_and_rerank`, so batch and single
+# queries share semantic cache entries
+RERANK_TOP_K = 5
+
+
+@dataclass
+class BatchAnswer:
+    """Outcome for one question of a batch; `error` is set instead of raising."""
+
+    answer: Optional[str] = None
+    retrieved: Retrieved = field(default_factory=list)
+    error: Optional[str] = None
+
+
+@timed("hyde")
+def _hyde_vectors(questions: List[str], pool: ThreadPoolExecutor) -> np.ndarray:
+    """HyDE embeddings for `questions`: cached where possible, the rest generated
+    concurrently and embedded in one call."""
+
+    embedder = get_embedding_model()
+    cache = get_hyde_cache()
+    llm_model = current_llm_model_id()
+    keys = [HydeCache.make_key(q, llm_model, embedder.model_name or "") for q in questions] if cache is not None else []
+    vectors: List[Optional[np.ndarray]] = [None] * len(questions)
+    if cache is not None:
+        for i, key in enumerate(keys):
+            hit = cache.get(key)
+            if hit is not None:
+                vectors[i] = hit[1]
+
+    missing = [i for i, v in enumerate(vectors) if v is None]
+    if missing:
+        generated = list(pool.map(generate_hypothetical_document_with_source, [questions[i] for i in missing]))
+        embedded = embedder.embed([text for text, _model in generated])
+        for i, (text, produced_by), vec in zip(missing, generated, embedded):
+            vectors[i] = vec
+            # Do not let a transient LLM failure pin the fallback text under the LLM's key
+            if cache is not None and produced_by == llm_model:
+                cache.put(keys[i], text, vec)
+    return np.stack(vectors)  # type: ignore[arg-type]
+
+
+def _retrieve_hyde_rerank(
+    questions: List[str], k: int, pool: ThreadPoolExecutor, window_size: Optional[int] = None
+) -> List[Retrieved]:
+    hyde = _hyde_vectors(questions, pool)
+    initial = query_top_k_many(
+        hyde, k=max(k, RERANK_TOP_K), collection_name=SENTENCE_WINDOW_COLLECTION, window_size=window_size
+    )
+    return get_reranker().rerank_many(questions, initial, top_k=k)
+
+
+def _retrieve_first_stage(
+    questions: List[str],
+    qvecs: List[Optional[np.ndarray]],
+    k: int,
+    collection: str,
+    retrieval: str,
+    window_size: Optional[int] = None,
+) -> List[Retrieved]:
+    """Dense retrieval stays one multi-vector query; BM25 runs per question."""
+
+    if retrieval == "bm25":
+        return [lexical_top_k(q, k, collection, window_size) for q in questions]
+    depth = k if retrieval == "dense" else candidate_depth(k)
+    dense = query_top_k_many(
+        np.stack(qvecs), k=depth, collection_name=collection, window_size=window_size  # type: ignore[arg-type]
+    )
+    if retrieval == "dense":
+        return dense
+    return [fuse_with_lexical(q, hits, k, collection, window_size) for q, hits in zip(questions, dense)]
+
+
+def answer_questions_batch(
+    questions: Sequence[str],
+    k: int = 5,
+    mode: str = "baseline",
+    use_hyde: bool = False,
+    use_rerank: bool = False,
+    retrieval: str = "dense",
+    window_size: Optional[int] = None,
+) -> List[BatchAnswer]:
+    """Answer many questions, batching every stage that can be batched.
+
+    Questions are embedded in one encode call and retrieved with one multi-vector
+    store query; with HyDE/rerank all candidate pairs are scored in one
+    cross-encoder call. Generations run concurrently, bounded by
+    `llm.batch_concurrency`. Results follow the input order and a failure only
+    marks the affected items. `retrieval` selects dense, bm25 or hybrid
+    first-stage retrieval for the non-HyDE modes; `window_size` overrides the
+    ingest-time sentence window.
+    """
+
+    if retrieval not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {retrieval}")
+    results = [BatchAnswer() for _ in questions]
+    active: List[int] = []
+    for i, question in enumerate(questions):
+        if question.strip():
+            active.append(i)
+        else:
+            results[i].error = "empty question"
+    if not active:
+        return results
+
+    advanced = use_hyde or use_rerank
+    if advanced:
+        collection = SENTENCE_WINDOW_COLLECTION
+        cache_mode, params = "hyde_rerank", (k, RERANK_TOP_K)
+        if window_size is not None:
+            params += (f"window:{window_size}",)
+    else:
+        collection = SENTENCE_WINDOW_COLLECTION if mode == "sentence_window" else DEFAULT_BASELINE_COLLECTION
+        cache_mode, params = collection, cache_params(k, retrieval, window_size)
+    semantic = get_semantic_cache()
+    generation = semantic.generation(collection) if semantic is not None else None
+
+    with ThreadPoolExecutor(max_workers=max(1, get_settings().llm.batch_concurrency), thread_name_prefix="batch-llm") as pool:
+        todo = active
+        qvecs: Dict[int, np.ndarray] = {}
+        try:
+            started = time.perf_counter()
+            # HyDE and BM25 retrieval never embed the raw question, so only pay for it when caching
+            if (not advanced and retrieval != "bm25") or semantic is not None:
+                matrix = get_embedding_model().embed([questions[i] for i in active])
+                qvecs = dict(zip(active, matrix))
+            if semantic is not None:
+                todo = []
+                for i in active:
+                    hit = semantic.lookup(cache_mode, collection, params, qvecs[i])
+                    count_cache("semantic", int(hit is not None), int(hit is None))
+                    if hit is None:
+                        todo.append(i)
+                    else:
+                        results[i].answer, results[i].retrieved = hit
+            if not todo:
+                return results
+            with span("batch.retrieve"):
+                if advanced:
+                    retrieved = _retrieve_hyde_rerank([questions[i] for i in todo], k, pool, window_size)
+                else:
+                    retrieved = _retrieve_first_stage(
+                        [questions[i] for i in todo], [qvecs.get(i) for i in todo], k, collection, retrieval, window_size
+                    )
+            retrieval_share = (time.perf_counter() - started) / len(todo)
+        except Exception as exc:
+            logger.exception("Batch retrieval failed", extra={"questions": len(todo)})
+            for i in todo:
+                results[i].error = f"retrieval failed: {exc}"
+            return results
+
+        def generate(item: Tuple[int, Retrieved]) -> Tuple[str, float]:
+            i, hits = item
+            t0 = time.perf_counter()
+            answer = generate_answer(questions[i], [t for t, _m, _s in hits])
+            return answer, time.perf_counter() - t0
+
+        futures = [pool.submit(generate, item) for item in zip(todo, retrieved)]
+        for i, hits, future in zip(todo, retrieved, futures):
+            results[i].retrieved = hits
+            try:
+                answer, latency_s = future.result()
+            except Exception as exc:
+                logger.warning("Batch generation failed", exc_info=True)
+                results[i].error = f"generation failed: {exc}"
+                continue
+            results[i].answer = answer
+            if semantic is not None:
+                semantic.store(
+                    cache_mode, collection, params, qvecs[i], (answer, hits), latency_s + retrieval_share, generation
+                )
+    return results
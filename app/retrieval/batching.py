@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.metrics import observe_batch, span
+from app.retrieval.embeddings import EmbeddingModel
+
+
+logger = logging.getLogger(__name__)
+
+_Pending = Tuple[str, "Future[np.ndarray]", float]
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent `embed_one` calls into batched `encode` calls.
+
+    Callers block on a future while a single worker thread collects requests for up to
+    `max_wait_ms` (or until `max_batch_size` is reached), embeds them in one call and
+    hands each caller its vector. Exposes the same `embed`/`embed_one` surface as
+    `EmbeddingModel` so it can be used interchangeably.
+
+    A caller waits at most `timeout_s` for its vector. After `close` queued and new
+    requests fail with `RuntimeError` instead of waiting for a worker that is gone.
+    """
+
+    def __init__(
+        self, model: EmbeddingModel, max_batch_size: int = 32, max_wait_ms: float = 5.0, timeout_s: float = 30.0
+    ) -> None:
+        self.model = model
+        self.model_name = getattr(model, "model_name", None)
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_s = max(0.0, max_wait_ms) / 1000.0
+        self.timeout_s = timeout_s
+        self._queue: "queue.Queue[Optional[_Pending]]" = queue.Queue()
+        self._closed = False
+        self._close_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._batches = 0
+        self._items = 0
+        self._largest_batch = 0
+        self._wait_total_s = 0.0
+        self._wait_max_s = 0.0
+        self._size_histogram: Dict[str, int] = {}
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    def embed(self, texts: List[str], cache: bool = False) -> np.ndarray:
+        # Bulk callers (ingestion) already batch; send them straight to the model
+        return self.model.embed(texts, cache=cache)
+
+    def embed_one(self, text: str) -> np.ndarray:
+        future: "Future[np.ndarray]" = Future()
+        with span("embed.query"):
+            with self._close_lock:
+                if self._closed:
+                    raise RuntimeError("Embedding batcher is closed")
+                self._queue.put((text, future, time.perf_counter()))
+            return future.result(timeout=self.timeout_s)
+
+    def close(self) -> None:
+        with self._close_lock:
+            if self._closed:
+                return
+            self._closed = True
+            # Nothing can be enqueued any more; fail what the worker has not picked up
+            while True:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is not None:
+                    item[1].set_exception(RuntimeError("Embedding batcher is closed"))
+            self._queue.put(None)
+        self._worker.join(timeout=1.0)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            batches = self._batches
+            return {
+                "batches": batches,
+                "items": self._items,
+                "avg_batch_size": (self._items / batches) if batches else 0.0,
+                "max_batch_size": self._largest_batch,
+                "avg_queue_wait_ms": (self._wait_total_s / self._items * 1000.0) if self._items else 0.0,
+                "max_queue_wait_ms": self._wait_max_s * 1000.0,
+                "batch_size_histogram": dict(self._size_histogram),
+            }
+
+    def _collect(self, first: _Pending) -> Tuple[List[_Pending], bool]:
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait_s
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is None:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is None:
+                return
+            batch, stop = self._collect(first)
+            started = time.perf_counter()
+            try:
+                vectors = self.model.embed([text for text, _f, _t in batch])
+                if len(vectors) != len(batch):
+                    raise ValueError(f"Embedding model returned {len(vectors)} vectors for {len(batch)} texts")
+            except Exception as exc:
+                logger.exception("Batched embedding failed", extra={"batch_size": len(batch)})
+                for _text, future, _t in batch:
+                    future.set_exception(exc)
+            else:
+                for (_text, future, _t), vec in zip(batch, vectors):
+                    future.set_result(vec)
+            self._record(batch, started)
+            if stop:
+                return
+
+    def _record(self, batch: List[_Pending], started: float) -> None:
+        waits = [started - enqueued for _text, _f, enqueued in batch]
+        bucket = _size_bucket(len(batch))
+        observe_batch("query_embedding", len(batch))
+        with self._stats_lock:
+            self._batches += 1
+            self._items += len(batch)
+            self._largest_batch = max(self._largest_batch, len(batch))
+            self._wait_total_s += sum(waits)
+            self._wait_max_s = max(self._wait_max_s, max(waits))
+            self._size_histogram[bucket] = self._size_histogram.get(bucket, 0) + 1
+
+
+def _size_bucket(size: int) -> str:
+    """Power-of-two bucket label for the batch size histogram."""
+
+    upper = 1
+    while upper < size:
+        upper *= 2
+    return f"<={upper}"
@@ -1,23 +1,272 @@
 from __future__ import annotations
 
-from typing import List
+import hashlib
+import re
+import sqlite3
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:  # POSIX only; elsewhere concurrent writers are not serialized
+    import fcntl
+except ImportError:  # pragma: no cover
+    fcntl = None  # type: ignore[assignment]
 
 import numpy as np
 from sentence_transformers import SentenceTransformer
 
 from app.core.config import get_settings
+from app.core.metrics import count_cache, observe_batch, span
+from app.retrieval.inference import load_model
+
+
+DEFAULT_EMBEDDING_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+
+# Texts embedded through the cache and how many of them were encoded, collected
+# only inside `collect_embedding_counts`.
+_cache_counts: ContextVar[Optional[Dict[str, int]]] = ContextVar("embedding_cache_counts", default=None)
+
+
+def text_digest(text: str) -> bytes:
+    return hashlib.sha256(text.encode("utf-8")).digest()
+
+
+class EmbeddingCache:
+    """Persistent embeddings of one model, keyed by the SHA-256 of the text.
+
+    Vectors are append-only rows of a memory-mapped `vectors.f32`; `index.sqlite3`
+    maps each digest to its row and is committed after the vectors are flushed, so
+    a crash can only leave unreferenced rows behind. The digest index is held in
+    memory. Writers hold an exclusive lock on the directory's `write.lock` and
+    append after rows other processes have written.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(str(self.directory / "index.sqlite3"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS entries (digest BLOB PRIMARY KEY, row INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+        meta = dict(self._db.execute("SELECT key, value FROM meta").fetchall())
+        self.dim: Optional[int] = int(meta["dim"]) if "dim" in meta else None
+        self._rows: Dict[bytes, int] = dict(self._db.execute("SELECT digest, row FROM entries").fetchall())
+        self._size = max(self._rows.values(), default=-1) + 1
+        self._vectors: Optional[np.ndarray] = None
+        if self.dim is not None:
+            self._map(max(self._size, self._capacity_on_disk()))
+
+    @property
+    def _vectors_path(self) -> Path:
+        return self.directory / "vectors.f32"
+
+    def _capacity_on_disk(self) -> int:
+        assert self.dim is not None
+        return self._vectors_path.stat().st_size // (4 * self.dim) if self._vectors_path.exists() else 0
+
+    def _map(self, capacity: int) -> None:
+        assert self.dim is not None
+        capacity = max(capacity, 1)
+        with self._vectors_path.open("ab") as f:
+            f.truncate(capacity * self.dim * 4)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    @contextmanager
+    def _write_lock(self) -> Iterator[None]:
+        with (self.directory / "write.lock").open("a") as f:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_EX)  # released when the file is closed
+            yield
+
+    def _sync_from_disk(self) -> None:
+        # Rows appended by other processes since we opened (or last wrote)
+        if self.dim is None:
+            row = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            if row is None:
+                return
+            self.dim = int(row[0])
+        (last,) = self._db.execute("SELECT COALESCE(MAX(row), -1) FROM entries").fetchone()
+        self._size = max(self._size, int(last) + 1)
+        on_disk = self._capacity_on_disk()
+        if self._vectors is None or on_disk > self._vectors.shape[0]:
+            self._map(max(on_disk, self._size))
+
+    def get_many(self, digests: Sequence[bytes]) -> Tuple[List[int], np.ndarray]:
+        """Positions in `digests` that are cached, and their vectors in that order."""
+
+        with self._lock:
+            found = [(i, self._rows[d]) for i, d in enumerate(digests) if d in self._rows]
+            if not found or self._vectors is None:
+                return [], np.zeros((0, self.dim or 0), dtype=np.float32)
+            rows = np.fromiter((row for _i, row in found), dtype=np.int64, count=len(found))
+            return [i for i, _row in found], np.array(self._vectors[rows], dtype=np.float32)
+
+    def put_many(self, digests: Sequence[bytes], vectors: np.ndarray) -> None:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            fresh = [j for j, d in enumerate(digests) if d not in self._rows]
+            if not fresh:
+                return
+            with self._write_lock():
+                self._sync_from_disk()
+                if self.dim is None:
+                    self.dim = int(matrix.shape[1])
+                    self._db.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('dim', ?)", (str(self.dim),))
+                    self._map(max(1024, len(fresh)))
+                elif matrix.shape[1] != self.dim:
+                    raise ValueError(f"Embedding dimension {matrix.shape[1]} does not match cache dimension {self.dim}")
+                assert self._vectors is not None
+                needed = self._size + len(fresh)
+                capacity = self._vectors.shape[0]
+                if needed > capacity:
+                    while capacity < needed:
+                        capacity *= 2
+                    self._vectors.flush()
+                    self._map(capacity)
+                start = self._size
+                self._vectors[start:needed] = matrix[fresh]
+                self._vectors.flush()
+                entries = [(digests[j], start + n) for n, j in enumerate(fresh)]
+                self._db.executemany("INSERT OR REPLACE INTO entries (digest, row) VALUES (?, ?)", entries)
+                self._db.commit()
+                self._rows.update(entries)
+                self._size = needed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._vectors is not None:
+                self._vectors.flush()
+            self._db.close()
+            self._vectors = None
+
+
+def open_embedding_cache(model_name: str, backend: str = "torch") -> Optional[EmbeddingCache]:
+    """The cache for `model_name` under `embedding.cache_dir`, or None when disabled.
+
+    Vectors from different backends (e.g. int8 ONNX) are not mixed.
+    """
+
+    cache_dir = get_settings().embedding.cache_dir
+    if not cache_dir:
+        return None
+    name = model_name if backend == "torch" else f"{model_name}@{backend}"
+    return EmbeddingCache(Path(cache_dir) / re.sub(r"[^\w.@-]+", "__", name))
+
+
+@contextmanager
+def collect_embedding_counts() -> Iterator[Dict[str, int]]:
+    """Count the `texts` embedded with `cache=True` in this context and how many
+    of them were `encoded`; the rest were cache or in-batch hits."""
+
+    counts = {"texts": 0, "encoded": 0}
+    token = _cache_counts.set(counts)
+    try:
+        yield counts
+    finally:
+        _cache_counts.reset(token)
 
 
 class EmbeddingModel:
-    """Wrapper around SentenceTransformer for deterministic, simple use."""
+    """Wrapper around SentenceTransformer for deterministic, simple use.
+
+    The model runs on the `inference.backend` (PyTorch or ONNX); `backend`
+    records which one actually loaded. Ingestion looks embeddings up in (and adds
+    them to) the persistent `EmbeddingCache` by passing `cache=True`; the cache is
+    opened on that first use, so query-only processes never load it.
+    """
 
     def __init__(self, model_name: str | None = None) -> None:
-        settings = get_settings()
-        self.model = SentenceTransformer(model_name or "sentence-transformers/all-MiniLM-L6-v2")
+        self.model_name = model_name or DEFAULT_EMBEDDING_MODEL
+        self.model, self.backend = load_model(SentenceTransformer, self.model_name)
+        self._cache: Optional[EmbeddingCache] = None
+        self._cache_opened = False
+        self._cache_lock = threading.Lock()
+
+    @property
+    def cache(self) -> Optional[EmbeddingCache]:
+        """The persistent embedding cache, opened on first access (None when disabled)."""
+
+        if not self._cache_opened:
+            with self._cache_lock:
+                if not self._cache_opened:
+                    self._cache = open_embedding_cache(self.model_name, self.backend)
+                    self._cache_opened = True
+        return self._cache
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        observe_batch("embedding", len(texts))
+        with span("embed.encode"):
+            vectors = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        return np.ascontiguousarray(vectors, dtype=np.float32)
+
+    def embed(self, texts: List[str], cache: bool = False) -> np.ndarray:
+        """Embed `texts` into an `(n, dim)` C-contiguous float32 matrix of unit vectors.
+
+        Repeated texts are encoded once per call. With `cache`, vectors of texts
+        seen before are read from the embedding cache and only the misses are
+        encoded (and stored). Only ingestion caches: query and HyDE texts rarely
+        repeat and would grow the cache without bound. Vectors stay in NumPy all the way to the vector store;
+        converting them to Python floats would box every component.
+        """
+
+        if not texts:
+            return self._encode(list(texts))
+        positions: Dict[str, int] = {}
+        inverse = np.fromiter((positions.setdefault(t, len(positions)) for t in texts), dtype=np.int64, count=len(texts))
+        distinct = list(positions)
+        store = self.cache if cache else None
+
+        hits: List[int] = []
+        cached = np.zeros((0, 0), dtype=np.float32)
+        digests: List[bytes] = []
+        if store is not None:
+            digests = [text_digest(t) for t in distinct]
+            hits, cached = store.get_many(digests)
+            count_cache("embedding", len(hits), len(distinct) - len(hits))
+        hit_set = set(hits)
+        misses = [i for i in range(len(distinct)) if i not in hit_set]
+        encoded = self._encode([distinct[i] for i in misses]) if misses else None
+
+        dim = encoded.shape[1] if encoded is not None else cached.shape[1]
+        matrix = np.empty((len(distinct), dim), dtype=np.float32)
+        if hits:
+            matrix[hits] = cached
+        if encoded is not None:
+            matrix[misses] = encoded
+            if store is not None:
+                store.put_many([digests[i] for i in misses], encoded)
+        counts = _cache_counts.get()
+        if cache and counts is not None:
+            counts["texts"] += len(texts)
+            counts["encoded"] += len(misses)
+        return matrix if len(distinct) == len(texts) else matrix[inverse]
+
+    def embed_one(self, text: str) -> np.ndarray:
+        with span("embed.query"):
+            return self.embed([text])[0]
+
+    @property
+    def max_tokens(self) -> int:
+        """Longest input, in tokens excluding special ones, encoded without truncation."""
+
+        special = self.model.tokenizer.num_special_tokens_to_add(pair=False)
+        return int(self.model.max_seq_length) - special
 
-    def embed(self, texts: List[str]) -> List[List[float]]:
-        vectors = self.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
-        return [v.astype(float).tolist() for v in vectors]
+    def token_spans(self, text: str) -> np.ndarray:
+        """Character spans of the model's tokens in `text`, as an `(n, 2)` int64 array."""
 
-    def embed_one(self, text: str) -> List[float]:
-        return self.embed([text])[0]
+        encoded = self.model.tokenizer(
+            text,
+            add_special_tokens=False,
+            return_offsets_mapping=True,
+            return_attention_mask=False,
+            return_token_type_ids=False,
+            verbose=False,
+        )
+        return np.asarray(encoded["offset_mapping"], dtype=np.int64).reshape(-1, 2)
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import heapq
+import math
+import random
+from pathlib import Path
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+
+class HNSWGraph:
+    """Hierarchical navigable small-world graph over the rows of a vector matrix.
+
+    The graph stores only links; vectors stay in the caller's matrix (typically
+    memory-mapped) and are passed to `insert`/`search` together with their
+    squared norms, so distances are squared L2 computed as `|x|^2 + |q|^2 - 2 x.q`.
+    Node ids are row numbers. Deletion is left to the caller, which filters results;
+    deleted rows remain traversable, as in hnswlib's `mark_deleted`.
+    """
+
+    def __init__(self, m: int = 16, ef_construction: int = 100, seed: int = 0) -> None:
+        self.m = max(2, m)
+        self.m0 = 2 * self.m
+        self.ef_construction = max(self.m, ef_construction)
+        self.level_mult = 1.0 / math.log(self.m)
+        self.entry_point = -1
+        self.max_level = -1
+        # links[node][layer] -> neighbour ids
+        self.links: List[List[List[int]]] = []
+        self._rng = random.Random(seed)
+
+    def __len__(self) -> int:
+        return len(self.links)
+
+    @staticmethod
+    def _distances(query: np.ndarray, qnorm: float, ids: Sequence[int], vectors: np.ndarray, norms: np.ndarray) -> np.ndarray:
+        idx = np.fromiter(ids, dtype=np.int64, count=len(ids))
+        return norms[idx] + qnorm - 2.0 * (vectors[idx] @ query)
+
+    def _search_layer(
+        self,
+        query: np.ndarray,
+        qnorm: float,
+        entry_points: List[Tuple[float, int]],
+        ef: int,
+        layer: int,
+        vectors: np.ndarray,
+        norms: np.ndarray,
+    ) -> List[Tuple[float, int]]:
+        visited = {node for _d, node in entry_points}
+        candidates = list(entry_points)
+        heapq.heapify(candidates)
+        results = [(-d, node) for d, node in entry_points]
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            dist, node = heapq.heappop(candidates)
+            if len(results) >= ef and dist > -results[0][0]:
+                break
+            fresh = [n for n in self.links[node][layer] if n not in visited]
+            if not fresh:
+                continue
+            visited.update(fresh)
+            for d, n in zip(self._distances(query, qnorm, fresh, vectors, norms).tolist(), fresh):
+                if len(results) < ef or d < -results[0][0]:
+                    heapq.heappush(candidates, (d, n))
+                    heapq.heappush(results, (-d, n))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+        return sorted((-d, n) for d, n in results)
+
+    @staticmethod
+    def _select(candidates: List[Tuple[float, int]], m: int, vectors: np.ndarray, norms: np.ndarray) -> List[int]:
+        """Neighbour selection heuristic of the HNSW paper (Algorithm 4).
+
+        A candidate is kept only if it is closer to the base point than to every
+        neighbour already kept, which spreads links across directions and keeps the
+        graph navigable on clustered data. Pruned candidates top the list up to `m`.
+        """
+
+        if len(candidates) <= m:
+            return [n for _d, n in candidates]
+        ids = [n for _d, n in candidates]
+        idx = np.asarray(ids, dtype=np.int64)
+        block = vectors[idx]
+        pairwise = norms[idx][:, None] + norms[idx][None, :] - 2.0 * (block @ block.T)
+        to_base = [d for d, _n in candidates]
+        closest_kept = np.full(len(ids), np.inf, dtype=pairwise.dtype)
+        kept: List[int] = []
+        pruned: List[int] = []
+        for j in range(len(ids)):
+            if closest_kept[j] < to_base[j]:
+                pruned.append(j)
+                continue
+            kept.append(j)
+            if len(kept) >= m:
+                break
+            np.minimum(closest_kept, pairwise[j], out=closest_kept)
+        kept.extend(pruned[: m - len(kept)])
+        return [ids[j] for j in kept]
+
+    def _descend(self, query: np.ndarray, qnorm: float, target_level: int, vectors: np.ndarray, norms: np.ndarray) -> List[Tuple[float, int]]:
+        ep = [(float(self._distances(query, qnorm, [self.entry_point], vectors, norms)[0]), self.entry_point)]
+        for layer in range(self.max_level, target_level, -1):
+            ep = self._search_layer(query, qnorm, ep, 1, layer, vectors, norms)[:1]
+        return ep
+
+    def insert(self, node: int, vectors: np.ndarray, norms: np.ndarray) -> None:
+        """Link row `node`; rows must be inserted in order (node == len(self))."""
+
+        if node != len(self.links):
+            raise ValueError(f"Expected node {len(self.links)}, got {node}")
+        level = int(-math.log(1.0 - self._rng.random()) * self.level_mult)
+        self.links.append([[] for _ in range(level + 1)])
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = node, level
+            return
+
+        query = vectors[node]
+        qnorm = float(norms[node])
+        ep = self._descend(query, qnorm, level, vectors, norms)
+        for layer in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, qnorm, ep, self.ef_construction, layer, vectors, norms)
+            cap = self.m0 if layer == 0 else self.m
+            neighbours = self._select(found, self.m, vectors, norms)
+            self.links[node][layer] = neighbours
+            for n in neighbours:
+                links = self.links[n][layer]
+                links.append(node)
+                if len(links) > cap:
+                    # Re-select the links of the overfull neighbour with the same heuristic
+                    dists = self._distances(vectors[n], float(norms[n]), links, vectors, norms).tolist()
+                    self.links[n][layer] = self._select(sorted(zip(dists, links)), cap, vectors, norms)
+            ep = found
+        if level > self.max_level:
+            self.entry_point, self.max_level = node, level
+
+    def search(self, query: np.ndarray, k: int, ef: int, vectors: np.ndarray, norms: np.ndarray) -> List[Tuple[float, int]]:
+        """Approximate `max(k, ef)` nearest rows as ascending `(distance, node)` pairs."""
+
+        if self.entry_point < 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        qnorm = float(query @ query)
+        ep = self._descend(query, qnorm, 0, vectors, norms)
+        return self._search_layer(query, qnorm, ep, max(k, ef), 0, vectors, norms)
+
+    def save(self, path: Path) -> None:
+        levels = np.fromiter((len(l) for l in self.links), dtype=np.int32, count=len(self.links))
+        counts = np.fromiter((len(layer) for l in self.links for layer in l), dtype=np.int32)
+        flat = np.fromiter((n for l in self.links for layer in l for n in layer), dtype=np.int64)
+        tmp = path.with_suffix(".tmp.npz")
+        np.savez(
+            tmp,
+            header=np.array([self.m, self.ef_construction, self.entry_point, self.max_level], dtype=np.int64),
+            levels=levels,
+            counts=counts,
+            flat=flat,
+        )
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "HNSWGraph":
+        data = np.load(path)
+        m, ef_construction, entry_point, max_level = (int(x) for x in data["header"])
+        graph = cls(m=m, ef_construction=ef_construction)
+        graph.entry_point, graph.max_level = entry_point, max_level
+        counts = data["counts"].tolist()
+        flat = data["flat"].tolist()
+        offset = c = 0
+        for num_levels in data["levels"].tolist():
+            node_links: List[List[int]] = []
+            for _ in range(num_levels):
+                node_links.append(flat[offset : offset + counts[c]])
+                offset += counts[c]
+                c += 1
+            graph.links.append(node_links)
+        graph._rng = random.Random(len(graph.links))
+        return graph
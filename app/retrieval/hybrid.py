@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import timed
+from app.ingestion.bm25 import get_bm25_index
+from app.ingestion.index import query_top_k_many
+from app.ingestion.sentence_store import expand_windows
+from app.retrieval.registry import get_query_embedder
+
+
+Retrieved = List[Tuple[str, Dict[str, str], float]]
+
+RETRIEVAL_MODES = ("dense", "bm25", "hybrid")
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Retrieved], k: int, rrf_k: int = 60) -> Retrieved:
+    """Fuse ranked lists by summing `1 / (rrf_k + rank)`; the fused score replaces the original.
+
+    Items are identified by (source, text), so the same chunk found by several
+    retrievers is merged.
+    """
+
+    fused: Dict[Tuple[Optional[str], str], float] = {}
+    items: Dict[Tuple[Optional[str], str], Tuple[str, Dict[str, str]]] = {}
+    for ranking in rankings:
+        for rank, (text, meta, _score) in enumerate(ranking, start=1):
+            key = (meta.get("source"), text)
+            fused[key] = fused.get(key, 0.0) + 1.0 / (rrf_k + rank)
+            items.setdefault(key, (text, meta))
+    ordered = sorted(fused.items(), key=lambda item: item[1], reverse=True)[:k]
+    return [(items[key][0], items[key][1], score) for key, score in ordered]
+
+
+@timed("bm25.query")
+def lexical_top_k(question: str, k: int, collection_name: str, window_size: Optional[int] = None) -> Retrieved:
+    """BM25 results for `question`; empty when the lexical index is disabled."""
+
+    index = get_bm25_index(collection_name)
+    if index is None:
+        return []
+    hits = [(document, meta, score) for _id, document, meta, score in index.search(question, k)]
+    return expand_windows(hits, collection_name, window_size)
+
+
+def cache_params(k: int, retrieval: str = "dense", window_size: Optional[int] = None) -> Tuple:
+    """Semantic cache parameters; defaults keep the keys of plain dense queries."""
+
+    params: Tuple = (k,) if retrieval == "dense" else (k, retrieval)
+    return params if window_size is None else params + (f"window:{window_size}",)
+
+
+def candidate_depth(k: int) -> int:
+    """Dense candidates to fetch per question before fusion."""
+
+    return max(k, get_settings().lexical.candidates)
+
+
+def fuse_with_lexical(
+    question: str, dense: Retrieved, k: int, collection_name: str, window_size: Optional[int] = None
+) -> Retrieved:
+    """RRF of precomputed dense candidates with BM25 results at the same depth."""
+
+    lexical = lexical_top_k(question, max(k, len(dense)), collection_name, window_size)
+    return reciprocal_rank_fusion([dense, lexical], k, get_settings().lexical.rrf_k)
+
+
+@timed("retrieve")
+def retrieve(
+    question: str,
+    k: int,
+    collection_name: str,
+    retrieval: str = "dense",
+    question_vector: Optional[np.ndarray] = None,
+    window_size: Optional[int] = None,
+) -> Retrieved:
+    """First-stage retrieval by `retrieval` mode: dense, bm25 or hybrid (RRF of both).
+
+    `question_vector` avoids re-embedding when the caller already has it; BM25
+    never needs it. `window_size` applies to sentence-window collections.
+    """
+
+    if retrieval not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {retrieval}")
+    if retrieval == "bm25":
+        return lexical_top_k(question, k, collection_name, window_size)
+    qvec = question_vector if question_vector is not None else get_query_embedder().embed_one(question)
+    if retrieval == "dense":
+        return query_top_k_many(qvec, k=k, collection_name=collection_name, window_size=window_size)[0]
+    dense = query_top_k_many(qvec, k=candidate_depth(k), collection_name=collection_name, window_size=window_size)[0]
+    return fuse_with_lexical(question, dense, k, collection_name, window_size)
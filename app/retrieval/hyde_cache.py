@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import count_cache
+
+
+_TRAILING_PUNCT = re.compile(r"[\s\?\!\.\,;:]+$")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Canonical form used for cache keys: NFKC, casefolded, collapsed whitespace,
+    trailing punctuation removed."""
+
+    text = unicodedata.normalize("NFKC", question).casefold()
+    text = _WHITESPACE.sub(" ", text).strip()
+    return _TRAILING_PUNCT.sub("", text)
+
+
+class HydeCache:
+    """Two-tier cache of HyDE documents and their embeddings.
+
+    Tier 1 is an in-process LRU; tier 2 is an optional SQLite file shared across
+    restarts and workers. Entries are keyed by normalized question plus the LLM and
+    embedding model ids, expire after `ttl_seconds`, and both tiers are size-bounded
+    with least-recently-used eviction. The disk row count is tracked in memory
+    (seeded at open) and only recounted once it crosses `max_disk_entries`, which
+    also picks up rows added by other workers.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400.0,
+        sqlite_path: Optional[str] = None,
+        max_disk_entries: int = 100_000,
+    ) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.max_disk_entries = max(1, max_disk_entries)
+        self._memory: "OrderedDict[str, Tuple[str, np.ndarray, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0
+        if sqlite_path:
+            Path(sqlite_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(sqlite_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS hyde_cache ("
+                " key TEXT PRIMARY KEY, hyde_text TEXT NOT NULL, vector BLOB NOT NULL,"
+                " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS hyde_cache_accessed ON hyde_cache (accessed_at)")
+            self._db.commit()
+            (self._disk_rows,) = self._db.execute("SELECT COUNT(*) FROM hyde_cache").fetchone()
+
+    @staticmethod
+    def make_key(question: str, llm_model: str, embedding_model: str) -> str:
+        raw = f"{llm_model}\x1f{embedding_model}\x1f{normalize_question(question)}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, np.ndarray]]:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                text, vector, created = entry
+                if now - created <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    count_cache("hyde", 1, 0)
+                    return text, vector
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT hyde_text, vector, created_at FROM hyde_cache WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    text, blob, created = row
+                    if now - created <= self.ttl_seconds:
+                        vector = np.frombuffer(blob, dtype=np.float32)
+                        self._db.execute("UPDATE hyde_cache SET accessed_at = ? WHERE key = ?", (now, key))
+                        self._db.commit()
+                        self._remember(key, text, vector, created)
+                        self._counters["disk_hits"] += 1
+                        count_cache("hyde", 1, 0)
+                        return text, vector
+                    self._db.execute("DELETE FROM hyde_cache WHERE key = ?", (key,))
+                    self._db.commit()
+                    self._disk_rows = max(0, self._disk_rows - 1)
+                    self._counters["expired"] += 1
+
+            self._counters["misses"] += 1
+            count_cache("hyde", 0, 1)
+            return None
+
+    def put(self, key: str, hyde_text: str, vector: np.ndarray) -> None:
+        now = time.time()
+        vector = np.array(vector, dtype=np.float32)
+        with self._lock:
+            self._remember(key, hyde_text, vector, now)
+            if self._db is not None:
+                blob = vector.tobytes()
+                exists = self._db.execute("SELECT 1 FROM hyde_cache WHERE key = ?", (key,)).fetchone() is not None
+                self._db.execute(
+                    "INSERT OR REPLACE INTO hyde_cache (key, hyde_text, vector, created_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?, ?)",
+                    (key, hyde_text, blob, now, now),
+                )
+                if not exists:
+                    self._disk_rows += 1
+                if self._disk_rows > self.max_disk_entries:
+                    # Exact count only here: other workers may have added (or evicted) rows
+                    (count,) = self._db.execute("SELECT COUNT(*) FROM hyde_cache").fetchone()
+                    self._disk_rows = count
+                if self._disk_rows > self.max_disk_entries:
+                    overflow = self._disk_rows - self.max_disk_entries
+                    self._db.execute(
+                        "DELETE FROM hyde_cache WHERE key IN"
+                        " (SELECT key FROM hyde_cache ORDER BY accessed_at ASC LIMIT ?)",
+                        (overflow,),
+                    )
+                    self._counters["evictions"] += overflow
+                    self._disk_rows = self.max_disk_entries
+                self._db.commit()
+
+    def _remember(self, key: str, text: str, vector: np.ndarray, created: float) -> None:
+        self._memory[key] = (text, vector, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM hyde_cache")
+                self._db.commit()
+                self._disk_rows = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._counters)
+            stats["memory_entries"] = len(self._memory)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+            stats["disk_enabled"] = self._db is not None
+            return stats
+
+    def close(self) -> None:
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+
+_cache: Optional[HydeCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_hyde_cache() -> Optional[HydeCache]:
+    """Return the process-wide HyDE cache, or None when disabled in settings."""
+
+    global _cache
+    cfg = get_settings().hyde_cache
+    if not cfg.enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = HydeCache(
+                    max_entries=cfg.max_entries,
+                    ttl_seconds=cfg.ttl_seconds,
+                    sqlite_path=cfg.sqlite_path,
+                    max_disk_entries=cfg.max_disk_entries,
+                )
+    return _cache
+
+
+def hyde_cache_stats() -> Dict[str, Any]:
+    return _cache.stats() if _cache is not None else {}
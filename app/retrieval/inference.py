@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import logging
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import count_fallback
+
+
+logger = logging.getLogger(__name__)
+
+ONNX_QUANTIZATIONS = ("avx512_vnni", "avx512", "avx2", "arm64")
+
+
+def _export_root(model_name: str) -> Path:
+    return Path(get_settings().inference.export_dir) / re.sub(r"[^\w.-]+", "__", model_name)
+
+
+def _onnx_file_name(quantization: Optional[str]) -> str:
+    # Names written by sentence-transformers' save_pretrained / quantizer
+    return f"onnx/model_qint8_{quantization}.onnx" if quantization else "onnx/model.onnx"
+
+
+def _set_torch_threads(threads: int) -> None:
+    if threads > 0:
+        import torch
+
+        torch.set_num_threads(threads)
+
+
+def _session_options(threads: int) -> Any:
+    import onnxruntime as ort
+
+    options = ort.SessionOptions()
+    if threads > 0:
+        options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+    return options
+
+
+def _load_onnx(model_cls: Any, model_name: str, **kwargs: Any) -> Any:
+    cfg = get_settings().inference
+    if cfg.quantization is not None and cfg.quantization not in ONNX_QUANTIZATIONS:
+        raise ValueError(f"Unknown ONNX quantization {cfg.quantization!r}; expected one of {ONNX_QUANTIZATIONS}")
+    root = _export_root(model_name)
+    file_name = _onnx_file_name(cfg.quantization)
+    if not (root / file_name).exists():
+        # Export once; later loads (and other processes) reuse the files on disk
+        from sentence_transformers import export_dynamic_quantized_onnx_model
+
+        logger.info("Exporting model to ONNX", extra={"model_name": model_name, "quantization": cfg.quantization})
+        exported = model_cls(model_name, backend="onnx", model_kwargs={"provider": "CPUExecutionProvider"}, **kwargs)
+        exported.save_pretrained(str(root))
+        if cfg.quantization:
+            export_dynamic_quantized_onnx_model(exported, cfg.quantization, str(root))
+    model_kwargs = {
+        "file_name": file_name,
+        "provider": "CPUExecutionProvider",
+        "session_options": _session_options(cfg.threads),
+    }
+    return model_cls(str(root), backend="onnx", model_kwargs=model_kwargs, **kwargs)
+
+
+def load_model(model_cls: Any, model_name: str, backend: Optional[str] = None, **kwargs: Any) -> Tuple[Any, str]:
+    """Construct a SentenceTransformer or CrossEncoder on the configured backend.
+
+    Returns `(model, backend)` where backend is "torch", "onnx" or
+    "onnx-int8". An ONNX model that cannot be exported or loaded (missing
+    `optimum`, unsupported architecture) falls back to PyTorch with a warning.
+    """
+
+    cfg = get_settings().inference
+    backend = backend or cfg.backend
+    _set_torch_threads(cfg.threads)
+    if backend == "onnx":
+        try:
+            model = _load_onnx(model_cls, model_name, **kwargs)
+            loaded = "onnx-int8" if cfg.quantization else "onnx"
+            logger.info("Loaded ONNX model", extra={"model_name": model_name, "backend": loaded})
+            return model, loaded
+        except Exception:
+            logger.warning("ONNX backend unavailable, using PyTorch", extra={"model_name": model_name}, exc_info=True)
+            count_fallback("onnx")
+    elif backend != "torch":
+        raise ValueError(f"Unknown inference backend {backend!r}; expected 'torch' or 'onnx'")
+    return model_cls(model_name, device=get_settings().runtime.device, **kwargs), "torch"
+
+
+def _ranks(values: np.ndarray) -> np.ndarray:
+    # Ranks with ties sharing their average rank
+    order = np.argsort(values, kind="stable")
+    ranks = np.empty(len(values), dtype=np.float64)
+    ranks[order] = np.arange(len(values), dtype=np.float64)
+    _unique, inverse, counts = np.unique(values, return_inverse=True, return_counts=True)
+    return (np.bincount(inverse, weights=ranks) / counts)[inverse]
+
+
+def spearman(reference: Sequence[float], candidate: Sequence[float]) -> float:
+    """Spearman rank correlation of two score lists (1.0 = same ordering)."""
+
+    a = _ranks(np.asarray(reference, dtype=np.float64))
+    b = _ranks(np.asarray(candidate, dtype=np.float64))
+    a -= a.mean()
+    b -= b.mean()
+    denom = float(np.sqrt((a * a).sum() * (b * b).sum()))
+    if denom == 0.0:
+        return 1.0 if np.array_equal(a, b) else 0.0
+    return float((a * b).sum() / denom)
+
+
+def cosine_drift(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Mean and worst `1 - cosine` between matching rows of two embedding matrices."""
+
+    ref = np.asarray(reference, dtype=np.float64)
+    cand = np.asarray(candidate, dtype=np.float64)
+    norms = np.linalg.norm(ref, axis=1) * np.linalg.norm(cand, axis=1)
+    drift = 1.0 - (ref * cand).sum(axis=1) / np.maximum(norms, 1e-12)
+    return {"mean": float(drift.mean()), "max": float(drift.max())}
+
+
+def check_parity(
+    texts: List[str],
+    queries: List[str],
+    candidates: List[List[str]],
+    embedding_model: Optional[str] = None,
+    reranker_model: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Compare the configured backend against the fp32 PyTorch models.
+
+    Reports embedding cosine drift over `texts`, the Spearman correlation of
+    reranker scores for each query's `candidates`, and the time each backend
+    took for the same work.
+    """
+
+    from sentence_transformers import CrossEncoder, SentenceTransformer
+
+    from app.retrieval.embeddings import DEFAULT_EMBEDDING_MODEL
+    from app.retrieval.rerank import DEFAULT_RERANKER_MODEL
+
+    cfg = get_settings()
+    embedding_model = embedding_model or DEFAULT_EMBEDDING_MODEL
+    reranker_model = reranker_model or DEFAULT_RERANKER_MODEL
+    pairs = [(q, c) for q, cands in zip(queries, candidates) for c in cands]
+    bounds = np.cumsum([0] + [len(c) for c in candidates])
+
+    report: Dict[str, Any] = {}
+    runs: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+    for label, backend in (("reference", "torch"), ("candidate", cfg.inference.backend)):
+        embedder, embed_backend = load_model(SentenceTransformer, embedding_model, backend=backend)
+        reranker, rerank_backend = load_model(
+            CrossEncoder, reranker_model, backend=backend, max_length=cfg.rerank.max_length
+        )
+        t0 = time.perf_counter()
+        vectors = embedder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        t1 = time.perf_counter()
+        scores = np.asarray(
+            reranker.predict(pairs, batch_size=cfg.rerank.batch_size, show_progress_bar=False), dtype=np.float64
+        ).reshape(-1)
+        t2 = time.perf_counter()
+        runs[label] = (vectors, scores)
+        report[label] = {
+            "embedding_backend": embed_backend,
+            "reranker_backend": rerank_backend,
+            "embed_seconds": round(t1 - t0, 4),
+            "rerank_seconds": round(t2 - t1, 4),
+        }
+
+    ref_vectors, ref_scores = runs["reference"]
+    cand_vectors, cand_scores = runs["candidate"]
+    correlations = [
+        spearman(ref_scores[a:b], cand_scores[a:b]) for a, b in zip(bounds[:-1], bounds[1:]) if b - a > 1
+    ]
+    report["embedding_cosine_drift"] = cosine_drift(ref_vectors, cand_vectors)
+    report["rerank_spearman"] = {
+        "mean": float(np.mean(correlations)) if correlations else 1.0,
+        "min": float(np.min(correlations)) if correlations else 1.0,
+    }
+    return report
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Any, Dict, Optional, Union
+
+from app.core.config import get_settings
+from app.core.health import set_model_status
+from app.retrieval.batching import EmbeddingBatcher
+from app.retrieval.embeddings import DEFAULT_EMBEDDING_MODEL, EmbeddingModel
+from app.retrieval.rerank import DEFAULT_RERANKER_MODEL, Reranker
+
+
+logger = logging.getLogger(__name__)
+
+# Process-wide model instances keyed by model name. Loading a SentenceTransformer or
+# CrossEncoder is expensive, so each named model is constructed at most once.
+_embedders: Dict[str, EmbeddingModel] = {}
+_rerankers: Dict[str, Reranker] = {}
+_batchers: Dict[str, EmbeddingBatcher] = {}
+_lock = threading.Lock()
+
+
+def get_embedding_model(model_name: Optional[str] = None) -> EmbeddingModel:
+    """Return the shared `EmbeddingModel` for `model_name`, loading it on first use."""
+
+    name = model_name or DEFAULT_EMBEDDING_MODEL
+    model = _embedders.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        model = _embedders.get(name)
+        if model is None:
+            model = _load(lambda: EmbeddingModel(name), name)
+            _embedders[name] = model
+    return model
+
+
+def set_embedding_model(model: EmbeddingModel, model_name: Optional[str] = None) -> None:
+    """Install `model` as the shared embedder for `model_name`, e.g. a deterministic
+    stand-in for offline benchmarks. Any batcher built on the previous model is dropped."""
+
+    name = model_name or DEFAULT_EMBEDDING_MODEL
+    with _lock:
+        batcher = _batchers.pop(name, None)
+        _embedders[name] = model
+    if batcher is not None:
+        batcher.close()
+
+
+def get_query_embedder(model_name: Optional[str] = None) -> Union[EmbeddingModel, EmbeddingBatcher]:
+    """Return the embedder for latency-sensitive single-query calls.
+
+    When `embedding.batch_queries` is enabled this is a shared `EmbeddingBatcher` that
+    coalesces concurrent `embed_one` calls; otherwise it is the plain model.
+    """
+
+    cfg = get_settings().embedding
+    if not cfg.batch_queries:
+        return get_embedding_model(model_name)
+    name = model_name or DEFAULT_EMBEDDING_MODEL
+    batcher = _batchers.get(name)
+    if batcher is not None:
+        return batcher
+    model = get_embedding_model(name)
+    with _lock:
+        batcher = _batchers.get(name)
+        if batcher is None:
+            batcher = EmbeddingBatcher(
+                model,
+                max_batch_size=cfg.batch_max_size,
+                max_wait_ms=cfg.batch_max_wait_ms,
+                timeout_s=cfg.batch_timeout_s,
+            )
+            _batchers[name] = batcher
+    return batcher
+
+
+def batcher_stats() -> Dict[str, Dict[str, Any]]:
+    """Batch size and queue wait statistics per embedding model."""
+
+    return {name: b.stats() for name, b in list(_batchers.items())}
+
+
+def get_reranker(model_name: Optional[str] = None) -> Reranker:
+    """Return the shared `Reranker` for `model_name`, loading it on first use."""
+
+    name = model_name or DEFAULT_RERANKER_MODEL
+    model = _rerankers.get(name)
+    if model is not None:
+        return model
+    with _lock:
+        model = _rerankers.get(name)
+        if model is None:
+            model = _load(lambda: Reranker(name), name)
+            _rerankers[name] = model
+    return model
+
+
+def warm_up(embedding_model: Optional[str] = None, reranker_model: Optional[str] = None) -> None:
+    """Eagerly load the default models, e.g. at application startup."""
+
+    get_embedding_model(embedding_model)
+    get_reranker(reranker_model)
+
+
+def clear_registry() -> None:
+    """Drop all cached models. Intended for tests and controlled reloads."""
+
+    with _lock:
+        for batcher in _batchers.values():
+            batcher.close()
+        _batchers.clear()
+        _embedders.clear()
+        _rerankers.clear()
+    set_model_status("not_loaded")
+
+
+def _load(factory, name: str):
+    set_model_status("loading")
+    logger.info("Loading model", extra={"model_name": name})
+    try:
+        model = factory()
+    except Exception:
+        set_model_status("error")
+        logger.exception("Model load failed", extra={"model_name": name})
+        raise
+    set_model_status("loaded")
+    return model
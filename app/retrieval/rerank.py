@@ -1,6 +1,16 @@
 from __future__ import annotations
 
-from typing import List, Sequence, Tuple
+import hashlib
+import heapq
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import count_cache, count_fallback, observe_batch, span
+from app.retrieval.inference import load_model
 
 try:
     from sentence_transformers import CrossEncoder
@@ -8,39 +18,163 @@ except Exception:  # pragma: no cover
     CrossEncoder = None  # type: ignore
 
 
+DEFAULT_RERANKER_MODEL = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+
+Item = Tuple[str, dict, float]
+
+
+def _digest(text: str) -> bytes:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def top_k_by_score(items: Sequence[Item], scores: Sequence[float], top_k: Optional[int] = None) -> List[Item]:
+    """`items` ordered by descending score, keeping only the best `top_k`.
+
+    With `top_k` the best ones are selected by partial sort (argpartition) and
+    only those are ordered. Ties keep the input order.
+    """
+
+    if not items:
+        return []
+    values = np.asarray(scores, dtype=np.float64)
+    if top_k is not None and top_k < len(items):
+        chosen = np.argpartition(-values, top_k - 1)[:top_k] if top_k > 0 else np.empty(0, dtype=np.int64)
+    else:
+        chosen = np.arange(len(items))
+    # lexsort: last key is primary (descending score), then position
+    order = chosen[np.lexsort((chosen, -values[chosen]))]
+    return [items[i] for i in order.tolist()]
+
+
 class Reranker:
     """Cross-encoder reranker with graceful fallback.
 
     If the model cannot be loaded (CI, offline), falls back to a lexical score
-    based on simple token overlap.
+    based on simple token overlap. Model scores are cached per
+    `(query hash, candidate hash)` in an LRU bounded by `rerank.cache_size`.
+    The cross-encoder runs on the `inference.backend`, recorded in `backend`.
     """
 
-    def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2") -> None:
+    def __init__(self, model_name: str = DEFAULT_RERANKER_MODEL) -> None:
         self.model_name = model_name
         self.model = None
+        self.backend = "lexical"
+        self._cache: "OrderedDict[Tuple[bytes, bytes], float]" = OrderedDict()
+        self._cache_lock = threading.Lock()
         try:
             if CrossEncoder is not None:
-                self.model = CrossEncoder(model_name)
+                self.model, self.backend = load_model(
+                    CrossEncoder, model_name, max_length=get_settings().rerank.max_length
+                )
         except Exception:
             self.model = None
+            self.backend = "lexical"
 
     def score(self, query: str, candidates: Sequence[str]) -> List[float]:
+        return self.score_pairs([(query, c) for c in candidates])
+
+    def score_pairs(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        """Score (query, candidate) pairs, possibly from different queries, in one call."""
+
+        if not pairs:
+            return []
         if self.model is not None:
-            pairs = [(query, c) for c in candidates]
-            scores = self.model.predict(pairs).tolist()
-            return [float(s) for s in scores]
+            return self._model_scores(pairs)
         # Fallback lexical overlap
-        q_tokens = set(query.lower().split())
+        count_fallback("reranker")
         scores: List[float] = []
-        for c in candidates:
+        for query, c in pairs:
+            q_tokens = set(query.lower().split())
             c_tokens = set(c.lower().split())
             overlap = len(q_tokens & c_tokens)
             scores.append(float(overlap))
         return scores
 
-    def rerank(self, query: str, items: Sequence[Tuple[str, dict, float]]) -> List[Tuple[str, dict, float]]:
-        texts = [t for t, _m, _s in items]
-        scores = self.score(query, texts)
-        scored = list(zip(items, scores))
-        scored.sort(key=lambda x: x[1], reverse=True)
-        return [it for it, _ in scored]
+    def _model_scores(self, pairs: Sequence[Tuple[str, str]]) -> List[float]:
+        cfg = get_settings().rerank
+        query_keys = {q: _digest(q) for q in {q for q, _c in pairs}}
+        keys = [(query_keys[q], _digest(c)) for q, c in pairs]
+        scores: List[Optional[float]] = [None] * len(pairs)
+        # First position of each distinct pair that still needs the model
+        todo: "OrderedDict[Tuple[bytes, bytes], int]" = OrderedDict()
+        with self._cache_lock:
+            for i, key in enumerate(keys):
+                hit = self._cache.get(key)
+                if hit is not None:
+                    self._cache.move_to_end(key)
+                    scores[i] = hit
+                elif key not in todo:
+                    todo[key] = i
+
+        count_cache("rerank", sum(s is not None for s in scores), len(todo))
+        if todo:
+            # Length-sorted so each batch pads to similar lengths
+            order = sorted(todo.values(), key=lambda i: len(pairs[i][0]) + len(pairs[i][1]))
+            observe_batch("rerank", len(order))
+            with span("rerank.model"):
+                predicted = self.model.predict(
+                    [pairs[i] for i in order], batch_size=max(1, cfg.batch_size), show_progress_bar=False
+                )
+            fresh = {keys[i]: float(s) for i, s in zip(order, np.asarray(predicted).reshape(-1).tolist())}
+            for i, key in enumerate(keys):
+                if scores[i] is None:
+                    scores[i] = fresh[key]
+            if cfg.cache_size > 0:
+                with self._cache_lock:
+                    self._cache.update(fresh)
+                    while len(self._cache) > cfg.cache_size:
+                        self._cache.popitem(last=False)
+        return [float(s) for s in scores]  # type: ignore[arg-type]
+
+    def rerank(self, query: str, items: Sequence[Item], top_k: Optional[int] = None) -> List[Item]:
+        return self.rerank_many([query], [items], top_k=top_k)[0]
+
+    def rerank_many(
+        self, queries: Sequence[str], items_per_query: Sequence[Sequence[Item]], top_k: Optional[int] = None
+    ) -> List[List[Item]]:
+        """Rerank several candidate lists, scoring all their pairs in one cross-encoder call.
+
+        With `top_k`, only the best `top_k` items of each list are returned. If
+        `rerank.early_stop_margin` is also set, lists are scored in rounds of
+        `top_k` candidates in first-stage order (one call per round across all
+        lists); a list stops once its latest slice trails its k-th best score by
+        the margin, and its unscored tail is dropped.
+        """
+
+        with span("rerank"):
+            return self._rerank_many(queries, items_per_query, top_k)
+
+    def _rerank_many(
+        self, queries: Sequence[str], items_per_query: Sequence[Sequence[Item]], top_k: Optional[int]
+    ) -> List[List[Item]]:
+        margin = get_settings().rerank.early_stop_margin
+        step = top_k if top_k and margin is not None else None
+        scores: List[List[float]] = [[] for _ in items_per_query]
+        active = list(range(len(items_per_query)))
+        while active:
+            pairs: List[Tuple[str, str]] = []
+            slices: List[Tuple[int, int]] = []
+            for qi in active:
+                items = items_per_query[qi]
+                start = len(scores[qi])
+                stop = len(items) if step is None else min(len(items), start + step)
+                pairs.extend((queries[qi], text) for text, _m, _s in items[start:stop])
+                slices.append((qi, stop - start))
+            scored = self.score_pairs(pairs)
+            offset = 0
+            remaining: List[int] = []
+            for qi, n in slices:
+                latest = scored[offset : offset + n]
+                offset += n
+                scores[qi].extend(latest)
+                if len(scores[qi]) >= len(items_per_query[qi]) or not latest:
+                    continue
+                if step is not None and len(scores[qi]) > step:
+                    kth = heapq.nlargest(step, scores[qi])[-1]
+                    if max(latest) < kth - margin:  # type: ignore[operator]
+                        continue
+                remaining.append(qi)
+            active = remaining
+        return [
+            top_k_by_score(list(items[: len(s)]), s, top_k) for items, s in zip(items_per_query, scores)
+        ]
@@ -0,0 +1,197 @@
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.core.metrics import count_cache
+
+
+Retrieved = List[Tuple[str, Dict[str, str], float]]
+Answer = Tuple[str, Retrieved]
+_Namespace = Tuple[str, str, Tuple[Any, ...]]
+
+
+class _Bucket:
+    """Fixed-capacity ring of (question vector, answer) entries for one namespace."""
+
+    def __init__(self, capacity: int, dim: int) -> None:
+        self.vectors = np.zeros((capacity, dim), dtype=np.float32)
+        self.created = np.zeros(capacity, dtype=np.float64)
+        self.entries: List[Optional[Tuple[Answer, float, float]]] = [None] * capacity
+        self.size = 0
+        self.next_slot = 0
+
+    def add(self, vector: np.ndarray, answer: Answer, latency_s: float, now: float) -> None:
+        slot = self.next_slot
+        self.vectors[slot] = vector
+        self.created[slot] = now
+        self.entries[slot] = (answer, latency_s, now)
+        self.next_slot = (slot + 1) % len(self.entries)
+        self.size = min(self.size + 1, len(self.entries))
+
+    def nearest(self, vector: np.ndarray, not_before: float) -> Tuple[int, float]:
+        """Most similar entry created at or after `not_before`; expired entries never win."""
+
+        sims = self.vectors[: self.size] @ vector
+        sims[self.created[: self.size] < not_before] = -np.inf
+        best = int(np.argmax(sims))
+        return best, float(sims[best])
+
+
+class SemanticAnswerCache:
+    """Cache of full answers looked up by cosine similarity of the question embedding.
+
+    Entries are partitioned by (mode, collection, retrieval params) so a hit never
+    crosses pipelines or collections. Each partition is a fixed-size ring holding the
+    most recently answered questions; lookup is one matrix-vector product.
+
+    Every collection has a generation, bumped when it is invalidated. Callers capture
+    it before computing an answer and pass it to `store`, which drops answers
+    computed against a collection that has changed since.
+    """
+
+    def __init__(self, threshold: float = 0.95, max_entries: int = 512, ttl_seconds: float = 3600.0) -> None:
+        self.threshold = threshold
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._buckets: Dict[_Namespace, _Bucket] = {}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = float(np.linalg.norm(vec))
+        return vec / norm if norm > 0 else vec
+
+    def _mode_stats(self, mode: str) -> Dict[str, float]:
+        return self._stats.setdefault(mode, {"lookups": 0, "hits": 0, "saved_latency_ms": 0.0})
+
+    def lookup(self, mode: str, collection: str, params: Tuple[Any, ...], vector: Sequence[float]) -> Optional[Answer]:
+        vec = self._normalize(vector)
+        with self._lock:
+            stats = self._mode_stats(mode)
+            stats["lookups"] += 1
+            bucket = self._buckets.get((mode, collection, params))
+            if bucket is None or bucket.size == 0 or bucket.vectors.shape[1] != vec.shape[0]:
+                return None
+            slot, sim = bucket.nearest(vec, time.time() - self.ttl_seconds)
+            entry = bucket.entries[slot]
+            if entry is None or sim < self.threshold:
+                return None
+            answer, latency_s, _created = entry
+            stats["hits"] += 1
+            stats["saved_latency_ms"] += latency_s * 1000.0
+            return answer
+
+    def generation(self, collection: str) -> int:
+        with self._lock:
+            return self._generations.get(collection, 0)
+
+    def store(
+        self,
+        mode: str,
+        collection: str,
+        params: Tuple[Any, ...],
+        vector: Sequence[float],
+        answer: Answer,
+        latency_s: float,
+        generation: Optional[int] = None,
+    ) -> None:
+        vec = self._normalize(vector)
+        key = (mode, collection, params)
+        with self._lock:
+            if generation is not None and generation != self._generations.get(collection, 0):
+                # Computed before the collection was re-ingested or dropped
+                return
+            bucket = self._buckets.get(key)
+            if bucket is None or bucket.vectors.shape[1] != vec.shape[0]:
+                bucket = _Bucket(self.max_entries, vec.shape[0])
+                self._buckets[key] = bucket
+            bucket.add(vec, answer, latency_s, time.time())
+
+    def invalidate_collection(self, collection: str) -> None:
+        with self._lock:
+            self._generations[collection] = self._generations.get(collection, 0) + 1
+            for key in [k for k in self._buckets if k[1] == collection]:
+                del self._buckets[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._buckets.clear()
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        with self._lock:
+            report: Dict[str, Dict[str, float]] = {}
+            for mode, stats in self._stats.items():
+                lookups = stats["lookups"]
+                report[mode] = {
+                    **stats,
+                    "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+                }
+            return report
+
+
+_cache: Optional[SemanticAnswerCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_semantic_cache() -> Optional[SemanticAnswerCache]:
+    """Return the process-wide semantic answer cache, or None unless enabled in settings."""
+
+    global _cache
+    cfg = get_settings().semantic_cache
+    if not cfg.enabled:
+        return None
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = SemanticAnswerCache(
+                    threshold=cfg.similarity_threshold,
+                    max_entries=cfg.max_entries,
+                    ttl_seconds=cfg.ttl_seconds,
+                )
+    return _cache
+
+
+def invalidate_semantic_cache(collection: str) -> None:
+    """Drop cached answers for `collection`; called whenever it is written or dropped."""
+
+    if _cache is not None:
+        _cache.invalidate_collection(collection)
+
+
+def semantic_cache_stats() -> Dict[str, Dict[str, float]]:
+    return _cache.stats() if _cache is not None else {}
+
+
+def answer_through_cache(
+    mode: str,
+    collection: str,
+    params: Tuple[Any, ...],
+    question_vector: Optional[Sequence[float]],
+    compute: Callable[[], Answer],
+) -> Answer:
+    """Serve `compute()` through the semantic cache when it is enabled.
+
+    `question_vector` is the embedding of the incoming question; when None (cache
+    disabled) `compute` runs directly.
+    """
+
+    cache = get_semantic_cache()
+    if cache is None or question_vector is None:
+        return compute()
+    generation = cache.generation(collection)
+    hit = cache.lookup(mode, collection, params, question_vector)
+    count_cache("semantic", int(hit is not None), int(hit is None))
+    if hit is not None:
+        return hit
+    started = time.perf_counter()
+    answer = compute()
+    cache.store(mode, collection, params, question_vector, answer, time.perf_counter() - started, generation)
+    return answer
@@ -0,0 +1,89 @@
+"""Per-query overhead of opening Chroma handles, before and after handle caching.
+
+"before" reproduces the original behaviour: a new `PersistentClient` plus
+`get_or_create_collection` for every query. "after" uses the cached handles from
+`app.ingestion.index`. Both paths run the same `collection.query` call.
+
+Usage:
+    python -m benchmarks.bench_chroma_handles --queries 200 --items 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import chromadb
+import numpy as np
+
+from app.core.config import get_settings
+from app.ingestion import index
+
+
+def _percentiles(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p99_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))],
+    }
+
+
+def _time_calls(fn: Callable[[], object], n: int) -> List[float]:
+    samples: List[float] = []
+    for _ in range(n):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def run(queries: int, items: int, dim: int) -> Dict[str, Dict[str, float]]:
+    rng = np.random.default_rng(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = get_settings()
+        settings.db.chroma_path = str(Path(tmp) / "chroma")
+        index.invalidate_collection_cache()
+
+        name = "bench_handles"
+        collection = index.get_chroma_collection(name)
+        vectors = rng.standard_normal((items, dim)).astype(np.float32)
+        for start in range(0, items, 1000):
+            batch = vectors[start : start + 1000]
+            collection.add(
+                ids=[str(start + i) for i in range(len(batch))],
+                documents=[f"doc {start + i}" for i in range(len(batch))],
+                embeddings=batch.tolist(),
+            )
+        qvec = rng.standard_normal(dim).astype(np.float32).tolist()
+
+        def before() -> None:
+            client = chromadb.PersistentClient(path=settings.db.chroma_path)
+            client.get_or_create_collection(name=name).query(query_embeddings=[qvec], n_results=5)
+
+        def after() -> None:
+            index.get_chroma_collection(name).query(query_embeddings=[qvec], n_results=5)
+
+        # Warm both paths once so the comparison excludes first-touch costs
+        before()
+        after()
+        report = {
+            "before": _percentiles(_time_calls(before, queries)),
+            "after": _percentiles(_time_calls(after, queries)),
+        }
+        index.invalidate_collection_cache()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--items", type=int, default=2000)
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+    print(json.dumps(run(args.queries, args.items, args.dim), indent=2))
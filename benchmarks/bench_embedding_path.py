@@ -0,0 +1,80 @@
+"""Memory and throughput of the ingest embedding path: Python lists vs float32 arrays.
+
+"lists" reproduces the original behaviour, where every encoder output row is
+converted with `astype(float).tolist()` before being handed to Chroma. "arrays"
+passes the float32 matrix from the encoder straight to the store. By default the
+encoder output is synthetic, so only the conversion and store costs are measured.
+Pass `--model` to encode real sentences with the configured embedding model.
+
+Usage:
+    python -m benchmarks.bench_embedding_path --items 100000 --batch 1024
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.ingestion import index
+
+
+def _encoder(use_model: bool, dim: int) -> Callable[[List[str]], np.ndarray]:
+    if use_model:
+        from app.retrieval.registry import get_embedding_model
+
+        model = get_embedding_model()
+        return lambda texts: model.model.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    rng = np.random.default_rng(0)
+    return lambda texts: rng.standard_normal((len(texts), dim)).astype(np.float32)
+
+
+def _run_path(name: str, encode: Callable[[List[str]], np.ndarray], items: int, batch: int, as_lists: bool) -> Dict[str, float]:
+    index.drop_collection(name)
+    texts = [f"Sentence {i} about retrieval augmented generation." for i in range(items)]
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    for start in range(0, items, batch):
+        chunk = texts[start : start + batch]
+        vectors = encode(chunk)
+        embeddings = [v.astype(float).tolist() for v in vectors] if as_lists else vectors
+        index.index_items(chunk, [{"source": "bench"}] * len(chunk), embeddings=embeddings, collection_name=name)
+    elapsed = time.perf_counter() - t0
+    _current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    index.drop_collection(name)
+    return {
+        "seconds": round(elapsed, 3),
+        "items_per_sec": round(items / elapsed, 1),
+        "peak_python_mb": round(peak / 2**20, 2),
+    }
+
+
+def run(items: int, batch: int, dim: int, use_model: bool) -> Dict[str, Dict[str, float]]:
+    with tempfile.TemporaryDirectory() as tmp:
+        get_settings().db.chroma_path = str(Path(tmp) / "chroma")
+        index.invalidate_collection_cache()
+        encode = _encoder(use_model, dim)
+        report = {
+            "lists": _run_path("bench_lists", encode, items, batch, as_lists=True),
+            "arrays": _run_path("bench_arrays", encode, items, batch, as_lists=False),
+        }
+        index.invalidate_collection_cache()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--batch", type=int, default=1024)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--model", action="store_true", help="encode with the configured embedding model")
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.batch, args.dim, args.model), indent=2))
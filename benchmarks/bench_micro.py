@@ -0,0 +1,148 @@
+"""Micro-benchmarks of the pipeline building blocks on a synthetic corpus.
+
+Measures, on the same generated corpus:
+
+- `chunk_text` (character chunker) and `iter_chunk_spans` (token chunker)
+- `split_into_sentence_windows`
+- `EmbeddingModel.embed` in ingest-sized batches, cold and again with the
+  embedding cache warm
+- `query_top_k` against the indexed sentences
+- `Reranker.rerank` of the top candidates for each question
+
+With `--offline` (or when the embedding model cannot be loaded) embeddings come
+from the deterministic `HashingEmbedder`, the reranker uses its lexical fallback
+and nothing touches the network. Results are written as JSON for comparing
+commits.
+
+Usage:
+    python -m benchmarks.bench_micro --documents 100 --offline
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from benchmarks.harness import (
+    HashingEmbedder,
+    isolated_store,
+    latency_summary,
+    prepare_environment,
+    run_metadata,
+    time_calls,
+    write_results,
+)
+from benchmarks.synthetic_corpus import generate_corpus
+
+
+def _throughput(fn: Callable[[], int], repeat: int) -> Dict[str, float]:
+    # `fn` returns the number of items it processed
+    counts: List[int] = []
+    samples = time_calls(lambda: counts.append(fn()), repeat)
+    items = counts[-1] if counts else 0
+    best_ms = min(samples)
+    report: Dict[str, Any] = {"items": items, "items_per_sec": round(items / (best_ms / 1000.0), 1) if best_ms else None}
+    report.update(latency_summary(samples))
+    return report
+
+
+def _embedder():
+    from app.retrieval.registry import get_embedding_model, set_embedding_model
+
+    try:
+        return get_embedding_model()
+    except Exception:
+        # No model weights reachable: measure the deterministic stand-in instead
+        fallback = HashingEmbedder()
+        set_embedding_model(fallback)
+        return fallback
+
+
+def run(documents: int, questions: int, repeat: int, batch: int, k: int, offline: bool) -> Dict[str, Any]:
+    from app.core.config import get_settings
+    from app.ingestion.chunking import get_chunk_tokenizer, iter_chunk_spans
+    from app.ingestion.index import index_items, query_top_k
+    from app.ingestion.loaders import chunk_text
+    from app.ingestion.sentence_window import split_into_sentence_windows, split_into_sentences
+    from app.retrieval.registry import get_reranker
+
+    with tempfile.TemporaryDirectory() as tmp, isolated_store():
+        corpus = generate_corpus(Path(tmp) / "corpus", documents=documents, questions=questions)
+        texts = [p.read_text(encoding="utf-8") for p in corpus.paths]
+        # Loaded inside the isolated store, so its embedding cache starts empty
+        embedder = _embedder()
+        results: Dict[str, Any] = {}
+
+        results["chunk_text"] = _throughput(lambda: sum(len(chunk_text(t, 1000, 200)) for t in texts), repeat)
+        token_spans, max_tokens = get_chunk_tokenizer()
+        results["iter_chunk_spans"] = _throughput(
+            lambda: sum(len(list(iter_chunk_spans(t, 256, 32, token_spans, max_tokens))) for t in texts), repeat
+        )
+        results["split_into_sentence_windows"] = _throughput(
+            lambda: sum(len(split_into_sentence_windows(t, 2)) for t in texts), repeat
+        )
+
+        sentences = [s for t in texts for s in split_into_sentences(t)]
+        batches = [sentences[i : i + batch] for i in range(0, len(sentences), batch)]
+        # The first pass encodes everything, the second is served by the embedding cache
+        for label in ("embed_cold", "embed_cached"):
+            t0 = time.perf_counter()
+            for chunk in batches:
+                embedder.embed(chunk, cache=True)
+            elapsed = time.perf_counter() - t0
+            results[label] = {
+                "items": len(sentences),
+                "batch_size": batch,
+                "items_per_sec": round(len(sentences) / elapsed, 1) if elapsed else None,
+                "seconds": round(elapsed, 3),
+            }
+
+        vectors = embedder.embed(sentences)
+        metadatas = [{"source": f"s{i}"} for i in range(len(sentences))]
+        index_items(sentences, metadatas, embeddings=vectors, collection_name="bench_micro")
+        qs = [row["question"] for row in corpus.questions]
+        query_ms = [
+            ms
+            for q in qs
+            for ms in time_calls(lambda q=q: query_top_k(q, k=k, collection_name="bench_micro"), 1, warmup=0)
+        ]
+        results["query_top_k"] = {"k": k, **latency_summary(query_ms)}
+
+        reranker = get_reranker()
+        candidates = {q: query_top_k(q, k=4 * k, collection_name="bench_micro") for q in qs}
+        rerank_ms = [
+            ms for q in qs for ms in time_calls(lambda q=q: reranker.rerank(q, candidates[q], top_k=k), 1, warmup=0)
+        ]
+        results["reranker_rerank"] = {"candidates": 4 * k, "top_k": k, **latency_summary(rerank_ms)}
+
+        meta = run_metadata(offline)
+        meta["embedder"] = getattr(embedder, "backend", "torch")
+        meta["reranker"] = reranker.backend
+        meta["chunk_tokenizer"] = get_settings().ingestion.chunk_tokenizer
+        return {
+            "meta": meta,
+            "params": {"documents": documents, "questions": questions, "repeat": repeat, "batch": batch, "k": k},
+            "corpus": {"chars": corpus.chars, "sentences": len(sentences)},
+            "results": results,
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch", type=int, default=256, help="texts per embed call")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--offline", action="store_true", help="hashing embedder, lexical reranker, no network")
+    parser.add_argument("--output", default=None, help="JSON path (default: benchmarks/results/micro-<commit>.json)")
+    args = parser.parse_args()
+    prepare_environment(args.offline)
+    report = run(args.documents, args.questions, args.repeat, args.batch, args.k, args.offline)
+    path = write_results("micro", report, args.output)
+    print(json.dumps(report["results"], indent=2))
+    print(f"results written to {path}")
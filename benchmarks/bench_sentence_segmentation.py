@@ -0,0 +1,82 @@
+"""Sentence segmentation throughput (sentences/sec) for sentence-window ingest.
+
+Compares the previous segmenter, which rebuilt every sentence by joining syntok
+tokens and cleaned it with a regex, against offset-based spans, both inline and
+through the process pool of `iter_sentence_spans`. Pool timings include process
+startup, which dominates on small inputs.
+
+Usage:
+    python -m benchmarks.bench_sentence_segmentation --docs 16 --sentences 5000 --workers 4
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import re
+import time
+from typing import Dict, List
+
+from syntok.segmenter import process
+
+from app.ingestion.sentence_window import iter_sentence_spans, sentence_spans
+
+_TEMPLATES = (
+    "Dr. Smith reviewed section {i} of the report on e.g. topic {t}.",
+    "The estimate was $3.{t}0 per unit (approx.), well below the U.S. average!",
+    "Was ticket ERR-{i} resolved before the 3 p.m. deadline?",
+    "Results are \"preliminary\", see Fig. {t} and the appendix.",
+)
+
+
+def _corpus(docs: int, sentences: int) -> List[str]:
+    texts: List[str] = []
+    for d in range(docs):
+        parts = [_TEMPLATES[i % len(_TEMPLATES)].format(i=i, t=(i + d) % 9) for i in range(sentences)]
+        # Paragraph breaks every 20 sentences
+        texts.append("\n\n".join(" ".join(parts[p : p + 20]) for p in range(0, len(parts), 20)))
+    return texts
+
+
+def _rejoin_segmenter(text: str) -> List[str]:
+    """The segmenter before offset spans: tokens joined back into strings."""
+
+    out: List[str] = []
+    for paragraph in process(text):
+        for sentence in paragraph:
+            s = " ".join(token.value for token in sentence).strip()
+            s = re.sub(r"\s+([\.,;:!\?])", r"\1", s)
+            if s:
+                out.append(s)
+    return out
+
+
+def _rate(count: int, seconds: float) -> Dict[str, float]:
+    return {"seconds": round(seconds, 3), "sentences_per_sec": round(count / seconds, 1) if seconds else 0.0}
+
+
+def run(docs: int, sentences: int, workers: int) -> Dict[str, Dict[str, float]]:
+    texts = _corpus(docs, sentences)
+    report: Dict[str, Dict[str, float]] = {}
+
+    t0 = time.perf_counter()
+    count = sum(len(_rejoin_segmenter(text)) for text in texts)
+    report["rejoin_sequential"] = _rate(count, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    count = sum(len(sentence_spans(text)) for text in texts)
+    report["spans_sequential"] = _rate(count, time.perf_counter() - t0)
+
+    t0 = time.perf_counter()
+    count = sum(len(spans) for _i, _t, spans in iter_sentence_spans(enumerate(texts), max_workers=workers, min_parallel_chars=0))
+    report["spans_process_pool"] = _rate(count, time.perf_counter() - t0)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=16)
+    parser.add_argument("--sentences", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+    print(json.dumps(run(args.docs, args.sentences, args.workers), indent=2))
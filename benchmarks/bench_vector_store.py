@@ -0,0 +1,98 @@
+"""Recall@k and query latency of the vector store backends.
+
+Indexes the same clustered synthetic vectors into Chroma and the built-in engine
+in "exact" and "hnsw" mode, then runs identical single-vector queries against
+each. Recall is measured against a NumPy brute-force ground truth; latency is
+per `query_top_k_with_embedding` call, including result assembly.
+
+Usage:
+    python -m benchmarks.bench_vector_store --items 20000 --queries 200 --k 10
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import statistics
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.ingestion import index
+
+
+def _corpus(items: int, dim: int, clusters: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim))
+    x = centers[rng.integers(0, clusters, items)] + 0.5 * rng.standard_normal((items, dim))
+    x = x.astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _latency(samples_ms: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples_ms)
+    return {
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p99_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 3),
+    }
+
+
+def run(items: int, queries: int, k: int, dim: int, backends: List[str]) -> Dict[str, Dict[str, float]]:
+    vectors = _corpus(items, dim, clusters=max(1, items // 200))
+    rng = np.random.default_rng(1)
+    probes = vectors[rng.integers(0, items, queries)] + 0.1 * rng.standard_normal((queries, dim)).astype(np.float32)
+    truth = [set(np.argsort(((vectors - q) ** 2).sum(axis=1))[:k].tolist()) for q in probes]
+    ids = [str(i) for i in range(items)]
+
+    report: Dict[str, Dict[str, float]] = {}
+    settings = get_settings()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.db.chroma_path = str(Path(tmp) / "chroma")
+        settings.db.store_path = str(Path(tmp) / "store")
+        for backend in backends:
+            settings.db.backend = backend
+            index.invalidate_collection_cache()
+            name = f"bench_{backend}"
+
+            t0 = time.perf_counter()
+            for start in range(0, items, 1000):
+                stop = min(items, start + 1000)
+                index.index_items(
+                    [f"doc {i}" for i in range(start, stop)],
+                    [{"source": "bench"}] * (stop - start),
+                    embeddings=vectors[start:stop],
+                    collection_name=name,
+                    ids=ids[start:stop],
+                )
+            index.flush_collection(name)
+            build_s = time.perf_counter() - t0
+
+            index.query_top_k_with_embedding(probes[0], k=k, collection_name=name)
+            samples: List[float] = []
+            recalls: List[float] = []
+            for q, expected in zip(probes, truth):
+                t0 = time.perf_counter()
+                hits = index.query_top_k_with_embedding(q, k=k, collection_name=name)
+                samples.append((time.perf_counter() - t0) * 1000.0)
+                found = {int(text.split()[1]) for text, _m, _s in hits}
+                recalls.append(len(found & expected) / k)
+            report[backend] = {"build_s": round(build_s, 2), f"recall@{k}": round(statistics.fmean(recalls), 4), **_latency(samples)}
+            index.drop_collection(name)
+        index.invalidate_collection_cache()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--backends", nargs="+", default=["chroma", "exact", "hnsw"])
+    args = parser.parse_args()
+    print(json.dumps(run(args.items, args.queries, args.k, args.dim, args.backends), indent=2))
@@ -0,0 +1,169 @@
+"""Shared pieces of the benchmark suite: offline setup, isolated stores, latency
+summaries and JSON result files.
+
+App modules are imported lazily so `prepare_environment` can switch the model hubs
+offline before `sentence_transformers` is first imported.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import platform
+import re
+import statistics
+import subprocess
+import tempfile
+import time
+import zlib
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+
+_TOKEN = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    """Deterministic stand-in for the embedding model when running offline.
+
+    Each word is hashed into one of `dim` signed buckets, so texts sharing words
+    get similar unit vectors and retrieval still behaves like retrieval. Exposes
+    the `EmbeddingModel` surface the pipeline and chunker use.
+    """
+
+    max_tokens = 512
+
+    def __init__(self, dim: int = 384) -> None:
+        self.dim = dim
+        self.model_name = f"hashing-{dim}"
+        self.backend = "hashing"
+
+    def embed(self, texts: List[str], cache: bool = False) -> np.ndarray:
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in _TOKEN.findall(text.lower()):
+                h = zlib.crc32(token.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.ascontiguousarray(matrix / np.maximum(norms, 1e-12))
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def token_spans(self, text: str) -> np.ndarray:
+        from app.ingestion.chunking import word_token_spans
+
+        return word_token_spans(text)
+
+
+def prepare_environment(offline: bool) -> None:
+    """Make runs reproducible: offline mode never touches the network.
+
+    Offline, the model hubs are disabled, the LLM key is dropped so answers use the
+    deterministic fallback, and `HashingEmbedder` serves embeddings. Must run before
+    any app module is imported.
+    """
+
+    if offline:
+        os.environ["HF_HUB_OFFLINE"] = "1"
+        os.environ["TRANSFORMERS_OFFLINE"] = "1"
+        os.environ.pop("OPENAI_API_KEY", None)
+        from app.retrieval.registry import set_embedding_model
+
+        set_embedding_model(HashingEmbedder())
+
+
+@contextmanager
+def isolated_store(tmp_root: Optional[str] = None) -> Iterator[Path]:
+    """Point the vector store, derived indexes and embedding cache at a temp dir."""
+
+    from app.core.config import get_settings
+    from app.ingestion import index
+
+    settings = get_settings()
+    saved = (settings.db.chroma_path, settings.db.store_path, settings.embedding.cache_dir)
+    with tempfile.TemporaryDirectory(dir=tmp_root) as tmp:
+        root = Path(tmp)
+        settings.db.chroma_path = str(root / "chroma")
+        settings.db.store_path = str(root / "vector_store")
+        settings.embedding.cache_dir = str(root / "embedding_cache")
+        index.invalidate_collection_cache()
+        try:
+            yield root
+        finally:
+            index.invalidate_collection_cache()
+            settings.db.chroma_path, settings.db.store_path, settings.embedding.cache_dir = saved
+
+
+def latency_summary(samples_ms: Sequence[float]) -> Dict[str, float]:
+    """Mean and nearest-rank percentiles of latency samples, in milliseconds."""
+
+    if not samples_ms:
+        return {"count": 0}
+    ordered = sorted(samples_ms)
+
+    def pct(q: float) -> float:
+        return round(ordered[min(len(ordered) - 1, max(0, int(np.ceil(q * len(ordered))) - 1))], 3)
+
+    return {
+        "count": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p95_ms": pct(0.95),
+        "p99_ms": pct(0.99),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def time_calls(fn, repeat: int, warmup: int = 1) -> List[float]:
+    """Run `fn` `warmup` times untimed, then `repeat` times; per-call milliseconds."""
+
+    for _ in range(warmup):
+        fn()
+    samples: List[float] = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - t0) * 1000.0)
+    return samples
+
+
+def _git(*args: str) -> Optional[str]:
+    try:
+        out = subprocess.run(["git", *args], capture_output=True, text=True, timeout=10, check=True)
+        return out.stdout.strip()
+    except Exception:
+        return None
+
+
+def run_metadata(offline: bool) -> Dict[str, Any]:
+    from app.core.config import get_settings
+
+    settings = get_settings()
+    return {
+        "commit": _git("rev-parse", "--short", "HEAD"),
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "offline": offline,
+        "vector_backend": settings.db.backend,
+        "inference_backend": settings.inference.backend,
+    }
+
+
+def write_results(name: str, payload: Dict[str, Any], output: Optional[str] = None) -> Path:
+    """Write `payload` as JSON; by default to `benchmarks/results/<name>-<commit>.json`."""
+
+    commit = payload.get("meta", {}).get("commit") or "nocommit"
+    path = Path(output) if output else RESULTS_DIR / f"{name}-{commit}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(payload, indent=2) + "\n", encoding="utf-8")
+    return path
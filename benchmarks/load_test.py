@@ -0,0 +1,211 @@
+"""End-to-end load generator for the HTTP API.
+
+Ingests a synthetic corpus through `POST /ingest` (baseline and sentence-window),
+then replays its questions against `POST /query` from `--concurrency` concurrent
+clients, mixing query modes, for `--requests` requests or `--duration` seconds.
+Reports throughput (QPS), latency percentiles overall and per mode, status
+counts (503s are requests shed by the bounded executors) and the server's own
+per-stage summary from `/health`.
+
+By default the app runs in-process (ASGI transport, isolated temp store);
+`--url` targets a running server instead, e.g. a local
+`uvicorn app.api.main:app`, which must be able to read the corpus paths.
+`--offline` only applies in-process.
+
+Usage:
+    python -m benchmarks.load_test --offline --concurrency 8 --requests 400
+    python -m benchmarks.load_test --url http://127.0.0.1:8000 --duration 30
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import random
+import tempfile
+import time
+from contextlib import AsyncExitStack
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from benchmarks.harness import isolated_store, latency_summary, prepare_environment, run_metadata, write_results
+from benchmarks.synthetic_corpus import generate_corpus
+
+# Query mode name -> extra /query fields
+MODES: Dict[str, Dict[str, Any]] = {
+    "baseline": {"mode": "baseline"},
+    "baseline_hybrid": {"mode": "baseline", "retrieval": "hybrid"},
+    "sentence_window": {"mode": "sentence_window"},
+    "hyde_rerank": {"use_hyde": True, "use_rerank": True},
+}
+DEFAULT_MIX = "baseline=0.4,baseline_hybrid=0.2,sentence_window=0.3,hyde_rerank=0.1"
+
+
+def parse_mix(spec: str) -> Dict[str, float]:
+    """Parse `name=weight,...` into normalized weights over known modes."""
+
+    weights: Dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, _, weight = part.partition("=")
+        if name not in MODES:
+            raise ValueError(f"Unknown query mode {name!r}; expected one of {sorted(MODES)}")
+        weights[name] = float(weight or 1.0)
+    total = sum(weights.values())
+    if total <= 0:
+        raise ValueError("Query mix needs at least one positive weight")
+    return {name: w / total for name, w in weights.items()}
+
+
+async def _ingest(client, paths: List[str]) -> Dict[str, Any]:
+    report: Dict[str, Any] = {}
+    for mode in ("baseline", "sentence_window"):
+        t0 = time.perf_counter()
+        resp = await client.post("/ingest", json={"paths": paths, "mode": mode})
+        resp.raise_for_status()
+        report[mode] = {"seconds": round(time.perf_counter() - t0, 3), **resp.json()}
+    return report
+
+
+async def _drive(
+    client,
+    questions: List[str],
+    mix: Dict[str, float],
+    concurrency: int,
+    requests: Optional[int],
+    duration: Optional[float],
+    k: int,
+    stage_timings: bool,
+    seed: int,
+) -> Dict[str, Any]:
+    rng = random.Random(seed)
+    names = list(mix)
+    plan = rng.choices(names, weights=[mix[n] for n in names], k=max(len(questions), 1024))
+    headers = {"x-debug-timings": "1"} if stage_timings else {}
+
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    statuses: Dict[str, int] = {}
+    stages: Dict[str, List[float]] = {}
+    issued = 0
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker() -> None:
+        nonlocal issued
+        while True:
+            if requests is not None and issued >= requests:
+                return
+            if deadline is not None and time.perf_counter() >= deadline:
+                return
+            i = issued
+            issued += 1
+            mode = plan[i % len(plan)]
+            body = {"question": questions[i % len(questions)], "k": k, **MODES[mode]}
+            t0 = time.perf_counter()
+            try:
+                resp = await client.post("/query", json=body, headers=headers)
+                status = str(resp.status_code)
+            except Exception as exc:
+                resp, status = None, type(exc).__name__
+            elapsed_ms = (time.perf_counter() - t0) * 1000.0
+            statuses[status] = statuses.get(status, 0) + 1
+            if status == "200":
+                latencies[mode].append(elapsed_ms)
+                for stage, ms in (resp.json().get("timings") or {}).items():
+                    stages.setdefault(stage, []).append(ms)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    wall = time.perf_counter() - started
+
+    ok = [ms for samples in latencies.values() for ms in samples]
+    report: Dict[str, Any] = {
+        "requests": issued,
+        "seconds": round(wall, 3),
+        "qps": round(len(ok) / wall, 2) if wall else None,
+        "status": statuses,
+        "latency": latency_summary(ok),
+        "modes": {name: latency_summary(samples) for name, samples in latencies.items()},
+    }
+    if stage_timings:
+        report["stages"] = {stage: latency_summary(samples) for stage, samples in sorted(stages.items())}
+    return report
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    import httpx
+
+    mix = parse_mix(args.mix)
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = generate_corpus(Path(tmp) / "corpus", documents=args.documents, questions=args.questions)
+        questions = [row["question"] for row in corpus.questions]
+        paths = [str(p) for p in corpus.paths]
+        async with AsyncExitStack() as stack:
+            if args.url:
+                client = await stack.enter_async_context(httpx.AsyncClient(base_url=args.url, timeout=args.timeout))
+            else:
+                from app.api.main import create_app
+
+                stack.enter_context(isolated_store())
+                app = create_app()
+                await stack.enter_async_context(app.router.lifespan_context(app))
+                transport = httpx.ASGITransport(app=app)
+                client = await stack.enter_async_context(
+                    httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=args.timeout)
+                )
+            ingest = await _ingest(client, paths)
+            load = await _drive(
+                client,
+                questions,
+                mix,
+                args.concurrency,
+                args.requests if not args.duration else None,
+                args.duration,
+                args.k,
+                args.stage_timings,
+                args.seed,
+            )
+            health = (await client.get("/health")).json()
+
+    meta = run_metadata(args.offline) if not args.url else {**run_metadata(False), "target": args.url}
+    return {
+        "meta": meta,
+        "params": {
+            "documents": args.documents,
+            "questions": args.questions,
+            "concurrency": args.concurrency,
+            "requests": args.requests,
+            "duration": args.duration,
+            "k": args.k,
+            "mix": mix,
+        },
+        "corpus": {"chars": corpus.chars},
+        "ingest": ingest,
+        "load": load,
+        "server_stages": health.get("stages", {}),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=None, help="target a running server instead of the in-process app")
+    parser.add_argument("--documents", type=int, default=100)
+    parser.add_argument("--questions", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=None, help="run for this many seconds instead")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"query modes and weights (default: {DEFAULT_MIX})")
+    parser.add_argument("--stage-timings", action="store_true", help="collect per-stage timings per request")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--offline", action="store_true", help="hashing embedder, lexical reranker, no network")
+    parser.add_argument("--output", default=None, help="JSON path (default: benchmarks/results/load-<commit>.json)")
+    args = parser.parse_args()
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    if not args.url:
+        prepare_environment(args.offline)
+    report = asyncio.run(run(args))
+    path = write_results("load", report, args.output)
+    print(json.dumps({"ingest": report["ingest"], "load": report["load"]}, indent=2))
+    print(f"results written to {path}")
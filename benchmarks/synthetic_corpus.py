@@ -0,0 +1,120 @@
+"""Deterministic synthetic corpus and questions for benchmarks and evaluation runs.
+
+Each document belongs to a topic with its own vocabulary, mixed with common words
+drawn from a Zipf-like distribution, so dense retrieval has something to find.
+Every document carries one identifier code (for lexical retrieval) and the same
+header and footer boilerplate (for the embedding cache). Questions are built from
+words of one sentence, whose text is the reference answer; they are written to
+`questions.jsonl` in the format `app.evaluation.dataset.load_qa_pairs` reads.
+
+Usage:
+    python -m benchmarks.synthetic_corpus data/synthetic --documents 200 --questions 100
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import random
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+_SYLLABLES = ["ka", "lo", "mi", "ne", "ru", "sa", "te", "vo", "zi", "qu", "ar", "en", "il", "or", "ux", "py", "dre", "sto"]
+HEADER = "Internal document. Distribution is limited to employees and approved partners."
+FOOTER = "This document is provided as is without warranty of any kind. All rights reserved."
+
+
+@dataclass
+class SyntheticCorpus:
+    paths: List[Path] = field(default_factory=list)
+    questions: List[Dict[str, str]] = field(default_factory=list)
+    chars: int = 0
+
+
+def _words(rng: random.Random, count: int, syllables: Tuple[int, int]) -> List[str]:
+    seen: Dict[str, None] = {}
+    while len(seen) < count:
+        seen["".join(rng.choice(_SYLLABLES) for _ in range(rng.randint(*syllables)))] = None
+    return list(seen)
+
+
+def _sentence(rng: random.Random, topic: List[str], common: List[str], cum_weights: List[float]) -> str:
+    length = rng.randint(8, 18)
+    words = [
+        rng.choice(topic) if rng.random() < 0.4 else rng.choices(common, cum_weights=cum_weights)[0]
+        for _ in range(length)
+    ]
+    return " ".join(words).capitalize() + "."
+
+
+def generate_corpus(
+    directory: str | Path,
+    documents: int = 50,
+    paragraphs: int = 6,
+    sentences: int = 5,
+    topics: int = 20,
+    questions: int = 50,
+    seed: int = 0,
+) -> SyntheticCorpus:
+    """Write `documents` text files and `questions.jsonl` under `directory`.
+
+    The same arguments always produce byte-identical files.
+    """
+
+    rng = random.Random(seed)
+    root = Path(directory)
+    root.mkdir(parents=True, exist_ok=True)
+    common = _words(rng, 2000, (1, 3))
+    cum_weights = list(itertools.accumulate(1.0 / (rank + 1) for rank in range(len(common))))
+    vocabularies = [_words(rng, 60, (2, 4)) for _ in range(max(1, topics))]
+
+    corpus = SyntheticCorpus()
+    doc_sentences: List[List[str]] = []
+    for d in range(documents):
+        topic = vocabularies[d % len(vocabularies)]
+        code = f"{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}{rng.choice('ABCDEFGHJKLMNPQRSTUVWXYZ')}-{rng.randint(1000, 9999)}"
+        body: List[List[str]] = [
+            [_sentence(rng, topic, common, cum_weights) for _ in range(sentences)] for _ in range(paragraphs)
+        ]
+        body[0][-1] = f"The reference code for this document is {code}."
+        path = root / f"doc_{d:05d}.txt"
+        text = "\n\n".join([HEADER] + [" ".join(p) for p in body] + [FOOTER]) + "\n"
+        path.write_text(text, encoding="utf-8")
+        corpus.paths.append(path)
+        corpus.chars += len(text)
+        doc_sentences.append([s for p in body for s in p])
+
+    for q in range(questions if documents else 0):
+        d = rng.randrange(documents)
+        sentence = rng.choice(doc_sentences[d])
+        if q % 5 == 0:
+            sentence = doc_sentences[d][sentences - 1]  # the code sentence
+            question = f"What is the reference code {sentence.rsplit(' ', 1)[-1].rstrip('.')} about?"
+        else:
+            words = sentence.rstrip(".").lower().split()
+            picked = sorted(rng.sample(range(len(words)), k=min(5, len(words))))
+            question = "What is said about " + " ".join(words[i] for i in picked) + "?"
+        corpus.questions.append({"question": question, "answer": sentence, "source": str(corpus.paths[d])})
+
+    with (root / "questions.jsonl").open("w", encoding="utf-8") as f:
+        for row in corpus.questions:
+            f.write(json.dumps(row) + "\n")
+    return corpus
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("directory")
+    parser.add_argument("--documents", type=int, default=50)
+    parser.add_argument("--paragraphs", type=int, default=6)
+    parser.add_argument("--sentences", type=int, default=5)
+    parser.add_argument("--topics", type=int, default=20)
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    made = generate_corpus(
+        args.directory, args.documents, args.paragraphs, args.sentences, args.topics, args.questions, args.seed
+    )
+    print(json.dumps({"documents": len(made.paths), "chars": made.chars, "questions": len(made.questions)}))
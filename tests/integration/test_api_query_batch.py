@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.api.main import app
+
+
+@pytest.mark.asyncio
+async def test_api_query_batch(tmp_path: Path):
+    doc_dir = tmp_path / "docs"
+    doc_dir.mkdir()
+    (doc_dir / "sample.txt").write_text("FastAPI runs on Uvicorn. Chroma stores the embeddings.")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/ingest", json={"paths": [str(doc_dir)], "chunk_size": 64, "chunk_overlap": 16})
+        assert r.status_code == 200
+
+        questions = ["What runs FastAPI?", "", "Where are embeddings stored?"]
+        q = await client.post("/query/batch", json={"questions": questions, "k": 2})
+        assert q.status_code == 200
+        results = q.json()["results"]
+        assert len(results) == 3
+        assert results[1]["error"] == "empty question"
+        for item in (results[0], results[2]):
+            assert item["error"] is None
+            assert item["answer"] and len(item["contexts"]) >= 1
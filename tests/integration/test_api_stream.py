@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.api.main import app
+
+
+def _parse_sse(body: str):
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+@pytest.mark.asyncio
+async def test_api_query_stream(tmp_path: Path):
+    doc_dir = tmp_path / "docs"
+    doc_dir.mkdir()
+    sample = doc_dir / "sample.txt"
+    sample.write_text("Streaming sends tokens early. Clients render partial answers.")
+
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        r = await client.post("/ingest", json={"paths": [str(doc_dir)], "chunk_size": 64, "chunk_overlap": 16})
+        assert r.status_code == 200
+
+        q = await client.post("/query/stream", json={"question": "What does streaming send?", "k": 3})
+        assert q.status_code == 200
+        assert q.headers["content-type"].startswith("text/event-stream")
+        events = _parse_sse(q.text)
+        assert events[0][0] == "contexts" and len(events[0][1]) >= 1
+        assert events[-1][0] == "done"
+        tokens = [data["text"] for name, data in events if name == "token"]
+        assert "".join(tokens) == events[-1][1]["answer"]
@@ -0,0 +1,16 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app.api.main import app
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_reports_request_stages():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        assert (await client.get("/health")).status_code == 200
+        resp = await client.get("/metrics")
+        assert resp.status_code == 200
+        assert resp.headers["content-type"].startswith("text/plain")
+        assert 'rag_stage_seconds_count{stage="http GET /health"}' in resp.text
+        assert "# TYPE rag_http_in_flight gauge" in resp.text
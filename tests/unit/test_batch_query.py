@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import hashlib
+from typing import List
+
+import numpy as np
+import pytest
+
+from app.core.config import get_settings
+from app.ingestion.index import drop_collection, index_items, invalidate_collection_cache
+from app.pipeline import batch
+from app.retrieval.rerank import Reranker
+
+
+class _HashEmbedder:
+    model_name = "hash"
+
+    def __init__(self) -> None:
+        self.calls: List[int] = []
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        self.calls.append(len(texts))
+        rows = []
+        for text in texts:
+            seed = int(hashlib.md5(text.encode()).hexdigest()[:8], 16)
+            vec = np.random.default_rng(seed).standard_normal(8).astype(np.float32)
+            rows.append(vec / np.linalg.norm(vec))
+        return np.stack(rows)
+
+
+class _LexicalReranker(Reranker):
+    def __init__(self) -> None:
+        self.model = None
+        self.calls = 0
+
+    def score_pairs(self, pairs):
+        self.calls += 1
+        return super().score_pairs(pairs)
+
+
+@pytest.fixture
+def fakes(monkeypatch, tmp_path):
+    # Collections live under tmp_path, never in the configured data directories
+    monkeypatch.setattr(get_settings().db, "chroma_path", str(tmp_path / "chroma"))
+    monkeypatch.setattr(get_settings().db, "store_path", str(tmp_path / "vector_store"))
+    invalidate_collection_cache()
+    embedder, reranker = _HashEmbedder(), _LexicalReranker()
+    monkeypatch.setattr(batch, "get_embedding_model", lambda: embedder)
+    monkeypatch.setattr(batch, "get_reranker", lambda: reranker)
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    yield embedder, reranker
+    invalidate_collection_cache()
+
+
+def _index(embedder: _HashEmbedder, collection: str, texts: List[str]) -> None:
+    drop_collection(collection)
+    index_items(texts, [{"source": f"doc{i}"} for i in range(len(texts))], embeddings=embedder.embed(texts), collection_name=collection)
+    embedder.calls.clear()
+
+
+def test_batch_keeps_order_and_reports_item_errors(fakes):
+    embedder, _ = fakes
+    texts = ["alpha is first", "beta is second", "gamma is third"]
+    _index(embedder, batch.DEFAULT_BASELINE_COLLECTION, texts)
+
+    # A question equal to a stored text embeds to the same vector, so it ranks first
+    results = batch.answer_questions_batch([texts[2], "  ", texts[0]], k=2)
+    assert [r.error for r in results] == [None, "empty question", None]
+    assert results[0].retrieved[0][0] == texts[2]
+    assert results[2].retrieved[0][0] == texts[0]
+    assert results[0].answer and results[2].answer
+    assert embedder.calls == [2]
+
+
+def test_batch_rerank_scores_all_pairs_in_one_call(fakes):
+    embedder, reranker = fakes
+    texts = [f"sentence {i} about topic {i}" for i in range(6)]
+    _index(embedder, batch.SENTENCE_WINDOW_COLLECTION, texts)
+
+    results = batch.answer_questions_batch(["topic 1", "topic 4", "topic 5"], k=3, use_rerank=True)
+    assert all(r.error is None and len(r.retrieved) == 3 for r in results)
+    assert reranker.calls == 1
+    assert embedder.calls == [3]
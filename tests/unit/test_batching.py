@@ -0,0 +1,110 @@
+from __future__ import annotations
+
+import threading
+import time
+from concurrent.futures import TimeoutError
+from typing import List
+
+import pytest
+
+from app.retrieval.batching import EmbeddingBatcher
+
+
+class _CountingModel:
+    model_name = "fake"
+
+    def __init__(self) -> None:
+        self.calls: List[int] = []
+
+    def embed(self, texts: List[str]) -> List[List[float]]:
+        self.calls.append(len(texts))
+        return [[float(len(t))] for t in texts]
+
+
+def test_concurrent_embed_one_calls_are_batched():
+    model = _CountingModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=16, max_wait_ms=100)
+    results = {}
+    start = threading.Barrier(8)
+
+    def worker(i: int) -> None:
+        start.wait()
+        results[i] = batcher.embed_one("x" * i)
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+
+    assert results == {i: [float(i)] for i in range(8)}
+    assert sum(model.calls) == 8
+    assert len(model.calls) < 8
+    stats = batcher.stats()
+    assert stats["items"] == 8 and stats["max_batch_size"] > 1
+
+
+def test_batch_respects_max_size():
+    model = _CountingModel()
+    batcher = EmbeddingBatcher(model, max_batch_size=2, max_wait_ms=50)
+    threads = [threading.Thread(target=batcher.embed_one, args=("abc",)) for _ in range(6)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    batcher.close()
+    assert max(model.calls) <= 2
+
+
+def test_short_model_output_fails_every_caller():
+    class _Short(_CountingModel):
+        def embed(self, texts: List[str]) -> List[List[float]]:
+            return super().embed(texts)[:-1]
+
+    batcher = EmbeddingBatcher(_Short(), max_batch_size=4, max_wait_ms=1)
+    with pytest.raises(ValueError):
+        batcher.embed_one("abc")
+    batcher.close()
+
+
+def test_close_fails_waiting_and_later_callers():
+    started, release = threading.Event(), threading.Event()
+
+    class _Blocking(_CountingModel):
+        def embed(self, texts: List[str]) -> List[List[float]]:
+            started.set()
+            release.wait(5)
+            return super().embed(texts)
+
+    batcher = EmbeddingBatcher(_Blocking(), max_batch_size=1, max_wait_ms=0, timeout_s=5)
+    errors: List[BaseException] = []
+
+    def call() -> None:
+        try:
+            batcher.embed_one("abc")
+        except Exception as exc:
+            errors.append(exc)
+
+    # The first call occupies the worker, the second stays queued
+    threads = [threading.Thread(target=call) for _ in range(2)]
+    threads[0].start()
+    assert started.wait(5)
+    threads[1].start()
+    while batcher._queue.qsize() < 1:
+        time.sleep(0.001)
+    batcher.close()
+    release.set()
+    for t in threads:
+        t.join()
+    assert [type(e) for e in errors] == [RuntimeError]
+    with pytest.raises(RuntimeError):
+        batcher.embed_one("late")
+
+
+def test_embed_one_times_out_when_no_worker_answers():
+    batcher = EmbeddingBatcher(_CountingModel(), timeout_s=0.05)
+    batcher._queue.put(None)  # the worker exits, as if it had died
+    batcher._worker.join()
+    with pytest.raises(TimeoutError):
+        batcher.embed_one("abc")
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+from app.ingestion.bm25 import BM25Index, tokenize
+from app.retrieval.hybrid import reciprocal_rank_fusion
+
+
+def _index(tmp_path: Path) -> BM25Index:
+    index = BM25Index(tmp_path / "bm25.sqlite3")
+    docs = {
+        "a0": ("a.txt", "The reactor raised ERR-1042 after the coolant pump stalled."),
+        "a1": ("a.txt", "Coolant pumps are inspected every quarter."),
+        "b0": ("b.txt", "Error codes are listed in the operator manual."),
+        "b1": ("b.txt", "ERR-1043 means the coolant level sensor is offline."),
+    }
+    ids = list(docs)
+    texts = [text for _src, text in docs.values()]
+    metas = [{"source": src} for src, _text in docs.values()]
+    index.add(ids, texts, texts, metas)
+    return index
+
+
+def test_tokenize_keeps_compound_codes_and_parts():
+    assert tokenize("See ERR-1042, sku_12.b") == ["see", "err-1042", "err", "1042", "sku_12.b", "sku", "12", "b"]
+
+
+def test_exact_code_ranks_first(tmp_path: Path):
+    index = _index(tmp_path)
+    hits = index.search("what does err-1042 mean", k=4)
+    assert hits[0][0] == "a0"
+    assert hits[0][2] == {"source": "a.txt"}
+    assert index.search("nothing matches here", k=3) == []
+
+
+def test_incremental_replace_and_delete(tmp_path: Path):
+    index = _index(tmp_path)
+    assert index.count() == 4
+    index.add(["a0"], ["completely rewritten text"], ["completely rewritten text"], [{"source": "a.txt"}])
+    assert index.count() == 4
+    assert all(hit[0] != "a0" for hit in index.search("err-1042", k=4))
+    index.delete_sources(["a.txt"])
+    assert index.count() == 2
+    assert {hit[0] for hit in index.search("coolant", k=4)} == {"b1"}
+    index.close()
+    reopened = BM25Index(tmp_path / "bm25.sqlite3")
+    assert reopened.count() == 2
+
+
+def test_reciprocal_rank_fusion_merges_shared_items():
+    dense = [("x", {"source": "s"}, 0.9), ("y", {"source": "s"}, 0.8)]
+    lexical = [("y", {"source": "s"}, 7.0), ("z", {"source": "t"}, 3.0)]
+    fused = reciprocal_rank_fusion([dense, lexical], k=3, rrf_k=60)
+    assert [text for text, _m, _s in fused] == ["y", "x", "z"]
+    assert fused[0][2] == 1 / 62 + 1 / 61
@@ -0,0 +1,30 @@
+from __future__ import annotations
+
+from app.core.config import get_settings
+from app.ingestion.index import (
+    drop_collection,
+    get_chroma_client,
+    get_chroma_collection,
+    invalidate_collection_cache,
+    reset_collection,
+)
+
+
+def test_collection_handle_is_cached_and_invalidated_on_drop(monkeypatch, tmp_path):
+    # A throwaway persist directory, never the configured store
+    monkeypatch.setattr(get_settings().db, "chroma_path", str(tmp_path / "chroma"))
+    monkeypatch.setattr(get_settings().db, "store_path", str(tmp_path / "vector_store"))
+    invalidate_collection_cache()
+    name = "test_handle_cache"
+    first = get_chroma_collection(name)
+    assert get_chroma_collection(name) is first
+    assert get_chroma_client() is get_chroma_client()
+
+    first.add(ids=["a"], documents=["alpha"], embeddings=[[0.1, 0.2, 0.3]])
+    fresh = reset_collection(name)
+    assert fresh is not first
+    assert fresh.count() == 0
+    assert get_chroma_collection(name) is fresh
+
+    drop_collection(name)
+    invalidate_collection_cache()
@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+import re
+
+import numpy as np
+
+from app.ingestion.chunking import iter_chunk_spans, word_token_spans
+
+
+def _leading_space_tokens(text: str) -> np.ndarray:
+    # Like tiktoken: whitespace is folded into the following token
+    return np.array([m.span() for m in re.finditer(r"\s*\S+", text)], dtype=np.int64).reshape(-1, 2)
+
+
+def _chunks(text: str, size: int, overlap: int, tokenizer=word_token_spans, max_tokens=None):
+    return [text[a:b] for a, b in iter_chunk_spans(text, size, overlap, tokenizer, max_tokens)]
+
+
+def test_chunks_respect_token_limit_and_sentences():
+    text = " ".join(f"Sentence number {i} ends here." for i in range(40))
+    for tokenizer in (word_token_spans, _leading_space_tokens):
+        chunks = _chunks(text, 24, 6, tokenizer)
+        assert all(len(tokenizer(c)) <= 24 for c in chunks)
+        # Every chunk starts and ends on a sentence boundary
+        assert all(c.startswith("Sentence") and c.endswith(".") for c in chunks)
+        assert chunks[0] == " ".join(f"Sentence number {i} ends here." for i in range(4))
+
+
+def test_paragraph_break_preferred_and_overlap():
+    para = "Alpha beta gamma. Delta epsilon zeta."
+    text = f"{para}\n\n{para}\n\n{para}"
+    chunks = _chunks(text, 20, 0)
+    assert chunks == [f"{para}\n\n{para}", para]
+    overlapped = _chunks(" ".join(["word"] * 100), 20, 5)
+    assert len(overlapped) > 1 and all(len(c.split()) <= 20 for c in overlapped)
+    assert len(" ".join(overlapped).split()) > 100
+
+
+def test_max_tokens_caps_chunk_size_and_blank_text():
+    text = " ".join(["token"] * 50)
+    assert all(len(c.split()) <= 10 for c in _chunks(text, 200, 0, max_tokens=10))
+    assert _chunks("   \n\n  ", 10, 2) == []
+
+
+def test_pathological_input_is_linear():
+    # One character per token and no boundaries at all
+    text = "x" * 200_000
+    char_tokens = lambda t: np.stack([np.arange(len(t)), np.arange(1, len(t) + 1)], axis=1)
+    spans = list(iter_chunk_spans(text, 100, 99, char_tokens))
+    # Overlap is capped at a quarter chunk, so steps are at least 75 tokens
+    assert len(spans) <= len(text) // 75 + 1
+    assert spans[0] == (0, 100) and spans[-1][1] == len(text)
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import List
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.retrieval import embeddings
+from app.retrieval.embeddings import EmbeddingCache, EmbeddingModel, collect_embedding_counts, text_digest
+
+
+class _CountingEncoder:
+    def __init__(self) -> None:
+        self.encoded: List[str] = []
+
+    def encode(self, texts: List[str], **_kwargs) -> np.ndarray:
+        self.encoded.extend(texts)
+        return np.array([[len(t), t.count("a"), 1.0] for t in texts], dtype=np.float32)
+
+
+def test_cache_persists_and_grows(tmp_path):
+    cache = EmbeddingCache(tmp_path)
+    digests = [text_digest(f"text {i}") for i in range(1500)]
+    vectors = np.arange(1500 * 4, dtype=np.float32).reshape(1500, 4)
+    cache.put_many(digests[:1000], vectors[:1000])
+    cache.put_many(digests, vectors)  # grows past the initial capacity, skips known rows
+    cache.close()
+
+    reopened = EmbeddingCache(tmp_path)
+    assert len(reopened) == 1500
+    hits, found = reopened.get_many([digests[1499], text_digest("unknown"), digests[3]])
+    assert hits == [0, 2]
+    np.testing.assert_array_equal(found, vectors[[1499, 3]])
+
+
+def test_writers_sharing_a_directory_append_after_each_other(tmp_path):
+    # Two handles stand in for two ingesting processes, each with its own row count
+    first, second = EmbeddingCache(tmp_path), EmbeddingCache(tmp_path)
+    vectors = np.eye(4, dtype=np.float32)
+    first.put_many([text_digest("a"), text_digest("b")], vectors[:2])
+    second.put_many([text_digest("c")], vectors[2:3])
+    first.put_many([text_digest("d")], vectors[3:])
+    first.close()
+    second.close()
+
+    reopened = EmbeddingCache(tmp_path)
+    hits, found = reopened.get_many([text_digest(t) for t in "abcd"])
+    assert hits == [0, 1, 2, 3]
+    np.testing.assert_array_equal(found, vectors)
+
+
+def test_embed_deduplicates_and_reads_cache(monkeypatch, tmp_path):
+    encoder = _CountingEncoder()
+    monkeypatch.setattr(get_settings().embedding, "cache_dir", str(tmp_path))
+    monkeypatch.setattr(embeddings, "load_model", lambda cls, name: (encoder, "torch"))
+    model = EmbeddingModel("org/model")
+    model.embed(["query"])
+    # Only a cached embed opens (and creates) the cache
+    assert list(tmp_path.iterdir()) == []
+
+    with collect_embedding_counts() as counts:
+        first = model.embed(["footer", "banana", "footer", "footer"], cache=True)
+        second = model.embed(["banana", "new", "footer"], cache=True)
+    assert counts == {"texts": 7, "encoded": 3}
+    assert encoder.encoded[1:3] == ["footer", "banana"]
+    assert first.shape == (4, 3) and first.flags["C_CONTIGUOUS"]
+    np.testing.assert_array_equal(first[0], first[3])
+
+    assert encoder.encoded[3:] == ["new"]
+    np.testing.assert_array_equal(second[[0, 2]], first[[1, 0]])
+
+    # Another model instance (e.g. after a restart) reuses the persisted vectors
+    restarted = EmbeddingModel("org/model")
+    restarted.embed(["banana", "footer"], cache=True)
+    assert encoder.encoded[4:] == []
+    # Queries embed without the cache by default: de-duplicated, but neither read nor written
+    restarted.embed(["uncached", "uncached"])
+    restarted.embed_one("footer")
+    assert encoder.encoded[4:] == ["uncached", "footer"]
+    assert len(restarted.cache) == 3
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.metrics import count_llm_call
+from app.evaluation import matrix
+from app.evaluation.matrix import PipelineConfig
+from app.evaluation.store import ResultStore
+
+
+PAIRS = [("what is a", "alpha beta"), ("what is b", "gamma delta")]
+
+
+def _point(name: str, quality: float, p95: float, tokens: float) -> dict:
+    return {
+        "name": name,
+        "quality": {"answer_overlap": quality},
+        "latency": {"p50_ms": p95 / 2, "p95_ms": p95, "errors": 0},
+        "llm_calls_per_question": 1.0 if tokens else 0.0,
+        "llm_tokens_per_question": tokens,
+    }
+
+
+def test_expand_matrix_normalizes_and_dedupes():
+    configs = matrix.expand_matrix(
+        {"collection": ["baseline"], "k": [5], "use_rerank": [False, True], "rerank_top_k": [3, 20], "window_size": [1, 2]}
+    )
+    # rerank depth is irrelevant without reranking, window size without sentence windows
+    assert [c.name for c in configs] == ["baseline/k5", "baseline/k5/rerank5", "baseline/k5/rerank20"]
+    hyde = PipelineConfig(collection="sentence_window", use_hyde=True, retrieval="hybrid", window_size=1).normalized()
+    assert hyde.retrieval == "dense" and hyde.name == "sentence_window/k5/hyde/w1"
+
+    with pytest.raises(ValueError):
+        matrix.expand_matrix({"temperature": [0.1]})
+    with pytest.raises(ValueError):
+        matrix.expand_matrix({"collection": ["nowhere"]})
+
+
+def test_pareto_front_and_recommendation():
+    points = [
+        _point("cheap", 0.50, 10.0, 0.0),
+        _point("balanced", 0.70, 20.0, 100.0),
+        _point("slow_and_worse", 0.60, 40.0, 100.0),
+        _point("best", 0.90, 80.0, 400.0),
+    ]
+    assert matrix.pareto_front(points, "answer_overlap") == ["cheap", "balanced", "best"]
+    assert matrix.recommend(points, "answer_overlap", 0.65, "p95_ms") == "balanced"
+    assert matrix.recommend(points, "answer_overlap", 0.55, "llm_tokens") == "balanced"
+    assert matrix.recommend(points, "answer_overlap", 0.95, "p95_ms") is None
+
+
+def test_run_matrix_records_quality_latency_and_llm_usage(monkeypatch, tmp_path: Path):
+    seen_cache_settings = []
+
+    def fake_answer(config: PipelineConfig, question: str):
+        seen_cache_settings.append((get_settings().hyde_cache.enabled, get_settings().rerank.cache_size))
+        if config.use_hyde:
+            count_llm_call("test-model", prompt_tokens=30, completion_tokens=10)
+        count_llm_call("test-model", prompt_tokens=100, completion_tokens=20)
+        reference = dict(PAIRS)[question]
+        answer = reference if config.use_hyde else reference.split()[0]
+        return answer, [reference]
+
+    monkeypatch.setattr(matrix, "answer_with_config", fake_answer)
+    configs = matrix.expand_matrix({"use_hyde": [False, True]})
+    store = ResultStore(tmp_path / "results.sqlite3")
+    points = matrix.run_matrix(PAIRS, configs, store, workers=2)
+
+    by_name = {p["name"]: p for p in points}
+    plain, hyde = by_name["baseline/k5"], by_name["baseline/k5/hyde"]
+    assert plain["quality"] == {"answer_overlap": 0.5, "context_recall": 1.0}
+    assert hyde["quality"]["answer_overlap"] == 1.0
+    assert (plain["llm_calls_per_question"], plain["llm_tokens_per_question"]) == (1.0, 120.0)
+    assert (hyde["llm_calls_per_question"], hyde["llm_tokens_per_question"]) == (2.0, 160.0)
+    assert plain["latency"]["questions"] == 2 and "p95_ms" in plain["latency"]
+    # Caches are off during the sweep and restored afterwards
+    assert set(seen_cache_settings) == {(False, 0)}
+    assert get_settings().hyde_cache.enabled and get_settings().rerank.cache_size > 0
+
+    # A rerun resumes from the store without calling the pipelines again
+    seen_cache_settings.clear()
+    matrix.run_matrix(PAIRS, configs, store, workers=2)
+    assert seen_cache_settings == []
+    # ... but not from outputs stored under other run conditions, e.g. warm caches
+    matrix.run_matrix(PAIRS, configs, store, workers=2, cold=False)
+    assert len(seen_cache_settings) == 4
+
+    report = matrix.build_report(points, "answer_overlap", 0.9, "llm_tokens", {"questions": 2})
+    assert report["recommended"] == "baseline/k5/hyde"
+    assert report["pareto_front"] == ["baseline/k5", "baseline/k5/hyde"]
+    json_path, md_path = matrix.write_report(report, tmp_path / "report" / "matrix")
+    assert json.loads(json_path.read_text())["recommended"] == "baseline/k5/hyde"
+    markdown = md_path.read_text()
+    assert "| * | `baseline/k5/hyde` | 1.000 |" in markdown
+    assert "Cheapest configuration with answer_overlap >= 0.9: `baseline/k5/hyde`." in markdown
+    store.close()
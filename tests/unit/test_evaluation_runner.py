@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+
+import pytest
+
+from app.core.config import get_settings
+from app.core.metrics import span
+from app.evaluation import evaluate
+from app.evaluation.runner import latency_report, run_fingerprint, run_pipelines
+from app.evaluation.store import PipelineOutput, ResultStore, question_id
+
+
+PAIRS = [("what is a", "a is first"), ("what is b", "b is second"), ("what is c", "c is third")]
+
+
+def _echo(question: str):
+    with span("retrieve"):
+        return f"answer to {question}", [f"context for {question}"]
+
+
+def test_store_round_trip_and_resume(tmp_path: Path):
+    path = tmp_path / "runs" / "results.sqlite3"
+    calls = []
+
+    def pipeline(question: str):
+        calls.append(question)
+        return _echo(question)
+
+    store = ResultStore(path)
+    counts = run_pipelines(PAIRS[:2], {"baseline": pipeline}, store, workers=2)
+    assert counts == {"baseline": {"skipped": 0, "run": 2, "failed": 0}}
+    store.close()
+
+    # A new process resumes: only the missing question runs
+    store = ResultStore(path)
+    counts = run_pipelines(PAIRS, {"baseline": pipeline}, store, workers=2)
+    assert counts["baseline"] == {"skipped": 2, "run": 1, "failed": 0}
+    assert sorted(calls) == ["what is a", "what is b", "what is c"]
+
+    rows = store.outputs("baseline", [question_id(q, ref) for q, ref in reversed(PAIRS)])
+    assert [r.question for r in rows] == ["what is c", "what is b", "what is a"]
+    assert rows[0].answer == "answer to what is c"
+    assert rows[0].contexts == ["context for what is c"]
+    assert "retrieve" in rows[0].timings
+    assert rows[0].latency_ms >= rows[0].timings["retrieve"]
+    store.close()
+
+
+def test_failed_questions_are_recorded_and_retried():
+    store = ResultStore()
+    broken = {"what is b"}
+
+    def flaky(question: str):
+        if question in broken:
+            raise RuntimeError("model unavailable")
+        return _echo(question)
+
+    counts = run_pipelines(PAIRS, {"advanced": flaky}, store, workers=3)
+    assert counts["advanced"] == {"skipped": 0, "run": 2, "failed": 1}
+    report = latency_report(store.outputs("advanced"))
+    assert report["questions"] == 3 and report["errors"] == 1
+    assert report["p50_ms"] <= report["p95_ms"] <= report["p99_ms"]
+    assert "retrieve" in report["stages_mean_ms"]
+
+    broken.clear()
+    counts = run_pipelines(PAIRS, {"advanced": flaky}, store, workers=3)
+    assert counts["advanced"] == {"skipped": 2, "run": 1, "failed": 0}
+    assert all(o.error is None for o in store.outputs("advanced"))
+
+
+def test_outputs_of_other_run_conditions_are_rerun(monkeypatch):
+    store = ResultStore()
+    first = run_fingerprint(["baseline"], cold_caches=True)
+    assert run_fingerprint(["baseline"], cold_caches=True) == first
+    assert run_fingerprint(["baseline"], cold_caches=False) != first
+    run_pipelines(PAIRS, {"baseline": _echo}, store, fingerprint=first)
+
+    monkeypatch.setattr(get_settings().rerank, "max_length", 128)
+    second = run_fingerprint(["baseline"], cold_caches=True)
+    assert second != first
+    counts = run_pipelines(PAIRS, {"baseline": _echo}, store, fingerprint=second)
+    assert counts["baseline"] == {"skipped": 0, "run": 3, "failed": 0}
+    assert {o.fingerprint for o in store.outputs("baseline")} == {second}
+
+
+def test_pipelines_run_concurrently():
+    started = threading.Barrier(3, timeout=5)
+
+    def waits_for_peers(question: str):
+        started.wait()  # only passes when three questions are in flight at once
+        return _echo(question)
+
+    counts = run_pipelines(PAIRS, {"baseline": waits_for_peers}, ResultStore(), workers=3)
+    assert counts["baseline"]["run"] == 3
+
+
+def test_collect_outputs_scores_stored_outputs(monkeypatch):
+    calls = []
+
+    def pipeline(question: str):
+        calls.append(question)
+        return PAIRS[[q for q, _ in PAIRS].index(question)][1], []
+
+    monkeypatch.setattr(evaluate, "PIPELINES", {"baseline": pipeline, "advanced": _echo})
+    store = ResultStore()
+    outputs = evaluate.collect_outputs(PAIRS, ["baseline", "advanced"], store=store, workers=2)
+    assert evaluate.proxy_scores(outputs)["baseline"] == pytest.approx(1.0)
+    assert evaluate.proxy_scores(outputs)["advanced"] < 1.0
+
+    # Scorers reuse the stored outputs instead of rerunning the pipelines
+    again = evaluate.evaluate_pairs_proxy(PAIRS, store=store)
+    assert len(calls) == 3
+    assert [r.baseline_answer for r in again] == [ref for _q, ref in PAIRS]
+
+    with pytest.raises(ValueError):
+        evaluate.collect_outputs(PAIRS, ["unknown"], store=store)
+
+
+def test_latency_report_without_successes():
+    failed = PipelineOutput(mode="m", question="q", reference="r", error="boom")
+    assert latency_report([failed]) == {"questions": 1, "errors": 1}
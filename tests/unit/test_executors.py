@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import asyncio
+import threading
+
+import pytest
+
+from app.core.executors import BoundedExecutor, ExecutorSaturatedError
+from app.core.logging import trace_id_ctx
+
+
+@pytest.mark.asyncio
+async def test_bounded_executor_rejects_when_full():
+    executor = BoundedExecutor("test", max_workers=1, queue_size=1)
+    gate = threading.Event()
+    try:
+        running = [asyncio.ensure_future(executor.run(gate.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert executor.in_flight == 2
+
+        with pytest.raises(ExecutorSaturatedError):
+            await executor.run(lambda: None)
+
+        gate.set()
+        await asyncio.gather(*running)
+        assert executor.in_flight == 0
+        assert await executor.run(lambda x: x + 1, 1) == 2
+    finally:
+        gate.set()
+        executor.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_bounded_executor_propagates_trace_id():
+    executor = BoundedExecutor("test", max_workers=1, queue_size=0)
+    try:
+        trace_id_ctx.set("abc123")
+        assert await executor.run(trace_id_ctx.get) == "abc123"
+    finally:
+        executor.shutdown()
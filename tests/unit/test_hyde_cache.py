@@ -0,0 +1,78 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from app.retrieval.hyde_cache import HydeCache, normalize_question
+
+
+def _get(cache: HydeCache, key: str):
+    hit = cache.get(key)
+    return None if hit is None else (hit[0], hit[1].tolist())
+
+
+def test_normalized_questions_share_a_key():
+    assert normalize_question("  What is  Python? ") == normalize_question("what is python")
+    assert HydeCache.make_key("What is Python?", "llm", "emb") == HydeCache.make_key("what is python", "llm", "emb")
+    assert HydeCache.make_key("What is Python?", "llm", "emb") != HydeCache.make_key("What is Python?", "other", "emb")
+
+
+def test_memory_lru_eviction_and_ttl():
+    cache = HydeCache(max_entries=2, ttl_seconds=60)
+    cache.put("a", "doc a", [1.0])
+    cache.put("b", "doc b", [2.0])
+    assert _get(cache, "a") == ("doc a", [1.0])
+    cache.put("c", "doc c", [3.0])  # evicts "b", the least recently used
+    assert cache.get("b") is None
+    assert _get(cache, "c") == ("doc c", [3.0])
+
+    expired = HydeCache(ttl_seconds=0)
+    expired.put("x", "doc", [0.0])
+    assert expired.get("x") is None
+    assert expired.stats()["expired"] == 1
+
+
+def test_sqlite_tier_survives_restart(tmp_path: Path):
+    db = tmp_path / "hyde.sqlite3"
+    first = HydeCache(max_entries=4, sqlite_path=str(db))
+    first.put("k", "persisted", [0.5, 0.25])
+    first.close()
+
+    second = HydeCache(max_entries=4, sqlite_path=str(db))
+    assert _get(second, "k") == ("persisted", [0.5, 0.25])
+    assert second.get("k")[1].dtype == np.float32
+    stats = second.stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+    second.close()
+
+
+def test_sqlite_tier_is_size_bounded(tmp_path: Path):
+    cache = HydeCache(max_entries=1, sqlite_path=str(tmp_path / "h.sqlite3"), max_disk_entries=2)
+    for i in range(4):
+        cache.put(str(i), f"doc {i}", [float(i)])
+    assert cache.get("0") is None
+    assert _get(cache, "3") == ("doc 3", [3.0])
+    cache.close()
+
+
+def test_disk_bound_tracks_rows_without_recounting(tmp_path: Path):
+    path = str(tmp_path / "h.sqlite3")
+    other = HydeCache(sqlite_path=path, max_disk_entries=3)
+    other.put("x", "doc x", [0.0])
+    cache = HydeCache(max_entries=1, sqlite_path=path, max_disk_entries=3)  # seeded with the existing row
+    statements = []
+    cache._db.set_trace_callback(statements.append)
+    for _ in range(3):
+        cache.put("a", "doc a", [1.0])  # replacing a key does not grow the table
+    cache.put("b", "doc b", [2.0])
+    assert not any("COUNT" in s for s in statements)
+
+    other.put("y", "doc y", [3.0])  # a row this handle has not seen
+    cache.put("c", "doc c", [4.0])
+    # Crossing the bound recounts and evicts the least recently used rows
+    assert any("COUNT" in s for s in statements)
+    (rows,) = cache._db.execute("SELECT COUNT(*) FROM hyde_cache").fetchone()
+    assert rows == 3 and cache.get("x") is None
+    other.close()
+    cache.close()
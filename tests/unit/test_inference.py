@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+import numpy as np
+import pytest
+
+from app.core.config import get_settings
+from app.retrieval import inference
+from app.retrieval.inference import cosine_drift, load_model, spearman
+
+
+class _FakeModel:
+    def __init__(self, model_name: str, backend: str = "torch", **kwargs) -> None:
+        if backend == "onnx":
+            raise ModuleNotFoundError("optimum")
+        self.model_name = model_name
+        self.kwargs = kwargs
+
+
+def test_onnx_failure_falls_back_to_torch(monkeypatch, tmp_path):
+    cfg = get_settings().inference
+    monkeypatch.setattr(cfg, "backend", "onnx")
+    monkeypatch.setattr(cfg, "export_dir", str(tmp_path))
+    model, backend = load_model(_FakeModel, "org/model", max_length=64)
+    assert backend == "torch"
+    assert model.kwargs == {"device": get_settings().runtime.device, "max_length": 64}
+    with pytest.raises(ValueError):
+        load_model(_FakeModel, "org/model", backend="tensorrt")
+
+
+def test_onnx_export_paths(monkeypatch, tmp_path):
+    monkeypatch.setattr(get_settings().inference, "export_dir", str(tmp_path))
+    assert inference._export_root("org/model-a") == tmp_path / "org__model-a"
+    assert inference._onnx_file_name("avx2") == "onnx/model_qint8_avx2.onnx"
+    assert inference._onnx_file_name(None) == "onnx/model.onnx"
+
+
+def test_parity_metrics():
+    assert spearman([0.1, 0.5, 0.9], [1.0, 2.0, 3.0]) == pytest.approx(1.0)
+    assert spearman([0.1, 0.5, 0.9], [3.0, 2.0, 1.0]) == pytest.approx(-1.0)
+    assert spearman([1.0, 1.0, 2.0], [5.0, 5.0, 9.0]) == pytest.approx(1.0)
+    ref = np.array([[1.0, 0.0], [0.0, 1.0]])
+    drift = cosine_drift(ref, np.array([[1.0, 0.0], [1.0, 1.0]]))
+    assert drift["max"] == pytest.approx(1 - np.sqrt(0.5))
+    assert drift["mean"] == pytest.approx((1 - np.sqrt(0.5)) / 2)
@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import pytest
+
+from app.core.config import LLMConfig
+from app.core.metrics import collect_usage
+from app.llm.providers import ChatProvider, astream_answer
+
+
+class _ChatStubHandler(BaseHTTPRequestHandler):
+    """Minimal chat-completions endpoint; fails the first `fail_first` requests with 503."""
+
+    protocol_version = "HTTP/1.1"
+    fail_first = 0
+    requests: List[dict] = []
+    ports: List[int] = []
+
+    def do_POST(self) -> None:  # noqa: N802 - http.server naming
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        cls = type(self)
+        cls.requests.append(body)
+        cls.ports.append(self.client_address[1])
+        if len(cls.requests) <= cls.fail_first:
+            self._send(503, {"error": {"message": "busy", "type": "server_error"}})
+            return
+        content = f"echo: {body['messages'][-1]['content'][:20]}"
+        if body.get("stream"):
+            include_usage = (body.get("stream_options") or {}).get("include_usage", False)
+            self._send_stream(body["model"], content.split(" "), include_usage)
+            return
+        self._send(
+            200,
+            {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            },
+        )
+
+    def _send(self, status: int, payload: dict) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model: str, words: List[str], include_usage: bool = False) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        for i, word in enumerate(words):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word if i == 0 else " " + word}, "finish_reason": None}],
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        if include_usage:
+            usage = {"prompt_tokens": 3, "completion_tokens": len(words), "total_tokens": 3 + len(words)}
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": 0,
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.close_connection = True
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    _ChatStubHandler.requests = []
+    _ChatStubHandler.ports = []
+    _ChatStubHandler.fail_first = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _ChatStubHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def _provider(server) -> ChatProvider:
+    config = LLMConfig(
+        base_url=f"http://127.0.0.1:{server.server_port}/v1",
+        max_retries=2,
+        backoff_base_seconds=0.01,
+        backoff_max_seconds=0.02,
+        timeout_seconds=5,
+    )
+    return ChatProvider("test-key", config)
+
+
+def test_sync_completion_reuses_connection(stub_server):
+    provider = _provider(stub_server)
+    for _ in range(3):
+        assert provider.complete([{"role": "user", "content": "hello"}]).startswith("echo: hello")
+    assert len(set(_ChatStubHandler.ports)) == 1
+    provider.close()
+
+
+def test_retries_on_server_error(stub_server):
+    _ChatStubHandler.fail_first = 2
+    provider = _provider(stub_server)
+    assert provider.complete([{"role": "user", "content": "retry"}]).startswith("echo: retry")
+    assert len(_ChatStubHandler.requests) == 3
+    provider.close()
+
+
+def test_gives_up_after_max_retries(stub_server):
+    _ChatStubHandler.fail_first = 10
+    provider = _provider(stub_server)
+    with pytest.raises(Exception):
+        provider.complete([{"role": "user", "content": "x"}])
+    assert len(_ChatStubHandler.requests) == 3
+    provider.close()
+
+
+def test_usage_counts_calls_tokens_and_fallbacks(stub_server, monkeypatch):
+    provider = _provider(stub_server)
+    with collect_usage() as usage:
+        provider.complete([{"role": "user", "content": "count me"}])
+        provider.complete([{"role": "user", "content": "and me"}])
+    assert usage == {"llm_calls": 2.0, "llm_prompt_tokens": 2.0, "llm_completion_tokens": 2.0}
+    provider.close()
+
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    from app.llm.providers import generate_answer
+
+    with collect_usage() as usage:
+        generate_answer("q", ["context"])
+    assert usage == {"fallback.llm_answer": 1.0}
+
+
+@pytest.mark.asyncio
+async def test_async_completion(stub_server):
+    provider = _provider(stub_server)
+    answer = await provider.acomplete([{"role": "user", "content": "async"}], max_tokens=16)
+    assert answer.startswith("echo: async")
+    assert _ChatStubHandler.requests[-1]["max_tokens"] == 16
+
+
+@pytest.mark.asyncio
+async def test_async_stream_yields_deltas(stub_server):
+    provider = _provider(stub_server)
+    with collect_usage() as usage:
+        deltas = [d async for d in provider.astream([{"role": "user", "content": "stream me"}])]
+    assert len(deltas) > 1
+    assert "".join(deltas) == "echo: stream me"
+    # Token usage is requested on streams and read from the final chunk
+    assert _ChatStubHandler.requests[-1]["stream_options"] == {"include_usage": True}
+    assert usage == {"llm_calls": 1, "llm_prompt_tokens": 3, "llm_completion_tokens": 3}
+
+
+@pytest.mark.asyncio
+async def test_offline_answer_streams_fallback(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    deltas = [d async for d in astream_answer("q", ["first line\nsecond line"])]
+    assert len(deltas) > 1
+    assert "".join(deltas) == "first line second line"
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import os
+from pathlib import Path
+
+from app.ingestion.manifest import IngestManifest, chunk_id
+
+
+def _record_all(manifest: IngestManifest, plan, params: str) -> None:
+    for sf in plan.changed:
+        manifest.record(sf, params, num_chunks=1)
+    for source in plan.removed:
+        manifest.forget(source)
+    manifest.save()
+
+
+def test_plan_skips_unchanged_and_detects_changes(tmp_path: Path):
+    docs = tmp_path / "docs"
+    docs.mkdir()
+    a, b = docs / "a.txt", docs / "b.txt"
+    a.write_text("alpha")
+    b.write_text("beta")
+    manifest_path = tmp_path / "manifest.json"
+
+    manifest = IngestManifest(manifest_path)
+    plan = manifest.plan([str(docs)], "chunk:64:16")
+    assert {sf.path.name for sf in plan.changed} == {"a.txt", "b.txt"}
+    _record_all(manifest, plan, "chunk:64:16")
+
+    # Fresh instance reads the saved manifest; nothing changed on disk
+    manifest = IngestManifest(manifest_path)
+    plan = manifest.plan([str(docs)], "chunk:64:16")
+    assert plan.changed == [] and len(plan.unchanged) == 2
+
+    # Same content with a new mtime is still unchanged; new content is changed
+    os.utime(a, (1_000_000, 1_000_000))
+    b.write_text("beta, revised")
+    c = docs / "c.txt"
+    c.write_text("gamma")
+    a_source = str(a.resolve())
+    plan = manifest.plan([str(docs)], "chunk:64:16")
+    assert {sf.path.name for sf in plan.changed} == {"b.txt", "c.txt"}
+    assert a_source in plan.unchanged
+    _record_all(manifest, plan, "chunk:64:16")
+
+    c.unlink()
+    plan = manifest.plan([str(docs)], "chunk:64:16")
+    assert plan.removed == [str(c.resolve())]
+
+
+def test_changed_params_reindex_and_other_roots_are_not_purged(tmp_path: Path):
+    first, second = tmp_path / "one", tmp_path / "two"
+    first.mkdir()
+    second.mkdir()
+    (first / "x.txt").write_text("x")
+    (second / "y.txt").write_text("y")
+
+    manifest = IngestManifest(tmp_path / "m.json")
+    _record_all(manifest, manifest.plan([str(first)], "window:2"), "window:2")
+    _record_all(manifest, manifest.plan([str(second)], "window:2"), "window:2")
+
+    plan = manifest.plan([str(first)], "window:2")
+    assert plan.removed == [] and plan.changed == []
+
+    plan = manifest.plan([str(first)], "window:3")
+    assert [sf.path.name for sf in plan.changed] == ["x.txt"]
+
+
+def test_chunk_ids_are_deterministic():
+    assert chunk_id("/a.txt", "chunk:1:0", "abc", 0) == chunk_id("/a.txt", "chunk:1:0", "abc", 0)
+    assert chunk_id("/a.txt", "chunk:1:0", "abc", 0) != chunk_id("/a.txt", "chunk:1:0", "abd", 0)
+    assert chunk_id("/a.txt", "chunk:1:0", "abc", 0) != chunk_id("/a.txt", "chunk:1:0", "abc", 1)
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import contextvars
+import threading
+
+from app.core.metrics import (
+    Histogram,
+    MetricsRegistry,
+    collect_stage_timings,
+    count_cache,
+    get_metrics,
+    span,
+    timed,
+)
+
+
+def test_histogram_buckets_and_quantiles():
+    h = Histogram((0.1, 1.0), window=100)
+    for v in [0.05, 0.1, 0.5, 2.0] + [0.2] * 96:
+        h.observe(v)
+    assert h.counts == [2, 97, 1]
+    assert h.quantiles() == {0.5: 0.2, 0.95: 0.2, 0.99: 0.5}
+
+    registry = MetricsRegistry()
+    registry.observe("rag_stage_seconds", 0.05, (0.1, 1.0), (("stage", "x"),))
+    registry.inc("rag_cache_lookups_total", 2, (("cache", "hyde"), ("result", "hit")))
+    text = registry.render()
+    assert "# TYPE rag_stage_seconds histogram" in text
+    assert 'rag_stage_seconds_bucket{stage="x",le="0.1"} 1' in text
+    assert 'rag_stage_seconds_bucket{stage="x",le="+Inf"} 1' in text
+    assert 'rag_stage_seconds_count{stage="x"} 1' in text
+    assert 'rag_stage_recent_seconds{stage="x",quantile="0.99"} 0.05' in text
+    assert 'rag_cache_lookups_total{cache="hyde",result="hit"} 2' in text
+
+
+def test_span_collects_request_timings_across_threads():
+    @timed("unit.inner")
+    def inner() -> None:
+        pass
+
+    with collect_stage_timings() as timings:
+        with span("unit.outer"):
+            inner()
+        # Worker threads started with a copy of the context record into the same dict
+        ctx = contextvars.copy_context()
+        worker = threading.Thread(target=ctx.run, args=(inner,))
+        worker.start()
+        worker.join()
+    with span("unit.outer"):
+        pass
+    assert set(timings) == {"unit.outer", "unit.inner"}
+    summary = get_metrics().stage_summary()
+    assert summary["unit.inner"]["count"] >= 2
+    assert summary["unit.outer"]["p99_ms"] >= 0.0
+    count_cache("unit", 1, 3)
+    assert 'rag_cache_lookups_total{cache="unit",result="miss"} 3' in get_metrics().render()
@@ -0,0 +1,49 @@
+from __future__ import annotations
+
+import threading
+
+import pytest
+
+from app.core.health import health_payload
+from app.retrieval import registry
+
+
+class _FakeEmbedder:
+    loads = 0
+
+    def __init__(self, model_name: str | None = None) -> None:
+        type(self).loads += 1
+        self.model_name = model_name
+
+
+@pytest.fixture
+def fake_registry(monkeypatch):
+    _FakeEmbedder.loads = 0
+    monkeypatch.setattr(registry, "EmbeddingModel", _FakeEmbedder)
+    registry.clear_registry()
+    yield registry
+    registry.clear_registry()
+
+
+def test_embedding_model_loaded_once_across_threads(fake_registry):
+    results = []
+
+    def worker():
+        results.append(fake_registry.get_embedding_model("m"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert _FakeEmbedder.loads == 1
+    assert all(r is results[0] for r in results)
+    assert health_payload()["model"]["loading_status"] == "loaded"
+
+
+def test_distinct_model_names_get_distinct_instances(fake_registry):
+    a = fake_registry.get_embedding_model("a")
+    b = fake_registry.get_embedding_model("b")
+    assert a is not b
+    assert fake_registry.get_embedding_model("a") is a
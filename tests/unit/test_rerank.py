@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+from typing import List, Sequence, Tuple
+
+import numpy as np
+import pytest
+
+from app.core.config import get_settings
+from app.retrieval import rerank
+from app.retrieval.rerank import Reranker, top_k_by_score
+
+
+class _FakeCrossEncoder:
+    """Scores a pair by the number of candidate words that occur in the query."""
+
+    def __init__(self, model_name: str, max_length: int, **kwargs) -> None:
+        self.max_length = max_length
+        self.calls: List[List[Tuple[str, str]]] = []
+
+    def predict(self, pairs: Sequence[Tuple[str, str]], batch_size: int, show_progress_bar: bool) -> np.ndarray:
+        self.calls.append(list(pairs))
+        return np.array([float(len(set(q.split()) & set(c.split()))) for q, c in pairs])
+
+
+@pytest.fixture
+def reranker(monkeypatch) -> Reranker:
+    monkeypatch.setattr(rerank, "CrossEncoder", _FakeCrossEncoder)
+    monkeypatch.setattr(get_settings().rerank, "early_stop_margin", None)
+    return Reranker("fake")
+
+
+def _items(texts: List[str]):
+    return [(t, {"source": f"s{i}"}, 0.0) for i, t in enumerate(texts)]
+
+
+def test_pairs_are_deduplicated_length_sorted_and_cached(reranker: Reranker):
+    model = reranker.model
+    assert model.max_length == get_settings().rerank.max_length
+    pairs = [("a b c", "a b c d e f"), ("a b c", "a"), ("a b c", "a b c d e f")]
+    assert reranker.score_pairs(pairs) == [3.0, 1.0, 3.0]
+    assert model.calls == [[("a b c", "a"), ("a b c", "a b c d e f")]]
+    # Cached pairs skip the model; only the new one is scored
+    assert reranker.score_pairs(pairs + [("a b c", "b c")]) == [3.0, 1.0, 3.0, 2.0]
+    assert model.calls[-1] == [("a b c", "b c")]
+
+
+def test_top_k_partial_sort_keeps_ties_stable():
+    items = _items(["w", "x", "y", "z"])
+    ranked = top_k_by_score(items, [1.0, 3.0, 3.0, 0.5], top_k=2)
+    assert [t for t, _m, _s in ranked] == ["x", "y"]
+    assert [t for t, _m, _s in top_k_by_score(items, [1.0, 3.0, 3.0, 0.5])] == ["x", "y", "w", "z"]
+
+
+def test_rerank_many_returns_top_k(reranker: Reranker):
+    items = _items(["q", "q r", "q r s", "nothing"])
+    out = reranker.rerank_many(["q r s", "q"], [items, items], top_k=2)
+    assert [t for t, _m, _s in out[0]] == ["q r s", "q r"]
+    assert len(out[1]) == 2
+    assert len(reranker.model.calls) == 1
+
+
+def test_early_stop_skips_weak_tail(reranker: Reranker, monkeypatch):
+    monkeypatch.setattr(get_settings().rerank, "early_stop_margin", 1.0)
+    # First-stage order puts the strong candidates first
+    texts = ["a b c", "a b", "z", "y", "x", "w", "v", "u"]
+    out = reranker.rerank("a b c", _items(texts), top_k=2)
+    assert [t for t, _m, _s in out] == ["a b c", "a b"]
+    # Scored the first two slices only: the second trails the 2nd best by >= 1
+    assert sum(len(c) for c in reranker.model.calls) == 4
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import time
+
+from app.retrieval import semantic_cache
+from app.retrieval.semantic_cache import SemanticAnswerCache, answer_through_cache
+
+
+def _answer(text: str):
+    return text, [(f"context for {text}", {"source": "doc.txt"}, 0.9)]
+
+
+def test_paraphrase_hits_and_dissimilar_misses():
+    cache = SemanticAnswerCache(threshold=0.95)
+    cache.store("baseline", "baseline", (5,), [1.0, 0.0, 0.0], _answer("a"), latency_s=0.2)
+
+    assert cache.lookup("baseline", "baseline", (5,), [0.99, 0.05, 0.0]) == _answer("a")
+    assert cache.lookup("baseline", "baseline", (5,), [0.0, 1.0, 0.0]) is None
+
+    stats = cache.stats()["baseline"]
+    assert stats["lookups"] == 2 and stats["hits"] == 1
+    assert stats["hit_rate"] == 0.5
+    assert abs(stats["saved_latency_ms"] - 200.0) < 1e-6
+
+
+def test_entries_are_partitioned_by_mode_and_params():
+    cache = SemanticAnswerCache(threshold=0.9)
+    cache.store("baseline", "baseline", (5,), [1.0, 0.0], _answer("a"), latency_s=0.1)
+    assert cache.lookup("hyde_rerank", "baseline", (5,), [1.0, 0.0]) is None
+    assert cache.lookup("baseline", "baseline", (3,), [1.0, 0.0]) is None
+
+
+def test_invalidate_collection_and_ring_capacity():
+    cache = SemanticAnswerCache(threshold=0.9, max_entries=2)
+    cache.store("sentence_window", "sentence_window", (5,), [1.0, 0.0], _answer("a"), latency_s=0.1)
+    cache.store("baseline", "baseline", (5,), [1.0, 0.0], _answer("b"), latency_s=0.1)
+    cache.invalidate_collection("sentence_window")
+    assert cache.lookup("sentence_window", "sentence_window", (5,), [1.0, 0.0]) is None
+    assert cache.lookup("baseline", "baseline", (5,), [1.0, 0.0]) == _answer("b")
+
+    cache.store("baseline", "baseline", (5,), [0.0, 1.0], _answer("c"), latency_s=0.1)
+    cache.store("baseline", "baseline", (5,), [-1.0, 0.0], _answer("d"), latency_s=0.1)
+    # Capacity 2: the oldest entry ("b") has been overwritten
+    assert cache.lookup("baseline", "baseline", (5,), [1.0, 0.0]) is None
+
+
+def test_answers_computed_across_an_invalidation_are_not_stored(monkeypatch):
+    cache = SemanticAnswerCache(threshold=0.9)
+    monkeypatch.setattr(semantic_cache, "get_semantic_cache", lambda: cache)
+
+    def compute_during_reingest():
+        cache.invalidate_collection("baseline")
+        return _answer("stale")
+
+    assert answer_through_cache("baseline", "baseline", (5,), [1.0, 0.0], compute_during_reingest) == _answer("stale")
+    assert cache.lookup("baseline", "baseline", (5,), [1.0, 0.0]) is None
+    answer_through_cache("baseline", "baseline", (5,), [1.0, 0.0], lambda: _answer("fresh"))
+    assert cache.lookup("baseline", "baseline", (5,), [1.0, 0.0]) == _answer("fresh")
+
+
+def test_expired_entry_does_not_shadow_its_replacement():
+    cache = SemanticAnswerCache(threshold=0.9, ttl_seconds=0.05)
+    cache.store("baseline", "baseline", (5,), [1.0, 0.0], _answer("old"), latency_s=0.1)
+    time.sleep(0.1)
+    assert cache.lookup("baseline", "baseline", (5,), [1.0, 0.0]) is None
+    # Recomputed and stored again under the same vector: the fresh entry wins over the expired one
+    cache.store("baseline", "baseline", (5,), [1.0, 0.0], _answer("new"), latency_s=0.1)
+    assert cache.lookup("baseline", "baseline", (5,), [1.0, 0.0]) == _answer("new")
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+
+from app.core.config import get_settings
+from app.ingestion.sentence_store import SentenceStore, expand_windows, get_sentence_store
+from app.ingestion.sentence_window import sentence_spans
+
+
+def _put(store: SentenceStore, doc_id: str, source: str, text: str) -> None:
+    store.put(doc_id, source, text, sentence_spans(text))
+
+
+def test_windows_are_clipped_per_document(tmp_path: Path):
+    store = SentenceStore(tmp_path / "sentences.sqlite3")
+    _put(store, "d1", "a.txt", "A. B. C. D.")
+    _put(store, "d2", "b.txt", "X.  Y.")
+    windows = store.windows(["d1", "d1", "d2", "missing"], np.array([-1, 2, 0, 0]), np.array([1, 5, 0, 1]))
+    assert windows == [("A. B.", 0, 1), ("C. D.", 2, 3), ("X.", 0, 0), None]
+
+    _put(store, "d1", "a.txt", "Only.")
+    store.delete_sources(["b.txt"])
+    assert store.windows(["d1", "d2"], np.array([0, 0]), np.array([3, 1])) == [("Only.", 0, 0), None]
+
+
+def test_expand_windows_uses_ingest_bounds_or_override(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(get_settings().db, "chroma_path", str(tmp_path))
+    _put(get_sentence_store("windows"), "d1", "a.txt", "A. B.\nC. D. E.")
+    meta = {"source": "a.txt", "doc_id": "d1", "sent_idx": "2", "s_idx": "1", "e_idx": "3", "char_start": "3", "char_end": "11"}
+    hit = ("C.", meta, 0.5)
+    legacy = ("whole window text", {"source": "b.txt", "s_idx": "0", "e_idx": "1"}, 0.4)
+
+    (text, meta, score), untouched = expand_windows([hit, legacy], "windows")
+    assert text == "B.\nC. D." and meta["sentence_text"] == "C." and score == 0.5
+    assert untouched == legacy
+
+    (text, meta, _s), _ = expand_windows([hit, legacy], "windows", window_size=5)
+    assert text == "A. B.\nC. D. E." and (meta["s_idx"], meta["e_idx"]) == ("0", "4")
@@ -1,6 +1,10 @@
 from __future__ import annotations
 
-from app.ingestion.sentence_window import split_into_sentence_windows
+from concurrent.futures import Future
+from typing import List
+
+from app.ingestion import sentence_window
+from app.ingestion.sentence_window import iter_sentence_spans, sentence_spans, split_into_sentence_windows
 
 
 def test_sentence_window_edges():
@@ -15,3 +19,58 @@ def test_sentence_window_edges():
     w1, m1 = windows[1]
     assert m1["s_idx"] == "0" and m1["e_idx"] == "2"
     assert "A." in w1 and "B." in w1 and "C." in w1
+
+
+def test_sentence_spans_keep_original_text():
+    text = "Dr. Smith paid $3.50  (approx.) for it!\n\nWas it worth it? Yes."
+    spans = sentence_spans(text)
+    assert [text[a:b] for a, b in spans.tolist()] == [
+        "Dr. Smith paid $3.50  (approx.) for it!",
+        "Was it worth it?",
+        "Yes.",
+    ]
+    _w, meta = split_into_sentence_windows(text, window_size=1)[2]
+    assert text[int(meta["char_start"]) : int(meta["char_end"])] == "Was it worth it? Yes."
+
+
+def test_iter_sentence_spans_keeps_order_across_pool():
+    texts = [(i, f"Doc {i} first. Doc {i} second." * (50 if i % 2 else 1)) for i in range(4)]
+    pooled = list(iter_sentence_spans(texts, max_workers=2, min_parallel_chars=100))
+    assert [key for key, _t, _s in pooled] == [0, 1, 2, 3]
+    for (_key, text), (_k, _t, spans) in zip(texts, pooled):
+        assert spans.tolist() == sentence_spans(text).tolist()
+
+
+class _InlinePool:
+    """Synchronous stand-in for the spawn pool that records the submitted tasks."""
+
+    tasks: List[int] = []
+
+    def __init__(self, **_kwargs) -> None:
+        pass
+
+    def submit(self, fn, arg):
+        _InlinePool.tasks.append(len(arg))
+        future: Future = Future()
+        future.set_result(fn(arg))
+        return future
+
+    def shutdown(self, **_kwargs) -> None:
+        pass
+
+
+def test_iter_sentence_spans_groups_small_documents(monkeypatch):
+    monkeypatch.setattr(sentence_window, "ProcessPoolExecutor", _InlinePool)
+    _InlinePool.tasks = []
+    texts = [(i, f"Note {i} starts here. It ends here.") for i in range(40)]
+    pooled = list(iter_sentence_spans(texts, max_workers=2, min_parallel_chars=200, prefetch=1))
+    assert [key for key, _t, _s in pooled] == list(range(40))
+    for (_key, text), (_k, _t, spans) in zip(texts, pooled):
+        assert spans.tolist() == sentence_spans(text).tolist()
+    # Whole documents go to the pool a handful per task; the short remainder joins the running pool
+    assert _InlinePool.tasks == [7, 6, 6, 6, 6, 6, 3]
+
+    # A corpus smaller than one task never starts the pool
+    _InlinePool.tasks = []
+    assert len(list(iter_sentence_spans(texts[:3], max_workers=2, min_parallel_chars=200))) == 3
+    assert _InlinePool.tasks == []
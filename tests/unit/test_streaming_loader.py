@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pymupdf
+import pytest
+from pypdf import PdfWriter
+
+from app.ingestion.loaders import (
+    extract_pdf_pages,
+    iter_batches,
+    iter_load_documents,
+    join_pages,
+    page_at,
+)
+
+
+def _write_pdf(path: Path, pages: int) -> None:
+    doc = pymupdf.open()
+    for i in range(pages):
+        doc.new_page().insert_text((72, 72), f"page {i + 1} body")
+    doc.save(str(path))
+    doc.close()
+
+
+def test_iter_batches_bounds_batch_size():
+    batches = list(iter_batches(iter(range(7)), 3))
+    assert batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert list(iter_batches([], 3)) == []
+
+
+def test_iter_load_documents_preserves_order(tmp_path: Path):
+    paths = []
+    for i in range(5):
+        p = tmp_path / f"doc{i}.txt"
+        p.write_text(f"text {i}")
+        paths.append(p)
+    pdf = tmp_path / "blank.pdf"
+    writer = PdfWriter()
+    writer.add_blank_page(width=72, height=72)
+    with pdf.open("wb") as f:
+        writer.write(f)
+    paths.insert(2, pdf)
+
+    loaded = list(iter_load_documents(paths, max_workers=2, prefetch=2))
+    assert [p for p, _t in loaded] == paths
+    assert loaded[0][1] == ["text 0"]
+    assert "".join(loaded[2][1]).strip() == ""
+
+
+@pytest.mark.parametrize("backend", ["pymupdf", "pypdf"])
+def test_extract_pdf_pages_backends(tmp_path: Path, backend: str):
+    pdf = tmp_path / "doc.pdf"
+    _write_pdf(pdf, 4)
+    pages = extract_pdf_pages(pdf, backend=backend)
+    assert [p.strip() for p in pages] == [f"page {i} body" for i in range(1, 5)]
+    assert [p.strip() for p in extract_pdf_pages(pdf, 1, 3, backend=backend)] == ["page 2 body", "page 3 body"]
+
+
+def test_large_pdf_is_split_into_page_ranges(tmp_path: Path, monkeypatch):
+    from app.core.config import get_settings
+
+    pdf = tmp_path / "big.pdf"
+    _write_pdf(pdf, 7)
+    cfg = get_settings().ingestion
+    monkeypatch.setattr(cfg, "pdf_parallel_min_pages", 4)
+    monkeypatch.setattr(cfg, "pdf_pages_per_task", 3)
+    [(path, pages)] = list(iter_load_documents([pdf], max_workers=2))
+    assert path == pdf
+    assert [p.strip() for p in pages] == [f"page {i} body" for i in range(1, 8)]
+
+
+def test_page_at_maps_offsets_to_pages():
+    text, offsets = join_pages(["aaa", "bb", "c"])
+    assert text == "aaa\nbb\nc"
+    assert [page_at(offsets, i) for i in range(len(text))] == [1, 1, 1, 1, 2, 2, 2, 3]
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from app.ingestion.vector_store import LocalVectorStore, matches_where
+
+
+def _vectors(n: int, dim: int = 16, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    x = rng.standard_normal((n, dim)).astype(np.float32)
+    return x / np.linalg.norm(x, axis=1, keepdims=True)
+
+
+def _fill(store: LocalVectorStore, vectors: np.ndarray) -> None:
+    n = len(vectors)
+    store.upsert(
+        [f"id{i}" for i in range(n)],
+        [f"doc {i}" for i in range(n)],
+        [{"source": f"s{i % 3}", "n": i} for i in range(n)],
+        vectors,
+    )
+
+
+def test_where_filter_subset():
+    meta = {"source": "a", "page": 3}
+    assert matches_where(meta, {"source": "a"})
+    assert matches_where(meta, {"source": {"$in": ["a", "b"]}})
+    assert not matches_where(meta, {"source": {"$nin": ["a"]}})
+    assert matches_where(meta, {"$and": [{"page": {"$gte": 3}}, {"source": {"$ne": "b"}}]})
+    assert not matches_where(meta, {"$or": [{"page": {"$lt": 3}}, {"source": "b"}]})
+
+
+@pytest.mark.parametrize("mode", ["exact", "hnsw"])
+def test_query_matches_brute_force(tmp_path: Path, mode: str):
+    vectors = _vectors(300)
+    store = LocalVectorStore(tmp_path / mode, mode=mode)
+    _fill(store, vectors)
+
+    queries = vectors[[5, 42, 299]]
+    results = store.query(queries, k=5)
+    for q, hits in zip(queries, results):
+        expected = np.argsort(((vectors - q) ** 2).sum(axis=1))[:5]
+        assert [h[0] for h in hits] == [f"doc {i}" for i in expected]
+        assert hits[0][2] == pytest.approx(0.0, abs=1e-5)
+
+
+@pytest.mark.parametrize("mode", ["exact", "hnsw"])
+def test_persistence_upsert_delete_and_filter(tmp_path: Path, mode: str):
+    vectors = _vectors(50)
+    store = LocalVectorStore(tmp_path / "c", mode=mode)
+    _fill(store, vectors)
+    store.delete({"source": "s0"})
+    # Re-upserting an id replaces its vector and document
+    store.upsert(["id1"], ["doc one"], [{"source": "s1", "n": 1}], vectors[7:8])
+    store.close()
+
+    reopened = LocalVectorStore(tmp_path / "c", mode=mode)
+    assert reopened.count() == 50 - 17
+    [hits] = reopened.query(vectors[7], k=2)
+    assert {h[0] for h in hits} == {"doc 7", "doc one"}
+    [filtered] = reopened.query(vectors[0], k=3, where={"source": "s2"})
+    assert len(filtered) == 3 and all(h[1]["source"] == "s2" for h in filtered)
+    assert all(h[1]["source"] != "s0" for h in reopened.query(vectors[0], k=50)[0])
+
+    reopened.compact()
+    assert reopened.count() == 50 - 17
+    [hits] = reopened.query(vectors[2], k=1)
+    assert hits[0][0] == "doc 2"
+    reopened.destroy()
+    assert not (tmp_path / "c").exists()
+
+
+def test_query_resolves_hits_against_its_snapshot(tmp_path: Path):
+    vectors = _vectors(40)
+    store = LocalVectorStore(tmp_path / "c", mode="exact")
+    _fill(store, vectors)
+    scan = store._exact
+
+    def scan_then_reingest(*args):
+        hits = scan(*args)
+        # A re-ingest runs while the scan is outside the lock: one item goes, the rest are renumbered
+        store.delete({"n": 2})
+        store.compact()
+        return hits
+
+    store._exact = scan_then_reingest  # type: ignore[method-assign]
+    [hits] = store.query(vectors[3], k=3, where={"source": {"$in": ["s0", "s2"]}})
+    assert hits[0][0] == "doc 3" and hits[0][1]["n"] == 3
+    assert "doc 2" not in {h[0] for h in hits}
+    assert all(h[0] == f"doc {h[1]['n']}" for h in hits)
+    store.destroy()